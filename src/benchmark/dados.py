@@ -0,0 +1,84 @@
+"""
+Gerador determinístico de clientes sintéticos para benchmarks.
+
+A mesma semente gera sempre os mesmos clientes: nomes brasileiros, CPFs
+com dígitos verificadores válidos, emails únicos e datas dd/mm/aaaa.
+"""
+import random
+
+from src.clientes.deduplicacao import sem_acentos
+from src.clientes.repository import inserir_clientes_em_lote
+
+PRENOMES = (
+    "Ana", "Maria", "Francisca", "Antônia", "Adriana", "Juliana", "Márcia",
+    "Fernanda", "Patrícia", "Aline", "Camila", "Beatriz", "Larissa", "Letícia",
+    "José", "João", "Antônio", "Francisco", "Carlos", "Paulo", "Pedro",
+    "Lucas", "Luiz", "Marcos", "Luís", "Gabriel", "Rafael", "Daniel",
+    "Marcelo", "Bruno", "Eduardo", "Felipe", "Rodrigo", "Gustavo", "Conceição",
+)
+
+SOBRENOMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho",
+    "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha",
+    "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado",
+    "Mendes", "Freitas", "Cardoso", "Ramos", "Gonçalves", "Santana", "Teixeira",
+)
+
+DOMINIOS = ("gmail.com", "hotmail.com", "outlook.com", "yahoo.com.br", "uol.com.br")
+
+DDDS = (11, 21, 31, 41, 47, 51, 61, 71, 81, 85, 91)
+
+SEMENTE_PADRAO = 42
+
+
+def gerar_cpf(rng: random.Random) -> str:
+    """
+    CPF aleatório com dígitos verificadores válidos, no formato
+    000.000.000-00.
+    """
+    numeros = [rng.randint(0, 9) for _ in range(9)]
+    if len(set(numeros)) == 1:
+        numeros[0] = (numeros[0] + 1) % 10
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        soma = sum(n * peso for n, peso in zip(numeros, pesos))
+        numeros.append(soma * 10 % 11 % 10)
+    d = "".join(map(str, numeros))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def gerar_clientes(quantidade: int, semente: int = SEMENTE_PADRAO, inicio: int = 1):
+    """
+    Gera 'quantidade' tuplas (nome, email, telefone, cpf, data_nascimento),
+    no formato de inserir_clientes_em_lote. 'inicio' é o número do primeiro
+    cliente (usado no email): faixas diferentes nunca repetem email.
+    """
+    rng = random.Random(semente)
+    for numero in range(inicio, inicio + quantidade):
+        prenome = rng.choice(PRENOMES)
+        sobrenomes = rng.sample(SOBRENOMES, rng.choice((1, 2, 2, 3)))
+        nome = " ".join([prenome, *sobrenomes])
+        usuario = sem_acentos(f"{prenome}.{sobrenomes[-1]}").lower()
+        # O número no email garante unicidade mesmo com nomes repetidos.
+        email = f"{usuario}{numero}@{rng.choice(DOMINIOS)}"
+        telefone = f"({rng.choice(DDDS)}) 9{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+        data = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1940, 2006)}"
+        yield nome, email, telefone, gerar_cpf(rng), data
+
+
+def popular_banco(quantidade: int, semente: int = SEMENTE_PADRAO, inicio: int = 1,
+                  tamanho_lote: int = 10000) -> int:
+    """
+    Insere clientes sintéticos no banco atual. CPFs repetidos (raros)
+    são descartados pelo índice único. Retorna quantos foram inseridos.
+    """
+    inseridos = 0
+    lote = []
+    for cliente in gerar_clientes(quantidade, semente, inicio):
+        lote.append(cliente)
+        if len(lote) >= tamanho_lote:
+            inseridos += sum(1 for i in inserir_clientes_em_lote(lote, tamanho_lote) if i)
+            lote = []
+    if lote:
+        inseridos += sum(1 for i in inserir_clientes_em_lote(lote, tamanho_lote) if i)
+    return inseridos
@@ -0,0 +1,453 @@
+"""
+Benchmarks das funções do repositório e das rotas da API.
+
+Popula um banco separado com clientes sintéticos (dados.py), mede cada
+função do repositório e cada rota /api/clientes (via test client do
+Flask) e grava p50/p95/p99, vazão e pico de memória num JSON, para
+comparar execuções.
+
+Uso (na raiz do projeto):
+    python -m src.benchmark.executar --clientes 100000 --saida base.json
+    python -m src.benchmark.executar --clientes 100000 --reusar --comparar base.json
+
+Os caches de leitura são limpos antes de cada chamada (mede o caminho até
+o banco), exceto nos casos marcados "(cache quente)".
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.clientes import database
+from src.clientes.cache import cache_fragmentos, cache_paginas, cache_registros
+from src.clientes.database import conexao
+from src.clientes.migracoes import preparar_esquema
+from src.clientes.repository import (
+    LIMITE_MAXIMO,
+    atualizar_cliente,
+    buscar_cliente_por_cpf,
+    buscar_cliente_por_email,
+    buscar_cliente_por_id,
+    buscar_clientes_por_cpfs,
+    buscar_clientes_por_nome,
+    exportar_clientes,
+    inserir_cliente,
+    inserir_clientes_em_lote,
+    listar_aniversariantes,
+    listar_clientes,
+    listar_clientes_pagina,
+    listar_nascidos_no_mes,
+    listar_por_idade,
+)
+from src.clientes.validators import normalizar_cpf
+from src.benchmark.dados import SEMENTE_PADRAO, gerar_clientes, popular_banco
+
+BANCO_PADRAO = "benchmark.db"
+
+ITERACOES_PADRAO = 200
+
+# Chamadas repetidas com tracemalloc ligado para medir o pico de memória
+# (tracemalloc deixa tudo mais lento, então não entra na latência).
+ITERACOES_MEMORIA = 5
+
+# Funções que leem a tabela inteira rodam menos vezes.
+ITERACOES_TABELA_INTEIRA = 3
+
+TERMOS_BUSCA = ("silva", "maria", "ana sou", "goncalves", "pedro alves", "conceição")
+
+
+def _percentil(ordenadas, p: float) -> float:
+    # Nearest-rank: o menor valor que cobre p% das amostras.
+    indice = max(math.ceil(p / 100 * len(ordenadas)) - 1, 0)
+    return ordenadas[indice]
+
+
+def limpar_caches():
+    cache_registros.limpar()
+    cache_paginas.limpar()
+    cache_fragmentos.limpar()
+
+
+def medir(nome: str, grupo: str, funcao, iteracoes: int, frio: bool = True) -> dict:
+    """
+    Chama funcao(i) para i em range(iteracoes) e resume as latências.
+    Com frio=True os caches são limpos antes de cada chamada (fora da
+    medição).
+    """
+    funcao(0)  # aquecimento (compila consultas, enche o pool)
+
+    latencias = []
+    total = 0.0
+    for i in range(iteracoes):
+        if frio:
+            limpar_caches()
+        inicio = time.perf_counter()
+        funcao(i)
+        duracao = time.perf_counter() - inicio
+        latencias.append(duracao)
+        total += duracao
+
+    tracemalloc.start()
+    pico = 0
+    try:
+        for i in range(min(iteracoes, ITERACOES_MEMORIA)):
+            if frio:
+                limpar_caches()
+            tracemalloc.reset_peak()
+            funcao(i)
+            pico = max(pico, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    latencias.sort()
+    return {
+        "nome": nome,
+        "grupo": grupo,
+        "iteracoes": iteracoes,
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(_percentil(latencias, 99) * 1000, 3),
+        "media_ms": round(total / iteracoes * 1000, 3),
+        "max_ms": round(latencias[-1] * 1000, 3),
+        "vazao_por_s": round(iteracoes / total, 1) if total else None,
+        "memoria_pico_kib": round(pico / 1024, 1),
+    }
+
+
+def _amostras(quantidade: int, semente: int):
+    """
+    Sorteia clientes existentes (id, cpf, email, nome) para as consultas.
+    """
+    rng = random.Random(semente)
+    with conexao() as conn:
+        maior_id = conn.execute("SELECT MAX(id) FROM clientes").fetchone()[0] or 0
+        # Sorteia ids (sem carregar a tabela); buracos deixados por
+        # exclusões só reduzem um pouco a amostra.
+        ids = rng.sample(range(1, maior_id + 1), min(quantidade, maior_id))
+        linhas = []
+        for inicio in range(0, len(ids), 500):
+            parte = ids[inicio:inicio + 500]
+            linhas += conn.execute(
+                "SELECT id, cpf, email, nome FROM clientes WHERE id IN "
+                f"({','.join('?' * len(parte))})",
+                parte,
+            ).fetchall()
+    rng.shuffle(linhas)
+    return [tuple(linha) for linha in linhas]
+
+
+def _cursores_de_pagina(quantidade: int):
+    """
+    Percorre a listagem e guarda cursores espalhados pela tabela, para
+    medir páginas "profundas" (keyset: devem custar o mesmo que a primeira).
+    """
+    cursores = []
+    _, proximo = listar_clientes_pagina(limite=LIMITE_MAXIMO)
+    while proximo and len(cursores) < quantidade:
+        cursores.append(proximo)
+        _, proximo = listar_clientes_pagina(limite=LIMITE_MAXIMO, apos=proximo)
+    return cursores or [None]
+
+
+def _clientes_novos(quantidade: int, inicio: int, semente: int):
+    """
+    Clientes sintéticos que ainda não existem no banco (CPF inédito).
+    """
+    candidatos = list(gerar_clientes(quantidade * 2, semente=semente, inicio=inicio))
+    existentes = buscar_clientes_por_cpfs([c[3] for c in candidatos])
+    novos = [c for c in candidatos if normalizar_cpf(c[3]) not in existentes]
+    return novos[:quantidade]
+
+
+def _em_lotes(clientes, tamanho: int):
+    return iter([clientes[i:i + tamanho] for i in range(0, len(clientes), tamanho)])
+
+
+def benchmarks_repositorio(iteracoes: int, semente: int, total_clientes: int):
+    amostras = _amostras(iteracoes, semente)
+    cursores = _cursores_de_pagina(iteracoes)
+    n = len(amostras)
+
+    yield "listar_clientes_pagina (primeira página)", lambda i: listar_clientes_pagina(), iteracoes, True
+    yield "listar_clientes_pagina (página profunda)", (
+        lambda i: listar_clientes_pagina(apos=cursores[i % len(cursores)])
+    ), iteracoes, True
+    yield "listar_clientes_pagina (ordem=nome)", (
+        lambda i: listar_clientes_pagina(ordem="nome")
+    ), iteracoes, True
+    yield "listar_clientes (tabela inteira)", lambda i: listar_clientes(), ITERACOES_TABELA_INTEIRA, True
+    yield "buscar_cliente_por_id", lambda i: buscar_cliente_por_id(amostras[i % n][0]), iteracoes, True
+    yield "buscar_cliente_por_id (cache quente)", (
+        lambda i: buscar_cliente_por_id(amostras[i % 10][0])
+    ), iteracoes, False
+    yield "buscar_cliente_por_cpf", lambda i: buscar_cliente_por_cpf(amostras[i % n][1]), iteracoes, True
+    yield "buscar_cliente_por_email", lambda i: buscar_cliente_por_email(amostras[i % n][2]), iteracoes, True
+    yield "buscar_clientes_por_cpfs (100 cpfs)", (
+        lambda i: buscar_clientes_por_cpfs([a[1] for a in amostras[:100]])
+    ), iteracoes, True
+    yield "buscar_clientes_por_nome", (
+        lambda i: buscar_clientes_por_nome(TERMOS_BUSCA[i % len(TERMOS_BUSCA)])
+    ), iteracoes, True
+    yield "buscar_clientes_por_nome (prefixo)", (
+        lambda i: buscar_clientes_por_nome(amostras[i % n][3].split()[0][:3])
+    ), iteracoes, True
+    yield "listar_aniversariantes (semana)", (
+        lambda i: listar_aniversariantes((i % 12 + 1, 1), (i % 12 + 1, 7))
+    ), iteracoes, True
+    yield "listar_aniversariantes (virada do ano)", (
+        lambda i: listar_aniversariantes((12, 28), (1, 3))
+    ), iteracoes, True
+    yield "listar_nascidos_no_mes (500)", (
+        lambda i: listar_nascidos_no_mes(i % 12 + 1, limite=LIMITE_MAXIMO)
+    ), iteracoes, True
+    yield "listar_por_idade (30 a 39)", lambda i: listar_por_idade(30, 39), iteracoes, True
+    yield "exportar_clientes (tabela inteira)", (
+        lambda i: sum(1 for _ in exportar_clientes())
+    ), ITERACOES_TABELA_INTEIRA, True
+
+    novos = _clientes_novos(iteracoes + ITERACOES_MEMORIA + 1, total_clientes + 1, semente + 1)
+    proximo_novo = iter(novos)
+    yield "inserir_cliente", lambda i: inserir_cliente(*next(proximo_novo)), iteracoes, True
+
+    def _atualizar(i):
+        id_cliente, cpf, email, nome = amostras[i % n]
+        atualizar_cliente(id_cliente, nome, email, f"(11) 9{i:04d}-0000", cpf, "01/01/1990")
+    yield "atualizar_cliente", _atualizar, iteracoes, True
+
+    lotes = _em_lotes(_clientes_novos(
+        1000 * (ITERACOES_TABELA_INTEIRA + ITERACOES_MEMORIA + 1),
+        total_clientes + 1_000_000, semente + 2,
+    ), 1000)
+    yield "inserir_clientes_em_lote (1000)", (
+        lambda i: inserir_clientes_em_lote(next(lotes))
+    ), ITERACOES_TABELA_INTEIRA, True
+
+
+def benchmarks_rotas(iteracoes: int, semente: int, total_clientes: int):
+    # Importado aqui: app.py cria a aplicação (e a tabela) ao ser importado,
+    # então precisa vir depois de database.DB_NAME apontar para o banco
+    # de benchmark.
+    from src.web.app import app
+
+    cliente = app.test_client()
+    amostras = _amostras(iteracoes, semente + 3)
+    n = len(amostras)
+
+    def _get(url):
+        resposta = cliente.get(url)
+        assert resposta.status_code == 200, (url, resposta.status_code)
+        return resposta
+
+    yield "GET /", lambda i: _get("/"), iteracoes, True
+    yield "GET / (cache quente)", lambda i: _get("/"), iteracoes, False
+    yield "GET /clientes/linhas (página profunda)", (
+        lambda i: _get(f"/clientes/linhas?after={total_clientes // 2}")
+    ), iteracoes, True
+    yield "GET /api/clientes", lambda i: _get("/api/clientes"), iteracoes, True
+    yield "GET /api/clientes?limit=500", lambda i: _get("/api/clientes?limit=500"), iteracoes, True
+    yield "GET /api/clientes?q=", (
+        lambda i: _get(f"/api/clientes?q={TERMOS_BUSCA[i % len(TERMOS_BUSCA)]}")
+    ), iteracoes, True
+    yield "GET /api/clientes/<id>", lambda i: _get(f"/api/clientes/{amostras[i % n][0]}"), iteracoes, True
+    yield "GET /api/clientes/<id> (cache quente)", (
+        lambda i: _get(f"/api/clientes/{amostras[i % 10][0]}")
+    ), iteracoes, False
+    yield "GET /api/clientes/cpf/<cpf>", (
+        lambda i: _get(f"/api/clientes/cpf/{amostras[i % n][1]}")
+    ), iteracoes, True
+    yield "POST /api/clientes/cpfs (100 cpfs)", (
+        lambda i: cliente.post("/api/clientes/cpfs", json={"cpfs": [a[1] for a in amostras[:100]]})
+    ), iteracoes, True
+
+    campos = ("nome", "email", "telefone", "cpf", "data_nascimento")
+    novos = _clientes_novos(iteracoes + ITERACOES_MEMORIA + 1, total_clientes + 2_000_000, semente + 4)
+    proximo_novo = iter(novos)
+    yield "POST /api/clientes", (
+        lambda i: cliente.post("/api/clientes", json=dict(zip(campos, next(proximo_novo))))
+    ), iteracoes, True
+
+    def _put(i):
+        id_cliente, cpf, email, nome = amostras[i % n]
+        cliente.put(f"/api/clientes/{id_cliente}", json={
+            "nome": nome, "email": email, "telefone": f"(11) 9{i:04d}-1111",
+            "cpf": cpf, "data_nascimento": "01/01/1990",
+        })
+    yield "PUT /api/clientes/<id>", _put, iteracoes, True
+
+    lotes = _em_lotes([
+        dict(zip(campos, c))
+        for c in _clientes_novos(
+            100 * (ITERACOES_TABELA_INTEIRA * 10 + ITERACOES_MEMORIA + 1),
+            total_clientes + 3_000_000, semente + 5,
+        )
+    ], 100)
+    yield "POST /api/clientes/lote (100)", (
+        lambda i: cliente.post("/api/clientes/lote", json=next(lotes))
+    ), ITERACOES_TABELA_INTEIRA * 10, True
+    yield "GET /api/clientes/export", (
+        lambda i: len(_get("/api/clientes/export").get_data())
+    ), ITERACOES_TABELA_INTEIRA, True
+
+
+def benchmarks_serializacao(iteracoes: int, semente: int, total_clientes: int):
+    # Compara o caminho antigo (dict por cliente + jsonify) com
+    # serializar_linhas, com e sem orjson, numa página de LIMITE_MAXIMO.
+    from flask import jsonify
+
+    from src.web import serializacao
+    from src.web.app import app, serializar_cliente
+
+    linhas, _ = listar_clientes_pagina(limite=LIMITE_MAXIMO)
+
+    def _jsonify(i):
+        with app.test_request_context():
+            jsonify({"clientes": [serializar_cliente(linha) for linha in linhas]}).get_data()
+
+    def _sem_orjson(i):
+        orjson, serializacao.orjson = serializacao.orjson, None
+        try:
+            serializacao.serializar_linhas(linhas)
+        finally:
+            serializacao.orjson = orjson
+
+    yield f"jsonify + dict por cliente ({len(linhas)})", _jsonify, iteracoes, False
+    yield f"serializar_linhas, biblioteca padrão ({len(linhas)})", _sem_orjson, iteracoes, False
+    if serializacao.orjson is not None:
+        yield f"serializar_linhas, orjson ({len(linhas)})", (
+            lambda i: serializacao.serializar_linhas(linhas)
+        ), iteracoes, False
+
+
+def preparar_banco(caminho: str, clientes: int, semente: int, reusar: bool) -> dict:
+    """
+    Aponta o módulo database para o banco de benchmark e o popula.
+    Retorna informações sobre a carga.
+    """
+    if not reusar and os.path.exists(caminho):
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho + sufixo):
+                os.remove(caminho + sufixo)
+    database.DB_NAME = caminho
+    preparar_esquema()
+
+    with conexao() as conn:
+        existentes = conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+    inicio = time.perf_counter()
+    if existentes < clientes:
+        popular_banco(clientes - existentes, semente=semente + existentes,
+                      inicio=existentes + 1)
+    with conexao() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+    return {
+        "clientes": total,
+        "populacao_s": round(time.perf_counter() - inicio, 2),
+        "reusado": existentes > 0,
+    }
+
+
+def comparar(atual: dict, anterior: dict, saida=sys.stdout):
+    """
+    Imprime a variação de p50/p95 em relação a uma execução anterior.
+    """
+    anteriores = {r["nome"]: r for r in anterior["resultados"]}
+    print(f"\n{'benchmark':52} {'p50':>18} {'p95':>18}", file=saida)
+    for resultado in atual["resultados"]:
+        base = anteriores.get(resultado["nome"])
+        if not base:
+            continue
+        colunas = []
+        for chave in ("p50_ms", "p95_ms"):
+            variacao = (resultado[chave] / base[chave] - 1) * 100 if base[chave] else 0.0
+            colunas.append(f"{resultado[chave]:9.3f} ({variacao:+5.0f}%)")
+        print(f"{resultado['nome']:52} {colunas[0]:>18} {colunas[1]:>18}", file=saida)
+
+
+def executar(clientes: int, iteracoes: int = ITERACOES_PADRAO, banco: str = BANCO_PADRAO,
+             semente: int = SEMENTE_PADRAO, reusar: bool = False, grupos=("repositorio", "rotas", "serializacao"),
+             filtro: str = None, saida=sys.stdout) -> dict:
+    """
+    Roda os benchmarks e retorna o relatório (o mesmo gravado em JSON).
+    """
+    carga = preparar_banco(banco, clientes, semente, reusar)
+    relatorio = {
+        "metadados": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "semente": semente,
+            "iteracoes": iteracoes,
+            "armazenamento": database.configuracao_armazenamento(),
+            **carga,
+        },
+        "resultados": [],
+    }
+    print(f"Banco {banco}: {carga['clientes']} clientes", file=saida)
+
+    geradores = {
+        "repositorio": benchmarks_repositorio,
+        "rotas": benchmarks_rotas,
+        "serializacao": benchmarks_serializacao,
+    }
+    for grupo in grupos:
+        for nome, funcao, vezes, frio in geradores[grupo](iteracoes, semente, carga["clientes"]):
+            if filtro and filtro not in nome:
+                continue
+            resultado = medir(nome, grupo, funcao, vezes, frio)
+            relatorio["resultados"].append(resultado)
+            print(
+                f"{nome:52} p50 {resultado['p50_ms']:9.3f} ms | "
+                f"p95 {resultado['p95_ms']:9.3f} ms | p99 {resultado['p99_ms']:9.3f} ms | "
+                f"{resultado['vazao_por_s'] or 0:10.1f}/s | "
+                f"{resultado['memoria_pico_kib']:9.1f} KiB",
+                file=saida,
+            )
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks do repositório e das rotas da API de clientes."
+    )
+    parser.add_argument("--clientes", type=int, default=10000,
+                        help="tamanho da tabela (1000 a 1000000)")
+    parser.add_argument("--iteracoes", type=int, default=ITERACOES_PADRAO)
+    parser.add_argument("--banco", default=BANCO_PADRAO, help="arquivo SQLite do benchmark")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--reusar", action="store_true",
+                        help="reaproveita o banco existente (só completa o que faltar; "
+                        "os benchmarks de escrita deixam o banco maior)")
+    parser.add_argument("--grupo", choices=["repositorio", "rotas", "serializacao"], action="append",
+                        help="roda só um grupo (pode repetir)")
+    parser.add_argument("--filtro", help="roda só benchmarks cujo nome contém o texto")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(
+        args.clientes,
+        iteracoes=args.iteracoes,
+        banco=args.banco,
+        semente=args.semente,
+        reusar=args.reusar,
+        grupos=args.grupo or ("repositorio", "rotas", "serializacao"),
+        filtro=args.filtro,
+    )
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(relatorio, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Gera o relatório de clientes possivelmente duplicados.
+
+Uso (na raiz do projeto):
+    python -m src.cli.deduplicar --saida duplicados.ndjson --limiar 0.7
+    python -m src.cli.deduplicar --salvar
+
+Com --salvar o relatório também é gravado no banco, no lugar do anterior,
+e passa a ser o servido por GET /api/clientes/duplicados.
+
+Cada linha do relatório é um par candidato:
+    {"id_a": 1, "id_b": 7, "pontuacao": 1.0, "motivos": ["cpf", "nome"]}
+"""
+import argparse
+import json
+import sys
+import time
+
+from src.clientes.database import conexao
+from src.clientes.deduplicacao import LIMIAR_PADRAO, encontrar_duplicados, salvar_relatorio
+from src.clientes.migracoes import preparar_esquema
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lista pares de clientes que parecem ser a mesma pessoa."
+    )
+    parser.add_argument("--limiar", type=float, default=LIMIAR_PADRAO,
+                        help="pontuação mínima (0 a 1) para listar um par")
+    parser.add_argument("--processos", type=int,
+                        help="processos de comparação (padrão: nº de CPUs)")
+    parser.add_argument("--saida", help="arquivo NDJSON (padrão: stdout)")
+    parser.add_argument("--salvar", action="store_true",
+                        help="grava o relatório no banco (servido pela API)")
+    args = parser.parse_args(argv)
+
+    preparar_esquema()
+    inicio = time.perf_counter()
+    candidatos, estatisticas = encontrar_duplicados(
+        limiar=args.limiar, processos=args.processos
+    )
+    estatisticas["segundos"] = round(time.perf_counter() - inicio, 2)
+
+    if args.salvar:
+        with conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            salvar_relatorio(conn, candidatos, estatisticas, args.limiar)
+            conn.commit()
+
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    try:
+        for candidato in candidatos:
+            saida.write(json.dumps(candidato) + "\n")
+    finally:
+        if args.saida:
+            saida.close()
+    print(f"Concluído: {json.dumps(estatisticas)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Mostra as estatísticas de comandos SQL de um servidor em execução
+(GET /api/sistema/sql), em forma de tabela.
+
+Uso (na raiz do projeto):
+    python -m src.cli.estatisticas_sql --url http://127.0.0.1:5000 --ordem maximo_s
+    python -m src.cli.estatisticas_sql --planos --limite 5
+    python -m src.cli.estatisticas_sql --zerar
+"""
+import argparse
+import json
+import sys
+import urllib.parse
+import urllib.request
+
+URL_PADRAO = "http://127.0.0.1:5000"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estatísticas de comandos SQL (tempo, execuções, consultas lentas)."
+    )
+    parser.add_argument("--url", default=URL_PADRAO, help="endereço do servidor")
+    parser.add_argument("--ordem", default="segundos",
+                        choices=["segundos", "execucoes", "maximo_s", "lentas", "passos_vm"])
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--planos", action="store_true",
+                        help="mostra o plano capturado das consultas lentas")
+    parser.add_argument("--zerar", action="store_true", help="zera as estatísticas")
+    args = parser.parse_args(argv)
+
+    endereco = args.url.rstrip("/") + "/api/sistema/sql"
+    if args.zerar:
+        urllib.request.urlopen(urllib.request.Request(endereco, method="DELETE"))
+        print("Estatísticas zeradas.")
+        return
+
+    consulta = urllib.parse.urlencode({"ordem": args.ordem, "limit": args.limite})
+    with urllib.request.urlopen(f"{endereco}?{consulta}") as resposta:
+        dados = json.load(resposta)
+
+    print(f"Limite de consulta lenta: {dados['limite_lento_ms']} ms\n")
+    print(f"{'execuções':>10} {'total s':>10} {'média ms':>10} {'máx ms':>10} "
+          f"{'lentas':>7} {'passos':>12}  comando")
+    for comando in dados["comandos"]:
+        print(
+            f"{comando['execucoes']:>10} {comando['segundos']:>10.3f} "
+            f"{comando['media_ms']:>10.3f} {comando['maximo_ms']:>10.3f} "
+            f"{comando['lentas']:>7} {comando['passos_vm']:>12}  {comando['formato'][:120]}"
+        )
+        if args.planos and comando["plano"]:
+            for passo in comando["plano"]:
+                print(f"{'':>65}{passo}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Importa clientes de arquivos CSV ou NDJSON (um objeto JSON por linha).
+
+O arquivo é lido em streaming, validado em blocos num pool de processos
+e gravado com inserir_clientes_em_lote, então a memória usada não depende
+do tamanho do arquivo. O offset (em bytes) até onde o arquivo já foi
+gravado fica na tabela importacoes e é atualizado na mesma transação dos
+clientes de cada bloco; com --retomar a importação continua dali, sem
+regravar nem pular nada. (O arquivo de rejeitados fica fora da transação:
+se o processo cair no meio de um bloco, ele pode repetir rejeitados
+desse bloco.)
+
+Uso (na raiz do projeto):
+    python -m src.cli.importar parceiros.csv --delimitador ";"
+    python -m src.cli.importar parceiros.ndjson --processos 4 --retomar
+
+Linhas rejeitadas vão para <arquivo>.rejeitados.ndjson.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.clientes.database import conexao
+from src.clientes.migracoes import preparar_esquema
+from src.clientes.repository import escrita_confirmada, inserir_clientes_em_lote
+from src.clientes.service import validar_clientes
+
+BLOCO_PADRAO = 5000
+
+
+def _linhas_com_offset(arquivo, offset_inicial: int):
+    """
+    Gera (linha_decodificada, offset_apos_linha) a partir de um arquivo
+    binário, para saber exatamente até onde o arquivo já foi consumido.
+    """
+    offset = offset_inicial
+    for linha in arquivo:
+        offset += len(linha)
+        yield linha.decode("utf-8"), offset
+
+
+def ler_ndjson(caminho: str, offset: int = 0):
+    """
+    Gera (registro, offset_apos_registro) de um arquivo NDJSON.
+    Linhas que não são JSON válido viram o texto cru (e são rejeitadas
+    na validação).
+    """
+    with open(caminho, "rb") as arquivo:
+        arquivo.seek(offset)
+        for linha, fim in _linhas_com_offset(arquivo, offset):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                yield json.loads(linha), fim
+            except json.JSONDecodeError:
+                yield linha, fim
+
+
+def ler_csv(caminho: str, offset: int = 0, delimitador: str = ","):
+    """
+    Gera (registro, offset_apos_registro) de um arquivo CSV com cabeçalho.
+    """
+    with open(caminho, "rb") as arquivo:
+        cabecalho_bruto = arquivo.readline()
+        cabecalho = next(csv.reader(
+            [cabecalho_bruto.decode("utf-8-sig")], delimiter=delimitador
+        ))
+        campos = [campo.strip().lower() for campo in cabecalho]
+
+        offset = max(offset, len(cabecalho_bruto))
+        arquivo.seek(offset)
+        linhas = _linhas_com_offset(arquivo, offset)
+        ultimo_fim = [offset]
+
+        def _texto():
+            for linha, fim in linhas:
+                ultimo_fim[0] = fim
+                yield linha
+
+        for valores in csv.reader(_texto(), delimiter=delimitador):
+            if not valores:
+                continue
+            yield dict(zip(campos, valores)), ultimo_fim[0]
+
+
+def em_blocos(registros, tamanho: int):
+    """
+    Agrupa o gerador de registros em listas de até 'tamanho' itens.
+    Cada bloco é (lista_de_registros, offset_do_fim_do_bloco).
+    """
+    bloco = []
+    fim = None
+    for registro, fim in registros:
+        bloco.append(registro)
+        if len(bloco) >= tamanho:
+            yield bloco, fim
+            bloco = []
+    if bloco:
+        yield bloco, fim
+
+
+def validar_bloco(bloco):
+    """
+    Executado nos processos do pool: valida cada registro do bloco.
+    Retorna a lista de (campos, erros) na mesma ordem.
+    """
+    return validar_clientes(bloco)
+
+
+def _estado_inicial() -> dict:
+    return {"offset": 0, "registros": 0, "inseridos": 0, "rejeitados": 0}
+
+
+def ler_checkpoint(chave: str) -> dict:
+    with conexao() as conn:
+        linha = conn.execute(
+            "SELECT estado FROM importacoes WHERE chave = ?", (chave,)
+        ).fetchone()
+    return json.loads(linha[0]) if linha else _estado_inicial()
+
+
+def salvar_checkpoint(cursor, chave: str, estado: dict):
+    # Na transação do bloco (sem commit): o checkpoint só avança junto com
+    # os clientes que ele cobre.
+    cursor.execute(
+        "INSERT OR REPLACE INTO importacoes (chave, estado, atualizada_em) VALUES (?, ?, ?)",
+        (chave, json.dumps(estado), time.time()),
+    )
+
+
+def importar(
+    caminho: str,
+    formato: str = None,
+    bloco: int = BLOCO_PADRAO,
+    processos: int = None,
+    delimitador: str = ",",
+    retomar: bool = False,
+    chave_checkpoint: str = None,
+    caminho_rejeitados: str = None,
+    saida=sys.stderr,
+) -> dict:
+    """
+    Importa o arquivo e retorna o resumo (registros, inseridos, rejeitados).
+    O checkpoint é identificado por 'chave_checkpoint' (padrão: o caminho
+    absoluto do arquivo).
+    """
+    formato = formato or ("csv" if caminho.lower().endswith(".csv") else "ndjson")
+    chave_checkpoint = chave_checkpoint or os.path.abspath(caminho)
+    caminho_rejeitados = caminho_rejeitados or caminho + ".rejeitados.ndjson"
+
+    preparar_esquema()
+    estado = ler_checkpoint(chave_checkpoint) if retomar else _estado_inicial()
+    if formato == "csv":
+        registros = ler_csv(caminho, estado["offset"], delimitador)
+    elif formato == "ndjson":
+        registros = ler_ndjson(caminho, estado["offset"])
+    else:
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    total_bytes = os.path.getsize(caminho)
+    inicio = time.perf_counter()
+    registros_no_inicio = estado["registros"]
+    processos = processos or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=processos) as pool, open(
+        caminho_rejeitados, "a" if retomar else "w", encoding="utf-8"
+    ) as rejeitados:
+        # Só alguns blocos ficam em voo ao mesmo tempo (memória constante),
+        # e são gravados na ordem do arquivo (o checkpoint só avança).
+        em_voo = deque()
+        limite_em_voo = 2 * processos
+
+        def _gravar(bloco_registros, futuro, fim):
+            resultados = futuro.result()
+            validos = []
+            for posicao, (campos, erros) in enumerate(resultados):
+                numero = estado["registros"] + posicao + 1
+                if erros:
+                    _rejeitar(rejeitados, numero, bloco_registros[posicao], erros)
+                    estado["rejeitados"] += 1
+                else:
+                    validos.append((numero, posicao, campos))
+
+            with conexao() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                ids = inserir_clientes_em_lote(
+                    [campos for _, _, campos in validos], tamanho_lote=bloco, cursor=cursor
+                )
+                for (numero, posicao, _), id_cliente in zip(validos, ids):
+                    if id_cliente is None:
+                        _rejeitar(
+                            rejeitados, numero, bloco_registros[posicao],
+                            ["cpf ou email já cadastrado"],
+                        )
+                        estado["rejeitados"] += 1
+                    else:
+                        estado["inseridos"] += 1
+
+                estado["registros"] += len(bloco_registros)
+                estado["offset"] = fim
+                rejeitados.flush()
+                salvar_checkpoint(cursor, chave_checkpoint, estado)
+                conn.commit()
+            escrita_confirmada()
+            _relatar_progresso(saida, estado, registros_no_inicio, inicio, total_bytes)
+
+        for bloco_registros, fim in em_blocos(registros, bloco):
+            em_voo.append((bloco_registros, pool.submit(validar_bloco, bloco_registros), fim))
+            if len(em_voo) >= limite_em_voo:
+                _gravar(*em_voo.popleft())
+        while em_voo:
+            _gravar(*em_voo.popleft())
+
+    duracao = time.perf_counter() - inicio
+    resumo = {
+        "registros": estado["registros"],
+        "inseridos": estado["inseridos"],
+        "rejeitados": estado["rejeitados"],
+        "segundos": round(duracao, 2),
+    }
+    print(f"Concluído: {json.dumps(resumo)}", file=saida)
+    return resumo
+
+
+def _rejeitar(arquivo, numero: int, registro, erros):
+    arquivo.write(json.dumps(
+        {"registro": numero, "cliente": registro, "erros": erros},
+        ensure_ascii=False,
+    ) + "\n")
+
+
+def _relatar_progresso(saida, estado, registros_no_inicio, inicio, total_bytes):
+    decorrido = time.perf_counter() - inicio
+    processados = estado["registros"] - registros_no_inicio
+    taxa = processados / decorrido if decorrido else 0.0
+    percentual = 100.0 * estado["offset"] / total_bytes if total_bytes else 100.0
+    print(
+        f"{percentual:5.1f}% | {estado['registros']} registros | "
+        f"{estado['inseridos']} inseridos | {estado['rejeitados']} rejeitados | "
+        f"{taxa:,.0f} registros/s",
+        file=saida,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Importa clientes de um arquivo CSV ou NDJSON."
+    )
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"])
+    parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO,
+                        help="registros por bloco/transação")
+    parser.add_argument("--processos", type=int,
+                        help="processos de validação (padrão: nº de CPUs)")
+    parser.add_argument("--delimitador", default=",", help="separador do CSV")
+    parser.add_argument("--retomar", action="store_true",
+                        help="continua do último checkpoint salvo")
+    parser.add_argument("--checkpoint",
+                        help="chave do checkpoint (padrão: caminho absoluto do arquivo)")
+    parser.add_argument("--rejeitados", help="arquivo NDJSON de rejeitados")
+    args = parser.parse_args(argv)
+
+    importar(
+        args.arquivo,
+        formato=args.formato,
+        bloco=args.bloco,
+        processos=args.processos,
+        delimitador=args.delimitador,
+        retomar=args.retomar,
+        chave_checkpoint=args.checkpoint,
+        caminho_rejeitados=args.rejeitados,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Aplica as migrações pendentes do esquema (ver src/clientes/migracoes.py).
+
+Uso (na raiz do projeto):
+    python -m src.cli.migrar            # aplica todas as pendentes
+    python -m src.cli.migrar --status   # só mostra aplicadas e pendentes
+    python -m src.cli.migrar --ate 3    # aplica até a versão 3
+
+Rode antes do deploy quando os workers sobem com
+CLIENTES_MIGRAR_AO_INICIAR=0 (eles só conferem a versão).
+"""
+import argparse
+import logging
+
+from src.clientes.database import conexao
+from src.clientes.migracoes import (
+    MIGRACOES,
+    ValoresDuplicados,
+    aplicar_migracoes,
+    migracoes_aplicadas,
+)
+
+
+def mostrar_status():
+    with conexao() as conn:
+        aplicadas = {m["versao"]: m for m in migracoes_aplicadas(conn)}
+    for versao, nome, _ in MIGRACOES:
+        registro = aplicadas.get(versao)
+        if registro:
+            print(f"{versao:>4}  aplicada em {registro['aplicada_em']} "
+                  f"({registro['segundos']:.3f} s)  {nome}")
+        else:
+            print(f"{versao:>4}  pendente{' ' * 29}{nome}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações do esquema do banco.")
+    parser.add_argument("--status", action="store_true",
+                        help="lista as migrações sem aplicar nada")
+    parser.add_argument("--ate", type=int, help="última versão a aplicar")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        mostrar_status()
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        aplicadas = aplicar_migracoes(ate=args.ate)
+    except ValoresDuplicados as erro:
+        mostrar_status()
+        parser.exit(1, f"{erro}\n")
+    if not aplicadas:
+        print("Esquema já está em dia.")
+    mostrar_status()
+
+
+if __name__ == "__main__":
+    main()
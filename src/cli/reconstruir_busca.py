@@ -0,0 +1,18 @@
+"""
+Reconstrói o índice de busca por nome (FTS5) de um banco existente.
+
+Uso (na raiz do projeto):
+    python -m src.cli.reconstruir_busca
+"""
+from src.clientes.migracoes import preparar_esquema
+from src.clientes.repository import reconstruir_indice_busca
+
+
+def main():
+    preparar_esquema()
+    reconstruir_indice_busca()
+    print("Índice de busca por nome reconstruído.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Quantidade máxima de clientes individuais em cache (buscar_cliente_por_id).
+CACHE_REGISTROS_TAMANHO = int(os.environ.get("CLIENTES_CACHE_REGISTROS", "10000"))
+
+# Quantidade máxima de páginas de listagem/busca em cache.
+CACHE_PAGINAS_TAMANHO = int(os.environ.get("CLIENTES_CACHE_PAGINAS", "1000"))
+
+# Quantidade máxima de fragmentos HTML da listagem em cache.
+CACHE_FRAGMENTOS_TAMANHO = int(os.environ.get("CLIENTES_CACHE_FRAGMENTOS", "200"))
+
+# Validade (segundos) de cada entrada; 0 = sem expiração.
+# Limita o quanto um processo pode ficar desatualizado quando outro
+# processo escreve no mesmo banco.
+CACHE_TTL = float(os.environ.get("CLIENTES_CACHE_TTL", "60"))
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache em memória com despejo LRU e expiração opcional (TTL).
+
+    obter_ou_carregar() faz o "read-through": devolve o valor em cache ou
+    chama a função de carga e guarda o resultado. Se houver uma
+    invalidação enquanto a carga acontece, o resultado não é guardado
+    (evita colocar no cache um valor que já nasceu velho).
+    """
+
+    def __init__(self, tamanho: int, ttl: float = CACHE_TTL):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    def obter(self, chave):
+        """
+        Retorna o valor em cache ou None.
+        """
+        valor = self._obter(chave)
+        return None if valor is _AUSENTE else valor
+
+    def _obter(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                self.misses += 1
+                return _AUSENTE
+            valor, expira_em = item
+            if expira_em and expira_em < time.monotonic():
+                del self._dados[chave]
+                self.expirados += 1
+                self.misses += 1
+                return _AUSENTE
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, chave, valor, geracao=None):
+        """
+        Guarda um valor, despejando os menos usados se passar do tamanho.
+        Se 'geracao' for informada e o cache tiver sido invalidado desde
+        então, o valor é descartado.
+        """
+        if self.tamanho <= 0:
+            return
+        expira_em = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                return
+            self._dados[chave] = (valor, expira_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+                self.despejos += 1
+
+    def obter_ou_carregar(self, chave, carregar, guardar_se=None):
+        """
+        Read-through: retorna o valor em cache ou o resultado de carregar().
+        Resultados None não são guardados, nem quando guardar_se(), se
+        informada, devolver False depois da carga.
+        """
+        valor = self._obter(chave)
+        if valor is not _AUSENTE:
+            return valor
+        geracao = self._geracao
+        valor = carregar()
+        if valor is not None and (guardar_se is None or guardar_se()):
+            self.guardar(chave, valor, geracao=geracao)
+        return valor
+
+    def invalidar(self, chave):
+        """
+        Remove uma chave do cache.
+        """
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            self._dados.pop(chave, None)
+
+    def limpar(self):
+        """
+        Remove todas as entradas.
+        """
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            self._dados.clear()
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores do cache.
+        """
+        total = self.hits + self.misses
+        return {
+            "tamanho": self.tamanho,
+            "itens": len(self._dados),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+            "despejos": self.despejos,
+            "expirados": self.expirados,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+# Clientes por id.
+cache_registros = CacheLRU(CACHE_REGISTROS_TAMANHO)
+
+# Páginas de listagem e de busca por nome (dependem da tabela inteira,
+# então qualquer escrita limpa todas).
+cache_paginas = CacheLRU(CACHE_PAGINAS_TAMANHO)
+
+# Fragmentos HTML já renderizados da listagem. A chave inclui a versão da
+# tabela (versao_tabela()), então uma escrita faz as próximas requisições
+# procurarem outra chave e as antigas saem pelo LRU/TTL, sem limpeza.
+cache_fragmentos = CacheLRU(CACHE_FRAGMENTOS_TAMANHO)
+
+
+def invalidar_cliente(id_cliente: int):
+    """
+    Chamado depois de atualizar/excluir um cliente.
+    """
+    cache_registros.invalidar(id_cliente)
+    cache_paginas.limpar()
+
+
+def invalidar_paginas():
+    """
+    Chamado depois de inserir clientes (nenhum registro existente mudou).
+    """
+    cache_paginas.limpar()
+
+
+def estatisticas_cache() -> dict:
+    """
+    Retorna os contadores dos caches de registros, páginas e fragmentos.
+    """
+    return {
+        "registros": cache_registros.estatisticas(),
+        "paginas": cache_paginas.estatisticas(),
+        "fragmentos": cache_fragmentos.estatisticas(),
+    }
@@ -1,37 +1,572 @@
+import logging
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 # Nome do arquivo de banco de dados.
 # Ele deve estar na raiz do projeto (mesmo nível de src/).
 DB_NAME = "clientes.db"
 
+# Quantidade máxima de conexões ociosas mantidas no pool.
+# Pode ser ajustada pela variável de ambiente CLIENTES_POOL_TAMANHO.
+POOL_TAMANHO = int(os.environ.get("CLIENTES_POOL_TAMANHO", "5"))
+
+# Conexões paradas há mais tempo que isso (em segundos) passam por um
+# "SELECT 1" antes de serem reutilizadas.
+POOL_VERIFICAR_APOS = float(os.environ.get("CLIENTES_POOL_VERIFICAR_APOS", "30"))
+
+# Perfis de armazenamento: PRAGMAs aplicados em toda conexão nova.
+# - "duravel": WAL + synchronous=FULL, nenhum commit confirmado se perde.
+# - "vazao": WAL + synchronous=NORMAL, cache maior e mmap; em queda de
+#   energia pode perder os últimos commits, mas o banco não corrompe.
+PERFIS_ARMAZENAMENTO = {
+    "duravel": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,  # negativo = KiB (16 MB)
+        "mmap_size": 0,
+        "busy_timeout": 5000,  # ms
+        "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000,  # páginas
+    },
+    "vazao": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,  # 256 MB
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    },
+}
+
+# Perfil ativo (variável CLIENTES_PERFIL). Cada PRAGMA também pode ser
+# sobrescrito individualmente, ex.: CLIENTES_SQLITE_CACHE_SIZE=-32000.
+PERFIL_PADRAO = os.environ.get("CLIENTES_PERFIL", "duravel")
+
+# Intervalo (segundos) do checkpoint periódico do WAL; 0 desliga.
+CHECKPOINT_INTERVALO = float(os.environ.get("CLIENTES_CHECKPOINT_INTERVALO", "300"))
+
+
+def _montar_pragmas(perfil: str, ajustes: dict) -> dict:
+    if perfil not in PERFIS_ARMAZENAMENTO:
+        raise ValueError(f"Perfil de armazenamento desconhecido: {perfil}")
+    pragmas = dict(PERFIS_ARMAZENAMENTO[perfil])
+    for nome in pragmas:
+        valor = os.environ.get(f"CLIENTES_SQLITE_{nome.upper()}")
+        if valor is not None:
+            pragmas[nome] = valor
+    pragmas.update(ajustes)
+    return pragmas
+
+
+_perfil_ativo = PERFIL_PADRAO
+_pragmas = _montar_pragmas(PERFIL_PADRAO, {})
+
+
+def configurar_armazenamento(perfil: str = None, **ajustes) -> dict:
+    """
+    Troca o perfil de armazenamento (e/ou PRAGMAs avulsos) usado nas
+    conexões novas. As conexões já abertas no pool são descartadas.
+    Retorna os PRAGMAs que passam a valer.
+    """
+    global _perfil_ativo, _pragmas
+    _perfil_ativo = perfil or _perfil_ativo
+    _pragmas = _montar_pragmas(_perfil_ativo, ajustes)
+    _pool.fechar_todas()
+    return dict(_pragmas)
+
+
+def _aplicar_pragmas(conn):
+    for nome, valor in _pragmas.items():
+        conn.execute(f"PRAGMA {nome} = {valor}")
+
+
+# Medição de comandos SQL da thread atual (ver iniciar_medicao_sql).
+_medicao_sql = threading.local()
+
+
+def iniciar_medicao_sql():
+    """
+    Passa a contar os comandos SQL (e o tempo gasto neles) executados
+    pela thread atual, até encerrar_medicao_sql().
+    """
+    _medicao_sql.atual = [0, 0.0]
+
+
+def encerrar_medicao_sql():
+    """
+    Encerra a medição da thread atual.
+    Retorna (comandos, segundos), ou None se não havia medição ativa.
+    """
+    atual = getattr(_medicao_sql, "atual", None)
+    _medicao_sql.atual = None
+    return tuple(atual) if atual else None
+
+
+# Perfil de comandos SQL: tempo de cada comando, agregado por formato
+# (ver estatisticas_sql). CLIENTES_SQL_PERFIL=0 desliga.
+SQL_PERFIL_ATIVO = os.environ.get("CLIENTES_SQL_PERFIL", "1") != "0"
+
+# Comandos mais lentos que isso (ms) vão para o log de consultas lentas;
+# na primeira vez de cada formato o log traz também o EXPLAIN QUERY PLAN.
+SQL_LENTO_MS = float(os.environ.get("CLIENTES_SQL_LENTO_MS", "100"))
+
+# A cada quantas instruções da VM do SQLite o progress handler é chamado.
+# Serve para estimar o trabalho de cada comando ("passos_vm"): uma
+# varredura completa da tabela aparece como milhões de passos.
+SQL_PASSOS_PROGRESSO = 1000
+
+logger_sql = logging.getLogger(__name__ + ".sql")
+
+_LITERAIS_SQL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTA_PARAMETROS = re.compile(r"\?(?:\s*,\s*\?)+")
+_ESPACOS = re.compile(r"\s+")
+
+_estatisticas_sql = {}
+_lock_estatisticas_sql = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def formato_sql(sql: str) -> str:
+    """
+    "Formato" de um comando: espaços normalizados, literais trocados por ?
+    e listas de parâmetros (IN (?, ?, ?)) reduzidas a "?, ...", para que
+    variações do mesmo comando sejam agregadas juntas.
+    """
+    sql = _LITERAIS_SQL.sub("?", _ESPACOS.sub(" ", sql).strip())
+    return _LISTA_PARAMETROS.sub("?, ...", sql)
+
+
+def _redigir(parametros, em_lote: bool):
+    # Só os tipos dos parâmetros vão para o log (nunca CPF, email etc.).
+    if em_lote:
+        return "<lote>"
+    if isinstance(parametros, dict):
+        return {nome: _tipo(valor) for nome, valor in parametros.items()}
+    return [_tipo(valor) for valor in parametros or ()]
+
+
+def _tipo(valor) -> str:
+    return "NULL" if valor is None else f"<{type(valor).__name__}>"
+
+
+def _explicar(conn, sql: str, parametros, em_lote: bool):
+    """
+    Retorna o EXPLAIN QUERY PLAN do comando (uma linha por passo,
+    indentada), ou None se não for possível.
+    """
+    if em_lote:
+        if not isinstance(parametros, (list, tuple)) or not parametros:
+            return None
+        parametros = parametros[0]
+    try:
+        # Cursor simples: o EXPLAIN não entra nas estatísticas.
+        linhas = conn.cursor(sqlite3.Cursor).execute(
+            "EXPLAIN QUERY PLAN " + sql, parametros
+        ).fetchall()
+    except (sqlite3.Error, ValueError):
+        return None
+    niveis = {0: -1}
+    plano = []
+    for id_passo, pai, _, detalhe in linhas:
+        niveis[id_passo] = niveis.get(pai, -1) + 1
+        plano.append("  " * niveis[id_passo] + detalhe)
+    return plano
+
+
+def _registrar_sql(cursor, duracao: float, passos: int, nova_execucao: bool):
+    formato = formato_sql(cursor._sql)
+    with _lock_estatisticas_sql:
+        estatistica = _estatisticas_sql.get(formato)
+        if estatistica is None:
+            estatistica = _estatisticas_sql[formato] = {
+                "formato": formato, "execucoes": 0, "segundos": 0.0,
+                "maximo_s": 0.0, "lentas": 0, "passos_vm": 0, "plano": None,
+            }
+        if nova_execucao:
+            estatistica["execucoes"] += 1
+        estatistica["segundos"] += duracao
+        estatistica["passos_vm"] += passos
+        # O tempo de um comando inclui os fetch* feitos depois do execute.
+        cursor._duracao += duracao
+        cursor._passos += passos
+        if cursor._duracao > estatistica["maximo_s"]:
+            estatistica["maximo_s"] = cursor._duracao
+        lenta = not cursor._lenta and cursor._duracao * 1000 >= SQL_LENTO_MS
+        if lenta:
+            cursor._lenta = True
+            estatistica["lentas"] += 1
+            capturar_plano = estatistica["plano"] is None
+    if not lenta:
+        return
+
+    plano = None
+    if capturar_plano:
+        plano = _explicar(cursor.connection, cursor._sql, cursor._parametros, cursor._em_lote)
+        estatistica["plano"] = plano
+    logger_sql.warning(
+        "SQL lento (%.1f ms, ~%d passos): %s | parâmetros: %s%s",
+        cursor._duracao * 1000,
+        cursor._passos,
+        formato,
+        _redigir(cursor._parametros, cursor._em_lote),
+        "".join(f"\n    {passo}" for passo in plano) if plano else "",
+    )
+
+
+def estatisticas_sql(ordem: str = "segundos", limite: int = None) -> list:
+    """
+    Estatísticas agregadas por formato de comando, do maior para o menor
+    valor de 'ordem' (segundos, execucoes, maximo_s, lentas, passos_vm).
+    """
+    with _lock_estatisticas_sql:
+        itens = [dict(estatistica) for estatistica in _estatisticas_sql.values()]
+    for item in itens:
+        item["media_ms"] = round(item["segundos"] / item["execucoes"] * 1000, 3) if item["execucoes"] else 0.0
+        item["maximo_ms"] = round(item.pop("maximo_s") * 1000, 3)
+        item["segundos"] = round(item["segundos"], 6)
+    chave = "maximo_ms" if ordem == "maximo_s" else ordem
+    itens.sort(key=lambda item: item[chave], reverse=True)
+    return itens[:limite] if limite else itens
+
+
+def limpar_estatisticas_sql():
+    with _lock_estatisticas_sql:
+        _estatisticas_sql.clear()
+
+
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que mede execute/executemany/fetch*: soma na medição da thread
+    (se houver uma ativa, ver iniciar_medicao_sql) e, com o perfil ligado,
+    nas estatísticas por formato e no log de consultas lentas. Os fetch*
+    contam como parte do último comando; a iteração direta (for linha in
+    cursor) não é medida.
+    """
+
+    _sql = None
+
+    def execute(self, sql, parametros=()):
+        return self._executar(super().execute, sql, parametros, False)
+
+    def executemany(self, sql, parametros):
+        return self._executar(super().executemany, sql, parametros, True)
+
+    def fetchone(self):
+        return self._medir(super().fetchone, (), False)
+
+    def fetchmany(self, *args):
+        return self._medir(super().fetchmany, args, False)
+
+    def fetchall(self):
+        return self._medir(super().fetchall, (), False)
+
+    def _executar(self, metodo, sql, parametros, em_lote: bool):
+        self._sql = sql
+        self._parametros = parametros
+        self._em_lote = em_lote
+        self._duracao = 0.0
+        self._passos = 0
+        self._lenta = False
+        return self._medir(metodo, (sql, parametros), True)
+
+    def _medir(self, metodo, args, nova_execucao: bool):
+        medicao = getattr(_medicao_sql, "atual", None)
+        perfil = SQL_PERFIL_ATIVO and self._sql is not None
+        if medicao is None and not perfil:
+            return metodo(*args)
+
+        conn = self.connection
+        conn.passos_vm = 0
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            duracao = time.perf_counter() - inicio
+            if medicao is not None:
+                medicao[0] += nova_execucao
+                medicao[1] += duracao
+            if perfil:
+                _registrar_sql(
+                    self, duracao, conn.passos_vm * SQL_PASSOS_PROGRESSO, nova_execucao
+                )
+
+
+class ConexaoMedida(sqlite3.Connection):
+    """
+    Conexão cujos cursores são CursorMedido.
+    """
+
+    passos_vm = 0
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def _contar_passos(self):
+        # progress handler: chamado a cada SQL_PASSOS_PROGRESSO instruções.
+        self.passos_vm += 1
+
 
 def criar_conexao():
     """
-    Cria e retorna uma conexão com o banco SQLite.
+    Cria e retorna uma conexão com o banco SQLite, já com os PRAGMAs do
+    perfil de armazenamento ativo.
     """
-    conn = sqlite3.connect(DB_NAME)
+    # check_same_thread=False: a conexão pode ser devolvida ao pool por uma
+    # thread e emprestada para outra (nunca por duas ao mesmo tempo).
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, factory=ConexaoMedida)
     # Permite acessar colunas pelo nome (row["nome"])
     conn.row_factory = sqlite3.Row
+    if SQL_PERFIL_ATIVO:
+        conn.set_progress_handler(conn._contar_passos, SQL_PASSOS_PROGRESSO)
+    _aplicar_pragmas(conn)
     return conn
 
 
-def criar_tabela():
+def configuracao_armazenamento() -> dict:
+    """
+    Lê do banco os valores efetivos dos PRAGMAs do perfil ativo
+    (útil para conferir a configuração na inicialização).
+    """
+    with conexao() as conn:
+        efetivos = {
+            nome: conn.execute(f"PRAGMA {nome}").fetchone()[0] for nome in _pragmas
+        }
+    return {"perfil": _perfil_ativo, "pragmas": efetivos}
+
+
+def executar_checkpoint(modo: str = "PASSIVE") -> dict:
+    """
+    Executa um checkpoint do WAL (copia as páginas do -wal para o banco).
+    """
+    if modo not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Modo de checkpoint inválido: {modo}")
+    with conexao() as conn:
+        ocupado, paginas_wal, paginas_copiadas = conn.execute(
+            f"PRAGMA wal_checkpoint({modo})"
+        ).fetchone()
+    return {
+        "ocupado": bool(ocupado),
+        "paginas_wal": paginas_wal,
+        "paginas_copiadas": paginas_copiadas,
+    }
+
+
+_thread_checkpoint = None
+
+
+def iniciar_checkpoint_periodico(intervalo: float = CHECKPOINT_INTERVALO):
     """
-    Cria a tabela 'clientes' caso ainda não exista.
+    Inicia (uma vez por processo) uma thread daemon que roda
+    executar_checkpoint() a cada 'intervalo' segundos.
+    O autocheckpoint do SQLite só roda no commit; isso evita que o arquivo
+    -wal cresça sem limite quando há leitores longos.
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute(
+    global _thread_checkpoint
+    if intervalo <= 0 or _thread_checkpoint is not None:
+        return
+
+    def _laco():
+        while True:
+            time.sleep(intervalo)
+            try:
+                executar_checkpoint()
+            except sqlite3.Error:
+                logger.exception("Falha no checkpoint periódico do WAL.")
+
+    _thread_checkpoint = threading.Thread(
+        target=_laco, name="checkpoint-wal", daemon=True
+    )
+    _thread_checkpoint.start()
+
+
+class PoolConexoes:
+    """
+    Pool simples de conexões SQLite.
+
+    - Cada thread reaproveita a mesma conexão enquanto estiver usando
+      (chamadas aninhadas não abrem conexões novas).
+    - Com fixar()/liberar() a conexão fica presa à thread durante uma
+      requisição inteira (usado pelo Flask).
+    - Conexões ociosas ficam numa pilha de até 'tamanho' itens; o que
+      passar disso é fechado.
+    """
+
+    def __init__(self, tamanho=POOL_TAMANHO, verificar_apos=POOL_VERIFICAR_APOS):
+        self.tamanho = tamanho
+        self.verificar_apos = verificar_apos
+        self._livres = queue.LifoQueue(maxsize=max(tamanho, 1))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._db_name = DB_NAME
+        self.hits = 0
+        self.misses = 0
+        self.descartadas = 0
+        self.falhas_saude = 0
+
+    def _conexao_saudavel(self, conn) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _retirar(self):
+        # Se o DB_NAME mudou (ex.: testes), conexões antigas não servem mais.
+        if self._db_name != DB_NAME:
+            self.fechar_todas()
+            self._db_name = DB_NAME
+
+        while True:
+            try:
+                conn, devolvida_em = self._livres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    self.misses += 1
+                return criar_conexao()
+
+            parada_ha = time.monotonic() - devolvida_em
+            if parada_ha > self.verificar_apos and not self._conexao_saudavel(conn):
+                with self._lock:
+                    self.falhas_saude += 1
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                continue
+
+            with self._lock:
+                self.hits += 1
+            return conn
+
+    def _devolver(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._livres.put_nowait((conn, time.monotonic()))
+        except (queue.Full, sqlite3.Error):
+            with self._lock:
+                self.descartadas += 1
+            conn.close()
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma conexão do pool.
+        Em caso de exceção, a transação aberta é desfeita.
+        """
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            local.conn = self._retirar()
+            local.profundidade = 0
+
+        conn = local.conn
+        local.profundidade += 1
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            local.profundidade -= 1
+            if local.profundidade == 0 and not getattr(local, "fixada", False):
+                local.conn = None
+                self._devolver(conn)
+
+    def fixar(self):
         """
-        CREATE TABLE IF NOT EXISTS clientes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            email TEXT,
-            telefone TEXT,
-            cpf TEXT,
-            data_nascimento TEXT
-        )
+        Mantém a conexão da thread atual até liberar() ser chamado.
+        A conexão só é retirada do pool quando alguém realmente usá-la.
         """
+        self._local.fixada = True
+
+    def liberar(self):
+        """
+        Desfaz o fixar() e devolve a conexão da thread atual ao pool.
+        """
+        local = self._local
+        local.fixada = False
+        conn = getattr(local, "conn", None)
+        if conn is not None and getattr(local, "profundidade", 0) == 0:
+            local.conn = None
+            self._devolver(conn)
+
+    def fechar_todas(self):
+        """
+        Fecha todas as conexões ociosas do pool.
+        """
+        while True:
+            try:
+                conn, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores do pool.
+        """
+        total = self.hits + self.misses
+        return {
+            "tamanho": self.tamanho,
+            "livres": self._livres.qsize(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_hit": round(self.hits / total, 4) if total else 0.0,
+            "descartadas": self.descartadas,
+            "falhas_saude": self.falhas_saude,
+        }
+
+
+_pool = PoolConexoes()
+
+
+def configurar_pool(tamanho=None, verificar_apos=None):
+    """
+    Recria o pool global com novos parâmetros.
+    """
+    global _pool
+    _pool.fechar_todas()
+    _pool = PoolConexoes(
+        tamanho=POOL_TAMANHO if tamanho is None else tamanho,
+        verificar_apos=POOL_VERIFICAR_APOS if verificar_apos is None else verificar_apos,
     )
-    conn.commit()
-    conn.close()
+    return _pool
+
+
+def obter_pool() -> PoolConexoes:
+    """
+    Retorna o pool global de conexões.
+    """
+    return _pool
+
+
+def conexao():
+    """
+    Atalho para obter_pool().conexao().
+    Uso: with conexao() as conn: ...
+    """
+    return _pool.conexao()
+
+
+def estatisticas_pool() -> dict:
+    """
+    Retorna os contadores (hits/misses) do pool global.
+    """
+    return _pool.estatisticas()
+
@@ -0,0 +1,349 @@
+"""
+Detecção de clientes duplicados por "blocking".
+
+Em vez de comparar todos com todos (O(n²)), cada cliente recebe algumas
+chaves de bloco:
+- CPF normalizado (só dígitos);
+- parte local do email (antes do @), em minúsculas;
+- chave fonética do nome + data de nascimento (normalizada, em ISO, a
+  mesma de nascimento_iso).
+
+Só clientes que dividem ao menos um bloco são comparados. Os blocos são
+distribuídos entre processos e os pares com pontuação acima do limiar
+viram candidatos a mesclagem.
+
+O relatório é caro: roda no comando src.cli.deduplicar ou numa tarefa em
+segundo plano, que gravam o resultado (salvar_relatorio); a API só lê o
+último relatório gravado (ler_relatorio).
+"""
+import json
+import os
+import re
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, Optional
+
+from .database import conexao
+from .repository import exportar_clientes
+from .validators import normalizar_cpf, normalizar_data, normalizar_email
+
+# Pontuação mínima (0 a 1) para um par virar candidato.
+LIMIAR_PADRAO = 0.6
+
+# Blocos maiores que isso são ignorados (ex.: email "contato@..." usado
+# por centenas de clientes): compará-los voltaria a ser quadrático.
+TAMANHO_MAXIMO_BLOCO = 200
+
+# Blocos enviados por tarefa a cada processo.
+BLOCOS_POR_TAREFA = 2000
+
+# Linhas preparadas (normalização + chaves) por tarefa.
+LINHAS_POR_TAREFA = 20000
+
+# Peso de cada evidência na pontuação do par.
+PESOS = {
+    "cpf": 0.6,
+    "email": 0.4,
+    "email_local": 0.15,
+    "nome": 0.4,
+    "data_nascimento": 0.3,
+}
+
+_PARTICULAS = {"DA", "DE", "DO", "DAS", "DOS", "E"}
+
+# Substituições da chave fonética, aplicadas em ordem.
+_REGRAS_FONETICAS = (
+    (re.compile(r"PH"), "F"),
+    (re.compile(r"LH"), "L"),
+    (re.compile(r"NH"), "N"),
+    (re.compile(r"[CS]H"), "X"),
+    (re.compile(r"SC(?=[EI])"), "S"),
+    (re.compile(r"C(?=[EI])"), "S"),
+    (re.compile(r"G(?=[EI])"), "J"),
+    (re.compile(r"QU?|CK?|K"), "K"),
+    (re.compile(r"Z"), "S"),
+    (re.compile(r"Y"), "I"),
+    (re.compile(r"W"), "V"),
+    (re.compile(r"H"), ""),
+    (re.compile(r"(?<=.)[AEIOU]"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+)
+
+
+def sem_acentos(texto: str) -> str:
+    """
+    Remove acentos e cedilha ("Conceição" -> "Conceicao").
+    """
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def normalizar_nome(nome: str) -> str:
+    """
+    Nome sem acentos, em minúsculas e com espaços simples.
+    """
+    return " ".join(sem_acentos(nome or "").lower().split())
+
+
+def chave_fonetica(nome: str) -> str:
+    """
+    Chave fonética simplificada para nomes em português: primeiro e
+    último nome (sem partículas "da", "dos"...), com grafias de mesmo som
+    unificadas ("Luiz Felipe" e "Luis Phelipe" geram a mesma chave).
+    """
+    palavras = [
+        palavra for palavra in re.findall(r"[A-Z]+", sem_acentos(nome or "").upper())
+        if palavra not in _PARTICULAS
+    ]
+    if not palavras:
+        return ""
+
+    chaves = []
+    for palavra in (palavras[0], palavras[-1]) if len(palavras) > 1 else palavras:
+        for padrao, troca in _REGRAS_FONETICAS:
+            palavra = padrao.sub(troca, palavra)
+        chaves.append(palavra)
+    return " ".join(chaves)
+
+
+def preparar_registro(linha) -> tuple:
+    """
+    Converte uma linha (id, nome, email, telefone, cpf, data_nascimento)
+    no registro compacto usado na comparação:
+    (id, nome_normalizado, email_normalizado, cpf_digitos, nascimento_iso).
+    """
+    id_cliente, nome, email, _, cpf, data_nascimento = linha
+    return (
+        id_cliente,
+        normalizar_nome(nome),
+        normalizar_email(email),
+        normalizar_cpf(cpf),
+        normalizar_data((data_nascimento or "").strip()),
+    )
+
+
+def chaves_de_bloco(registro, nome_original: str):
+    """
+    Gera as chaves de bloco de um registro preparado.
+    """
+    _, _, email, cpf, nascimento_iso = registro
+    if cpf:
+        yield ("cpf", cpf)
+    if email:
+        local = email.split("@", 1)[0]
+        if local:
+            yield ("email_local", local)
+    if nascimento_iso:
+        fonetica = chave_fonetica(nome_original)
+        if fonetica:
+            yield ("fonetico", fonetica, nascimento_iso)
+
+
+def pontuar_par(a, b):
+    """
+    Compara dois registros preparados.
+    Retorna (pontuacao, motivos) com pontuação entre 0 e 1.
+    """
+    pontuacao = 0.0
+    motivos = []
+
+    if a[3] and a[3] == b[3]:
+        pontuacao += PESOS["cpf"]
+        motivos.append("cpf")
+    if a[2] and a[2] == b[2]:
+        pontuacao += PESOS["email"]
+        motivos.append("email")
+    elif a[2] and b[2] and a[2].split("@", 1)[0] == b[2].split("@", 1)[0]:
+        pontuacao += PESOS["email_local"]
+        motivos.append("email_local")
+    if a[4] and a[4] == b[4]:
+        pontuacao += PESOS["data_nascimento"]
+        motivos.append("data_nascimento")
+
+    similaridade = SequenceMatcher(None, a[1], b[1]).ratio() if a[1] and b[1] else 0.0
+    pontuacao += PESOS["nome"] * similaridade
+    if similaridade >= 0.9:
+        motivos.append("nome")
+
+    return min(pontuacao, 1.0), motivos
+
+
+def comparar_blocos(blocos, limiar: float = LIMIAR_PADRAO):
+    """
+    Executado nos processos: compara os pares dentro de cada bloco.
+    Retorna [(id_a, id_b, pontuacao, motivos), ...] acima do limiar.
+    """
+    candidatos = []
+    for registros in blocos:
+        for i, a in enumerate(registros):
+            for b in registros[i + 1:]:
+                pontuacao, motivos = pontuar_par(a, b)
+                if pontuacao >= limiar:
+                    id_a, id_b = sorted((a[0], b[0]))
+                    candidatos.append((id_a, id_b, round(pontuacao, 4), motivos))
+    return candidatos
+
+
+def preparar_linhas(linhas):
+    """
+    Executado nos processos: prepara um lote de linhas.
+    Retorna [(registro, [chaves_de_bloco]), ...].
+    """
+    preparados = []
+    for linha in linhas:
+        registro = preparar_registro(linha)
+        preparados.append((registro, list(chaves_de_bloco(registro, linha[1]))))
+    return preparados
+
+
+def _em_lotes(linhas, tamanho: int):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def montar_blocos(lotes_preparados, tamanho_maximo: int = TAMANHO_MAXIMO_BLOCO):
+    """
+    Agrupa os registros preparados (saída de preparar_linhas) por chave.
+    Retorna (blocos, estatisticas), onde cada bloco é a lista de registros
+    que dividem a chave (só blocos com 2+ registros).
+    """
+    registros = []
+    indices_por_chave = {}
+    for preparados in lotes_preparados:
+        for registro, chaves in preparados:
+            posicao = len(registros)
+            registros.append(registro)
+            for chave in chaves:
+                indices_por_chave.setdefault(chave, []).append(posicao)
+
+    blocos = []
+    ignorados = 0
+    for indices in indices_por_chave.values():
+        if len(indices) < 2:
+            continue
+        if len(indices) > tamanho_maximo:
+            ignorados += 1
+            continue
+        blocos.append([registros[i] for i in indices])
+
+    estatisticas = {
+        "clientes": len(registros),
+        "blocos": len(blocos),
+        "blocos_ignorados": ignorados,
+        "comparacoes": sum(len(b) * (len(b) - 1) // 2 for b in blocos),
+    }
+    return blocos, estatisticas
+
+
+def encontrar_duplicados(limiar: float = LIMIAR_PADRAO, processos: int = None,
+                         linhas=None):
+    """
+    Roda a detecção completa sobre a tabela clientes (ou sobre 'linhas',
+    se informadas). Com processos=1 tudo roda no processo atual.
+    Retorna (candidatos, estatisticas); cada candidato é um dict
+    {"id_a", "id_b", "pontuacao", "motivos"}, do mais provável ao menos.
+    """
+    processos = processos or os.cpu_count() or 1
+    lotes = _em_lotes(
+        exportar_clientes() if linhas is None else linhas, LINHAS_POR_TAREFA
+    )
+
+    if processos == 1:
+        blocos, estatisticas = montar_blocos(map(preparar_linhas, lotes))
+        resultados = [
+            comparar_blocos(blocos[i:i + BLOCOS_POR_TAREFA], limiar)
+            for i in range(0, len(blocos), BLOCOS_POR_TAREFA)
+        ]
+    else:
+        # Importado só aqui: multiprocessing pesa na inicialização da app.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            blocos, estatisticas = montar_blocos(pool.map(preparar_linhas, lotes))
+            tarefas = [
+                blocos[i:i + BLOCOS_POR_TAREFA]
+                for i in range(0, len(blocos), BLOCOS_POR_TAREFA)
+            ]
+            resultados = pool.map(comparar_blocos, tarefas, [limiar] * len(tarefas))
+
+    # O mesmo par pode aparecer em vários blocos (ex.: mesmo CPF e mesmo
+    # email): fica uma entrada só.
+    pares = {}
+    for candidatos in resultados:
+        for id_a, id_b, pontuacao, motivos in candidatos:
+            pares[(id_a, id_b)] = (pontuacao, motivos)
+
+    candidatos = [
+        {"id_a": id_a, "id_b": id_b, "pontuacao": pontuacao, "motivos": motivos}
+        for (id_a, id_b), (pontuacao, motivos) in pares.items()
+    ]
+    candidatos.sort(key=lambda c: (-c["pontuacao"], c["id_a"], c["id_b"]))
+    estatisticas["candidatos"] = len(candidatos)
+    return candidatos, estatisticas
+
+
+def salvar_relatorio(conn, candidatos, estatisticas: dict, limiar: float) -> int:
+    """
+    Grava o relatório de encontrar_duplicados() no lugar do anterior, na
+    transação de 'conn' (sem commit). Retorna o id do relatório.
+    """
+    conn.execute("DELETE FROM duplicados_candidatos")
+    conn.execute("DELETE FROM duplicados_relatorio")
+    id_relatorio = conn.execute(
+        "INSERT INTO duplicados_relatorio (limiar, estatisticas, gerado_em) VALUES (?, ?, ?)",
+        (limiar, json.dumps(estatisticas), time.time()),
+    ).lastrowid
+    conn.executemany(
+        """
+        INSERT INTO duplicados_candidatos
+            (relatorio_id, posicao, id_a, id_b, pontuacao, motivos)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            (id_relatorio, posicao, c["id_a"], c["id_b"], c["pontuacao"], json.dumps(c["motivos"]))
+            for posicao, c in enumerate(candidatos)
+        ),
+    )
+    return id_relatorio
+
+
+def ler_relatorio(limite: int, apos: int = -1,
+                  limiar: float = None) -> Optional[Dict[str, Any]]:
+    """
+    Uma página do último relatório gravado: até 'limite' candidatos de
+    posição maior que 'apos', só os com pontuação >= 'limiar' (se
+    informado). Retorna None se nenhum relatório foi gerado ainda.
+    """
+    with conexao() as conn:
+        relatorio = conn.execute(
+            "SELECT id, limiar, estatisticas, gerado_em FROM duplicados_relatorio"
+        ).fetchone()
+        if relatorio is None:
+            return None
+        linhas = conn.execute(
+            """
+            SELECT posicao, id_a, id_b, pontuacao, motivos FROM duplicados_candidatos
+            WHERE relatorio_id = ? AND posicao > ? AND pontuacao >= ?
+            ORDER BY posicao
+            LIMIT ?
+            """,
+            (relatorio["id"], apos, limiar or 0, limite + 1),
+        ).fetchall()
+
+    return {
+        "limiar": relatorio["limiar"],
+        "gerado_em": relatorio["gerado_em"],
+        "estatisticas": json.loads(relatorio["estatisticas"]),
+        "candidatos": [
+            {"id_a": id_a, "id_b": id_b, "pontuacao": pontuacao, "motivos": json.loads(motivos)}
+            for _, id_a, id_b, pontuacao, motivos in linhas[:limite]
+        ],
+        "proxima_posicao": linhas[limite - 1][0] if len(linhas) > limite else None,
+    }
@@ -0,0 +1,199 @@
+"""
+Escrita agrupada ("group commit") para o SQLite.
+
+Com CLIENTES_ESCRITA_AGRUPADA=1, inserir_cliente, atualizar_cliente e
+excluir_cliente não fazem mais o próprio commit: colocam a escrita numa
+fila e esperam o resultado. Uma única thread escritora tira da fila até
+GRUPO_MAXIMO escritas (esperando no máximo GRUPO_JANELA_MS pela
+próxima), executa todas numa transação só, cada uma no seu SAVEPOINT, e
+faz um commit (um fsync) para o grupo inteiro.
+
+Quem chamou só recebe o resultado depois do commit, então a garantia de
+durabilidade é a mesma do modo normal. A falha de uma escrita (ex.: CPF
+repetido) desfaz só o SAVEPOINT dela; as outras do grupo seguem.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .database import criar_conexao
+
+logger = logging.getLogger(__name__)
+
+# Liga o modo de escrita agrupada (desligado por padrão).
+ESCRITA_AGRUPADA = os.environ.get("CLIENTES_ESCRITA_AGRUPADA", "0") == "1"
+
+# Máximo de escritas por commit.
+GRUPO_MAXIMO = int(os.environ.get("CLIENTES_GRUPO_MAXIMO", "256"))
+
+# Quanto (em ms) a thread escritora espera por mais escritas antes de
+# fechar um grupo. As que já estão na fila entram sem espera; com 0 o
+# grupo é só o que se acumulou durante o commit anterior. Só se espera
+# quando o grupo anterior teve mais de uma escrita (há concorrência),
+# para não atrasar escritas isoladas.
+GRUPO_JANELA_MS = float(os.environ.get("CLIENTES_GRUPO_JANELA_MS", "1"))
+
+_PARAR = object()
+
+
+class FilaEscrita:
+    """
+    Fila de escritas atendida por uma thread escritora com conexão própria.
+    """
+
+    def __init__(self, grupo_maximo: int = GRUPO_MAXIMO,
+                 janela_ms: float = GRUPO_JANELA_MS):
+        self.grupo_maximo = max(1, grupo_maximo)
+        self.janela = max(0.0, janela_ms) / 1000
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.grupos = 0
+        self.escritas = 0
+        self.falhas = 0
+        self.maior_grupo = 0
+        self._ultimo_grupo = 0
+
+    def executar(self, escrever, *args, depois=None):
+        """
+        Enfileira escrever(cursor, *args) e espera o commit do grupo.
+        Retorna o valor devolvido por escrever (ou repassa sua exceção).
+        depois(resultado), se informada, roda na thread escritora logo
+        após o commit, antes de liberar quem chamou (ex.: invalidar caches).
+        """
+        futuro = Future()
+        self._iniciar()
+        self._fila.put((escrever, args, depois, futuro))
+        return futuro.result()
+
+    def _iniciar(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._laco, name="escrita-agrupada", daemon=True
+                )
+                self._thread.start()
+
+    def _proximo_grupo(self) -> list:
+        grupo = [self._fila.get()]
+        janela = self.janela if self._ultimo_grupo > 1 else 0.0
+        prazo = time.monotonic() + janela
+        while len(grupo) < self.grupo_maximo and grupo[-1] is not _PARAR:
+            try:
+                grupo.append(self._fila.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                grupo.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return grupo
+
+    def _laco(self):
+        conn = criar_conexao()
+        cursor = conn.cursor()
+        while True:
+            grupo = self._proximo_grupo()
+            parar = grupo[-1] is _PARAR
+            if parar:
+                grupo.pop()
+            if grupo:
+                self._gravar_grupo(conn, cursor, grupo)
+            if parar:
+                conn.close()
+                return
+
+    def _gravar_grupo(self, conn, cursor, grupo: list):
+        self._ultimo_grupo = len(grupo)
+        resultados = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for escrever, args, depois, futuro in grupo:
+                cursor.execute("SAVEPOINT escrita")
+                try:
+                    resultados.append((futuro, depois, escrever(cursor, *args), None))
+                    cursor.execute("RELEASE escrita")
+                except Exception as erro:  # vai para quem pediu a escrita
+                    cursor.execute("ROLLBACK TO escrita")
+                    cursor.execute("RELEASE escrita")
+                    resultados.append((futuro, depois, None, erro))
+            conn.commit()
+        except Exception as erro:
+            # Falhou a transação inteira (ex.: disco cheio): ninguém do
+            # grupo teve a escrita confirmada.
+            if conn.in_transaction:
+                conn.rollback()
+            logger.exception("Falha no commit de um grupo de %s escritas.", len(grupo))
+            for *_, futuro in grupo:
+                futuro.set_exception(erro)
+            self.falhas += len(grupo)
+            return
+
+        self.grupos += 1
+        self.escritas += len(grupo)
+        self.maior_grupo = max(self.maior_grupo, len(grupo))
+        for futuro, depois, resultado, erro in resultados:
+            if erro is not None:
+                self.falhas += 1
+                futuro.set_exception(erro)
+                continue
+            if depois is not None:
+                try:
+                    depois(resultado)
+                except Exception:
+                    logger.exception("Falha ao finalizar uma escrita agrupada.")
+            futuro.set_result(resultado)
+
+    def encerrar(self):
+        """
+        Grava o que estiver na fila e para a thread escritora.
+        """
+        if self._thread is None:
+            return
+        self._fila.put(_PARAR)
+        self._thread.join()
+        self._thread = None
+
+    def estatisticas(self) -> dict:
+        """
+        Contadores de grupos e escritas.
+        """
+        return {
+            "ativa": self._thread is not None,
+            "grupo_maximo": self.grupo_maximo,
+            "janela_ms": self.janela * 1000,
+            "na_fila": self._fila.qsize(),
+            "grupos": self.grupos,
+            "escritas": self.escritas,
+            "falhas": self.falhas,
+            "media_por_grupo": round(self.escritas / self.grupos, 2) if self.grupos else 0.0,
+            "maior_grupo": self.maior_grupo,
+        }
+
+
+_fila_escrita = FilaEscrita()
+atexit.register(_fila_escrita.encerrar)
+
+
+def obter_fila_escrita() -> FilaEscrita:
+    """
+    Retorna a fila de escrita global.
+    """
+    return _fila_escrita
+
+
+def estatisticas_escrita() -> dict:
+    """
+    Contadores da fila de escrita global (e se o modo está ligado).
+    """
+    return {"habilitada": ESCRITA_AGRUPADA, **_fila_escrita.estatisticas()}
@@ -0,0 +1,637 @@
+"""
+Migrações versionadas do esquema do banco.
+
+Cada migração é uma função numerada em MIGRACOES (sempre em ordem
+crescente; nunca renumere nem altere uma que já foi publicada, crie uma
+nova). A tabela schema_versao registra as que já rodaram.
+
+Na inicialização, preparar_esquema() só lê a versão do banco: se ela já
+for a última, nenhum DDL é executado.
+
+Cada migração roda numa transação (BEGIN IMMEDIATE) que termina com o
+seu registro em schema_versao. A exceção são os backfills
+(backfill_em_lotes): eles confirmam o DDL feito até ali e gravam cada
+lote numa transação curta, para uma tabela grande não ficar travada
+durante o backfill inteiro; o resto da migração e o registro em
+schema_versao vêm numa última transação, depois do backfill. Por isso
+as migrações precisam ser idempotentes (IF NOT EXISTS, backfill só do
+que falta): uma migração interrompida no meio roda de novo do começo e
+continua de onde parou.
+
+Só um processo migra por vez: quem aplica uma migração segura uma trava
+(tabela schema_trava), renovada a cada lote do backfill. Os outros
+esperam a migração ser registrada, ou a trava ficar sem sinal de vida
+por MIGRACAO_ABANDONADA_APOS segundos (processo que caiu) e assumi-la.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from .database import conexao
+from .validators import normalizar_cpf, normalizar_data, normalizar_email
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas e atualizadas por transação nos backfills: cada lote é um
+# commit curto, então o lock de escrita nunca fica preso o backfill todo.
+BACKFILL_LOTE = 5000
+
+# Trava de migração sem renovação há mais que isso (segundos) é de um
+# processo que caiu e pode ser assumida por outro.
+MIGRACAO_ABANDONADA_APOS = float(os.environ.get("CLIENTES_MIGRACAO_ABANDONADA_APOS", "60"))
+
+# Intervalo (segundos) entre duas conferências de quem espera a trava.
+MIGRACAO_ESPERA = 0.5
+
+# Grupos de duplicados listados em ValoresDuplicados.
+DUPLICADOS_LISTADOS = 20
+
+# Com 0, a aplicação não migra sozinha: se o banco estiver atrasado, a
+# inicialização falha (rode python -m src.cli.migrar antes do deploy).
+MIGRAR_AO_INICIAR = os.environ.get("CLIENTES_MIGRAR_AO_INICIAR", "1") != "0"
+
+
+class EsquemaDesatualizado(Exception):
+    """
+    O banco está numa versão anterior à esperada e a migração automática
+    está desligada.
+    """
+
+    def __init__(self, versao_banco, versao_esperada):
+        super().__init__(
+            f"Esquema do banco na versão {versao_banco}, esperada {versao_esperada}. "
+            "Rode: python -m src.cli.migrar"
+        )
+        self.versao_banco = versao_banco
+        self.versao_esperada = versao_esperada
+
+
+class ValoresDuplicados(Exception):
+    """
+    A coluna tem valores repetidos e o índice único não pode ser criado.
+    'grupos' são listas de ids de clientes com o mesmo valor.
+    """
+
+    def __init__(self, coluna: str, grupos: list):
+        exemplos = "; ".join(", ".join(map(str, ids)) for ids in grupos)
+        super().__init__(
+            f"Valores duplicados em clientes.{coluna} (ids: {exemplos}). Mescle ou "
+            "corrija esses clientes e rode as migrações de novo."
+        )
+        self.coluna = coluna
+        self.grupos = grupos
+
+
+class TravaPerdida(Exception):
+    """
+    A trava da migração foi assumida por outro processo (esta foi dada
+    como abandonada); a migração deste processo para.
+    """
+
+
+# Dono da trava de migração na thread atual (ver aplicar_migracoes).
+_trava = threading.local()
+
+
+def _renovar_trava(conn):
+    # Na transação aberta: confirma que a trava ainda é nossa e renova.
+    cursor = conn.execute(
+        "UPDATE schema_trava SET atualizada_em = ? WHERE id = 1 AND dono = ?",
+        (time.time(), _trava.dono),
+    )
+    if cursor.rowcount != 1:
+        raise TravaPerdida("A trava da migração foi assumida por outro processo.")
+
+
+def backfill_em_lotes(conn, colunas: str, atualizacao: str, calcular,
+                      onde: str = None, lote: int = BACKFILL_LOTE) -> int:
+    """
+    Percorre a tabela clientes por id, 'lote' linhas por vez, lendo
+    'colunas' (o id vem sempre primeiro) das linhas que atendem 'onde' (só
+    as que ainda precisam do valor novo) e executando 'atualizacao' com os
+    parâmetros de calcular(linha) seguidos do id. Linhas para as quais
+    calcular() só devolve None não são regravadas.
+    Faz commit do que a migração já fez (o DDL) e grava cada lote numa
+    transação curta própria, renovando a trava da migração; com 'onde',
+    um backfill interrompido continua de onde parou. Termina com uma
+    transação aberta (BEGIN IMMEDIATE) para o resto da migração.
+    Retorna quantas linhas foram atualizadas.
+    """
+    filtro = f" AND ({onde})" if onde else ""
+    total = 0
+    ultimo_id = 0
+    conn.commit()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        linhas = conn.execute(
+            f"SELECT id, {colunas} FROM clientes WHERE id > ?{filtro} ORDER BY id LIMIT ?",
+            (ultimo_id, lote),
+        ).fetchall()
+        if not linhas:
+            break
+        parametros = []
+        for linha in linhas:
+            valores = calcular(linha)
+            if any(valor is not None for valor in valores):
+                parametros.append((*valores, linha[0]))
+        conn.executemany(atualizacao, parametros)
+        _renovar_trava(conn)
+        conn.commit()
+        total += len(parametros)
+        ultimo_id = linhas[-1][0]
+    return total
+
+
+def _colunas(conn) -> set:
+    return {row[1] for row in conn.execute("PRAGMA table_info(clientes)")}
+
+
+# ============================
+# MIGRAÇÕES
+# ============================
+
+def criar_tabela_clientes(conn):
+    """
+    Tabela 'clientes' e o índice que sustenta a paginação ordenada por
+    nome (ver ORDENACOES em repository.py).
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            email TEXT,
+            telefone TEXT,
+            cpf TEXT,
+            data_nascimento TEXT
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome_id ON clientes (nome, id)"
+    )
+
+
+# Triggers que mantêm 'clientes_fts' em dia com 'clientes'.
+_TRIGGERS_BUSCA = (
+    """
+    CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+        INSERT INTO clientes_fts (rowid, nome) VALUES (new.id, new.nome);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+        INSERT INTO clientes_fts (clientes_fts, rowid, nome)
+        VALUES ('delete', old.id, old.nome);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clientes_fts_au AFTER UPDATE OF nome ON clientes BEGIN
+        INSERT INTO clientes_fts (clientes_fts, rowid, nome)
+        VALUES ('delete', old.id, old.nome);
+        INSERT INTO clientes_fts (rowid, nome) VALUES (new.id, new.nome);
+    END
+    """,
+)
+
+
+def criar_indice_busca(conn):
+    """
+    Cria a tabela FTS5 'clientes_fts' (busca por nome) e os triggers que a
+    mantêm sincronizada com 'clientes'.
+    O tokenizador unicode61 ignora maiúsculas e acentos ("Joao" acha "João").
+    Se o SQLite não tiver FTS5, não faz nada e a busca usa LIKE.
+    """
+    ja_existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'"
+    ).fetchone()
+    if ja_existia:
+        return
+
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE clientes_fts USING fts5(
+                nome,
+                content = 'clientes',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        return
+
+    for trigger in _TRIGGERS_BUSCA:
+        conn.execute(trigger)
+    # Bancos que já tinham clientes: indexa o que existe antes dos triggers.
+    conn.execute("INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')")
+
+
+def criar_colunas_normalizadas(conn):
+    """
+    Colunas 'cpf_digitos' (só números) e 'email_normalizado' (minúsculas),
+    usadas nas buscas por CPF/email, com índices únicos. Preenche as linhas
+    que ainda não têm os valores (bancos antigos) com backfill_em_lotes().
+    """
+    colunas = _colunas(conn)
+    for coluna in ("cpf_digitos", "email_normalizado"):
+        if coluna not in colunas:
+            conn.execute(f"ALTER TABLE clientes ADD COLUMN {coluna} TEXT")
+
+    backfill_em_lotes(
+        conn,
+        "cpf, email",
+        "UPDATE clientes SET cpf_digitos = COALESCE(cpf_digitos, ?), "
+        "email_normalizado = COALESCE(email_normalizado, ?) WHERE id = ?",
+        lambda row: (normalizar_cpf(row[1]), normalizar_email(row[2])),
+        onde="(cpf_digitos IS NULL AND cpf IS NOT NULL AND cpf <> '') "
+             "OR (email_normalizado IS NULL AND email IS NOT NULL AND email <> '')",
+    )
+
+    _criar_indices_unicos(conn)
+
+
+def _criar_indices_unicos(conn):
+    # Índices únicos de cpf_digitos e email_normalizado (o upsert por CPF
+    # depende do primeiro). Com duplicados no banco, a migração falha com
+    # os ids em conflito: a unicidade nunca é abandonada em silêncio.
+    indices_unicos = {
+        row[1]: bool(row[2]) for row in conn.execute("PRAGMA index_list(clientes)")
+    }
+    for nome_indice, coluna in (
+        ("idx_clientes_cpf_digitos", "cpf_digitos"),
+        ("idx_clientes_email_normalizado", "email_normalizado"),
+    ):
+        if indices_unicos.get(nome_indice):
+            continue
+        duplicados = conn.execute(
+            f"""
+            SELECT group_concat(id, ',') FROM clientes
+            WHERE {coluna} IS NOT NULL
+            GROUP BY {coluna} HAVING COUNT(*) > 1
+            ORDER BY MIN(id)
+            LIMIT ?
+            """,
+            (DUPLICADOS_LISTADOS,),
+        ).fetchall()
+        if duplicados:
+            raise ValoresDuplicados(
+                coluna, [sorted(int(i) for i in ids.split(",")) for (ids,) in duplicados]
+            )
+        conn.execute(f"DROP INDEX IF EXISTS {nome_indice}")
+        conn.execute(
+            f"CREATE UNIQUE INDEX {nome_indice} "
+            f"ON clientes ({coluna}) WHERE {coluna} IS NOT NULL"
+        )
+
+
+def criar_controle_versao(conn):
+    """
+    Controle de versões usado nos ETags da API:
+    - coluna 'versao' em cada cliente (1 ao inserir, +1 a cada UPDATE,
+      incrementada por atualizar_cliente);
+    - contador da tabela inteira em clientes_controle (chave 'versao'),
+      incrementado por triggers em qualquer INSERT/UPDATE/DELETE.
+    """
+    if "versao" not in _colunas(conn):
+        conn.execute(
+            "ALTER TABLE clientes ADD COLUMN versao INTEGER NOT NULL DEFAULT 1"
+        )
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS clientes_controle (
+            chave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO clientes_controle (chave, valor) VALUES ('versao', 0)"
+    )
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS clientes_versao_{evento.lower()}
+            AFTER {evento} ON clientes BEGIN
+                UPDATE clientes_controle SET valor = valor + 1 WHERE chave = 'versao';
+            END
+            """
+        )
+
+
+def chaves_nascimento(data_nascimento) -> tuple:
+    """
+    (nascimento_iso, nascimento_mmdd) de uma data dd/mm/aaaa: a data em
+    ISO (aaaa-mm-dd) e mês * 100 + dia (ex.: 5 de março = 305), usado
+    nas buscas de aniversariantes. (None, None) se a data for vazia ou
+    inválida.
+    """
+    iso = normalizar_data(data_nascimento)
+    if iso is None:
+        return None, None
+    return iso, int(iso[5:7]) * 100 + int(iso[8:10])
+
+
+def criar_colunas_nascimento(conn):
+    """
+    Colunas 'nascimento_iso' e 'nascimento_mmdd' (ver chaves_nascimento),
+    preenchidas nas escritas por repository.py, com índices (coluna, id)
+    para as consultas por faixa de idade e de aniversário.
+    """
+    colunas = _colunas(conn)
+    if "nascimento_iso" not in colunas:
+        conn.execute("ALTER TABLE clientes ADD COLUMN nascimento_iso TEXT")
+    if "nascimento_mmdd" not in colunas:
+        conn.execute("ALTER TABLE clientes ADD COLUMN nascimento_mmdd INTEGER")
+
+    backfill_em_lotes(
+        conn,
+        "data_nascimento",
+        "UPDATE clientes SET nascimento_iso = ?, nascimento_mmdd = ? WHERE id = ?",
+        lambda row: chaves_nascimento(row[1]),
+        onde="nascimento_iso IS NULL AND data_nascimento IS NOT NULL AND data_nascimento <> ''",
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nascimento "
+        "ON clientes (nascimento_iso, id) WHERE nascimento_iso IS NOT NULL"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clientes_aniversario "
+        "ON clientes (nascimento_mmdd, id) WHERE nascimento_mmdd IS NOT NULL"
+    )
+
+
+def criar_tabelas_tarefas(conn):
+    """
+    Tabelas das tarefas em segundo plano (tarefas.py): a tarefa e seu
+    progresso, os blocos de itens ainda a processar e as falhas por item.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tarefas (
+            id TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            processados INTEGER NOT NULL DEFAULT 0,
+            proximo_bloco INTEGER NOT NULL DEFAULT 0,
+            contadores TEXT NOT NULL DEFAULT '{}',
+            falhas INTEGER NOT NULL DEFAULT 0,
+            segundos REAL NOT NULL DEFAULT 0,
+            cancelar INTEGER NOT NULL DEFAULT 0,
+            erro TEXT,
+            criada_em REAL NOT NULL,
+            iniciada_em REAL,
+            atualizada_em REAL,
+            concluida_em REAL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON tarefas (estado, criada_em)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tarefas_blocos (
+            tarefa_id TEXT NOT NULL,
+            bloco INTEGER NOT NULL,
+            itens TEXT NOT NULL,
+            PRIMARY KEY (tarefa_id, bloco)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tarefas_falhas (
+            tarefa_id TEXT NOT NULL,
+            indice INTEGER NOT NULL,
+            erros TEXT NOT NULL,
+            item TEXT,
+            PRIMARY KEY (tarefa_id, indice)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def criar_tabela_importacoes(conn):
+    """
+    Checkpoint das importações (src/cli/importar.py): até onde cada arquivo
+    já foi gravado, atualizado na mesma transação dos clientes do bloco.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS importacoes (
+            chave TEXT PRIMARY KEY,
+            estado TEXT NOT NULL,
+            atualizada_em REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def criar_tabelas_duplicados(conn):
+    """
+    Último relatório de duplicados (deduplicacao.py), gerado pelo comando
+    src.cli.deduplicar ou por uma tarefa em segundo plano e servido por
+    GET /api/clientes/duplicados.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS duplicados_relatorio (
+            id INTEGER PRIMARY KEY,
+            limiar REAL NOT NULL,
+            estatisticas TEXT NOT NULL,
+            gerado_em REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS duplicados_candidatos (
+            relatorio_id INTEGER NOT NULL,
+            posicao INTEGER NOT NULL,
+            id_a INTEGER NOT NULL,
+            id_b INTEGER NOT NULL,
+            pontuacao REAL NOT NULL,
+            motivos TEXT NOT NULL,
+            PRIMARY KEY (relatorio_id, posicao)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def garantir_indices_unicos(conn):
+    """
+    Bancos migrados por versões antigas da migração 3 podem ter ficado com
+    índices sem UNIQUE (havia duplicados): recria os índices únicos, ou
+    falha com os ids em conflito (ValoresDuplicados).
+    """
+    _criar_indices_unicos(conn)
+
+
+# (versão, descrição, função). Só acrescente no final.
+MIGRACOES = (
+    (1, "tabela clientes e índice por nome", criar_tabela_clientes),
+    (2, "índice de busca por nome (FTS5)", criar_indice_busca),
+    (3, "colunas normalizadas de CPF e email", criar_colunas_normalizadas),
+    (4, "controle de versões (ETags)", criar_controle_versao),
+    (5, "datas de nascimento indexadas", criar_colunas_nascimento),
+    (6, "tarefas em segundo plano", criar_tabelas_tarefas),
+    (7, "checkpoint das importações", criar_tabela_importacoes),
+    (8, "relatório de duplicados", criar_tabelas_duplicados),
+    (9, "índices únicos de CPF e email", garantir_indices_unicos),
+)
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+# ============================
+# EXECUÇÃO
+# ============================
+
+def versao_esquema(conn) -> int:
+    """
+    Versão do esquema do banco (0 se nunca foi migrado).
+    """
+    try:
+        row = conn.execute("SELECT MAX(versao) FROM schema_versao").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def migracoes_aplicadas(conn) -> list:
+    """
+    Histórico de schema_versao: dicts com versao, nome, aplicada_em e
+    segundos.
+    """
+    try:
+        linhas = conn.execute(
+            "SELECT versao, nome, aplicada_em, segundos FROM schema_versao ORDER BY versao"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [dict(zip(("versao", "nome", "aplicada_em", "segundos"), linha)) for linha in linhas]
+
+
+def _assumir_trava(conn, versao: int) -> bool:
+    """
+    Abre a transação da migração 'versao' com a trava assumida. Espera
+    enquanto outro processo vivo segura a trava. Retorna False (sem
+    transação aberta) se a migração já foi registrada.
+    """
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        if versao_esquema(conn) >= versao:
+            conn.rollback()
+            return False
+        trava = conn.execute(
+            "SELECT versao, dono, atualizada_em FROM schema_trava WHERE id = 1"
+        ).fetchone()
+        agora = time.time()
+        if (trava is None or trava[1] == _trava.dono
+                or trava[2] < agora - MIGRACAO_ABANDONADA_APOS):
+            if trava is not None and trava[1] != _trava.dono:
+                logger.warning(
+                    "Assumindo a trava abandonada da migração %s (de %s).", trava[0], trava[1]
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO schema_trava (id, versao, dono, atualizada_em) "
+                "VALUES (1, ?, ?, ?)",
+                (versao, _trava.dono, agora),
+            )
+            return True
+        conn.rollback()
+        time.sleep(MIGRACAO_ESPERA)
+
+
+def aplicar_migracoes(ate: int = None) -> list:
+    """
+    Aplica, em ordem, as migrações pendentes (até a versão 'ate', se
+    informada). Retorna a lista das aplicadas (versao, nome, segundos).
+    """
+    aplicadas = []
+    _trava.dono = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    with conexao() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_versao (
+                versao INTEGER PRIMARY KEY,
+                nome TEXT NOT NULL,
+                aplicada_em TEXT NOT NULL,
+                segundos REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_trava (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                versao INTEGER NOT NULL,
+                dono TEXT NOT NULL,
+                atualizada_em REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+        for versao, nome, migrar in MIGRACOES:
+            if ate is not None and versao > ate:
+                break
+            if not _assumir_trava(conn, versao):
+                continue
+            inicio = time.perf_counter()
+            try:
+                migrar(conn)
+                segundos = time.perf_counter() - inicio
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                _renovar_trava(conn)
+                conn.execute(
+                    "INSERT OR IGNORE INTO schema_versao (versao, nome, aplicada_em, segundos) "
+                    "VALUES (?, ?, ?, ?)",
+                    (versao, nome, datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     round(segundos, 3)),
+                )
+                conn.execute("DELETE FROM schema_trava WHERE id = 1")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                # Solta a trava para outro processo tentar de novo (o que
+                # o backfill já gravou fica e não é refeito).
+                conn.execute(
+                    "DELETE FROM schema_trava WHERE id = 1 AND dono = ?", (_trava.dono,)
+                )
+                conn.commit()
+                raise
+            logger.info("Migração %s (%s) aplicada em %.3f s.", versao, nome, segundos)
+            aplicadas.append({"versao": versao, "nome": nome, "segundos": round(segundos, 3)})
+    return aplicadas
+
+
+def preparar_esquema(migrar: bool = MIGRAR_AO_INICIAR) -> int:
+    """
+    Chamado na inicialização: lê a versão do banco e, se estiver atrasada,
+    aplica as migrações (ou levanta EsquemaDesatualizado com migrar=False).
+    Com o banco em dia, é uma única consulta. Retorna a versão final.
+    """
+    with conexao() as conn:
+        versao = versao_esquema(conn)
+    if versao > VERSAO_ATUAL:
+        logger.warning(
+            "Esquema do banco (versão %s) é mais novo que o deste código (%s).",
+            versao,
+            VERSAO_ATUAL,
+        )
+    if versao >= VERSAO_ATUAL:
+        return versao
+    if not migrar:
+        raise EsquemaDesatualizado(versao, VERSAO_ATUAL)
+    aplicar_migracoes()
+    return VERSAO_ATUAL
@@ -0,0 +1,377 @@
+"""
+Réplica de leitura em memória (CLIENTES_REPLICA=1).
+
+Uma thread copia o clientes.db inteiro para um banco em memória com a API
+de backup do SQLite e as consultas só de leitura do repositório
+(conexao_leitura) passam a ler dessa cópia, sem disputar o arquivo com
+os escritores. Cada cópia é um banco em memória compartilhado
+("file:...?mode=memory&cache=shared"). Uma requisição abre uma conexão
+com a cópia mais recente na primeira leitura e a fecha ao terminar
+(encerrar_leitura); fora de requisição, cada leitura abre e fecha a sua.
+Assim nenhuma conexão parada segura na memória uma cópia antiga inteira.
+
+Quando a réplica é atualizada:
+- a cada REPLICA_INTERVALO segundos, se PRAGMA data_version mostrar que
+  alguém (qualquer processo) fez commit no arquivo;
+- logo após uma escrita deste processo (notificar_escrita), respeitando
+  REPLICA_INTERVALO_MINIMO entre duas cópias.
+
+Quando a leitura vai para o banco principal:
+- a réplica não foi conferida há mais de REPLICA_ATRASO_MAXIMO segundos;
+- a thread atual fez uma escrita que a cópia ainda não tem;
+- a requisição pediu consistência forte, ou exige uma versão da tabela
+  que a réplica ainda não tem (ver iniciar_leitura: é assim que quem
+  escreveu lê a própria escrita nas requisições seguintes).
+
+O que foi lido de uma cópia anterior à última escrita deste processo não
+vai para os caches (ver leitura_guardavel), senão quem escreveu poderia
+receber o valor antigo de lá.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import database
+from .cache import cache_paginas, cache_registros
+from .database import conexao, criar_conexao
+
+logger = logging.getLogger(__name__)
+
+# Liga a réplica de leitura em memória (desligada por padrão).
+REPLICA_LEITURA = os.environ.get("CLIENTES_REPLICA", "0") == "1"
+
+# De quanto em quanto tempo (segundos) conferir se o arquivo mudou.
+REPLICA_INTERVALO = float(os.environ.get("CLIENTES_REPLICA_INTERVALO", "1"))
+
+# Espaço mínimo (segundos) entre duas cópias, para uma rajada de escritas
+# não virar uma cópia por escrita.
+REPLICA_INTERVALO_MINIMO = float(os.environ.get("CLIENTES_REPLICA_INTERVALO_MINIMO", "0.5"))
+
+# Atraso máximo (segundos) aceito: réplica não conferida há mais tempo que
+# isso não é usada.
+REPLICA_ATRASO_MAXIMO = float(os.environ.get("CLIENTES_REPLICA_ATRASO_MAXIMO", "5"))
+
+_local = threading.local()
+
+
+class ReplicaMemoria:
+    """
+    Cópia em memória do banco, atualizada por uma thread própria.
+    """
+
+    def __init__(self, intervalo: float = REPLICA_INTERVALO,
+                 intervalo_minimo: float = REPLICA_INTERVALO_MINIMO,
+                 atraso_maximo: float = REPLICA_ATRASO_MAXIMO):
+        self.intervalo = intervalo
+        self.intervalo_minimo = intervalo_minimo
+        self.atraso_maximo = atraso_maximo
+        self._lock = threading.Lock()
+        # Protege a troca de cópia: uma thread leitora nunca pode abrir a
+        # URI de uma cópia já fechada (abriria um banco vazio).
+        self._troca = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._monitor = None
+        self._ancora = None
+        self._uri = None
+        self._data_version = None
+        self.geracao = 0
+        self.versao = None
+        self.copiada_em = 0.0
+        self.conferida_em = 0.0
+        self._escritas = 0
+        self._escritas_na_copia = 0
+        self.copias = 0
+        self.segundos_copiando = 0.0
+        self._contadores = threading.Lock()
+        self.leituras_replica = 0
+        self.leituras_principal = 0
+
+    def iniciar(self):
+        """
+        Faz a primeira cópia e inicia a thread de atualização.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Conexão sem medição: o PRAGMA periódico não entra em /api/sistema/sql.
+            self._monitor = sqlite3.connect(database.DB_NAME, check_same_thread=False)
+            self.atualizar()
+            self._thread = threading.Thread(
+                target=self._laco, name="replica-leitura", daemon=True
+            )
+            self._thread.start()
+
+    def _laco(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            espera = self.copiada_em + self.intervalo_minimo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                self.atualizar()
+            except sqlite3.Error:
+                logger.exception("Falha ao atualizar a réplica de leitura.")
+
+    def atualizar(self, forcar: bool = False) -> bool:
+        """
+        Copia o banco para uma nova réplica se ele mudou desde a última
+        cópia (ou se 'forcar'). Retorna True se copiou.
+        """
+        inicio = time.monotonic()
+        escritas = self._escritas
+        data_version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+        if (not forcar and self._ancora is not None
+                and data_version == self._data_version and escritas == self._escritas_na_copia):
+            self.conferida_em = inicio
+            return False
+
+        uri = f"file:clientes-replica-{os.getpid()}-{self.geracao + 1}?mode=memory&cache=shared"
+        destino = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._monitor.backup(destino)
+        versao = destino.execute(
+            "SELECT valor FROM clientes_controle WHERE chave = 'versao'"
+        ).fetchone()
+        versao = versao[0] if versao else 0
+
+        with self._troca:
+            anterior = self._ancora
+            self._ancora, self._uri = destino, uri
+            self._data_version = data_version
+            self._escritas_na_copia = escritas
+            mudou = versao != self.versao
+            self.versao = versao
+            self.copiada_em = self.conferida_em = inicio
+            self.geracao += 1
+            if anterior is not None:
+                # A memória da cópia antiga é liberada quando a última
+                # conexão aberta com ela (de uma requisição) for fechada.
+                anterior.close()
+        self.copias += 1
+        self.segundos_copiando += time.monotonic() - inicio
+        if mudou and anterior is not None:
+            # Os caches podem ter sido preenchidos com a cópia antiga
+            # (ex.: escrita de outro processo).
+            cache_registros.limpar()
+            cache_paginas.limpar()
+        return True
+
+    def notificar_escrita(self):
+        """
+        Chamada depois de cada commit de escrita deste processo: antecipa
+        a próxima cópia.
+        """
+        self._escritas += 1
+        self._acordar.set()
+
+    def utilizavel(self, versao_minima: int = None, escritas_minimas: int = 0) -> bool:
+        """
+        Se a leitura pode ir para a réplica (ver o docstring do módulo).
+        """
+        if self._ancora is None or self._escritas_na_copia < escritas_minimas:
+            return False
+        if time.monotonic() - self.conferida_em > self.atraso_maximo:
+            return False
+        return versao_minima is None or self.versao >= versao_minima
+
+    def contar_leitura(self, na_replica: bool):
+        """
+        Conta uma leitura (da réplica ou do banco principal).
+        """
+        with self._contadores:
+            if na_replica:
+                self.leituras_replica += 1
+            else:
+                self.leituras_principal += 1
+
+    def conexao_da_requisicao(self):
+        """
+        Conexão da requisição atual com a réplica: a primeira leitura abre
+        uma com a cópia mais recente e as seguintes continuam nela, para a
+        requisição ver um só estado. Fechada por encerrar_leitura().
+        """
+        conn = getattr(_local, "conn", None)
+        if conn is None:
+            conn, _, _local.escritas_na_copia = self.abrir_conexao()
+            _local.conn = conn
+        return conn
+
+    def abrir_conexao(self) -> tuple:
+        """
+        Abre uma conexão (só leitura) com a cópia atual. Retorna (conexão,
+        geração da cópia, escritas deste processo que a cópia já contém).
+        """
+        with self._troca:
+            conn = sqlite3.connect(
+                self._uri, uri=True, check_same_thread=False, factory=database.ConexaoMedida
+            )
+            geracao, escritas = self.geracao, self._escritas_na_copia
+        conn.row_factory = sqlite3.Row
+        if database.SQL_PERFIL_ATIVO:
+            conn.set_progress_handler(conn._contar_passos, database.SQL_PASSOS_PROGRESSO)
+        conn.execute("PRAGMA query_only = ON")
+        return conn, geracao, escritas
+
+    def estatisticas(self) -> dict:
+        """
+        Idade, versão e contadores da réplica.
+        """
+        agora = time.monotonic()
+        with self._contadores:
+            leituras_replica, leituras_principal = self.leituras_replica, self.leituras_principal
+        total = leituras_replica + leituras_principal
+        return {
+            "ativa": self._thread is not None,
+            "geracao": self.geracao,
+            "versao": self.versao,
+            "idade_s": round(agora - self.copiada_em, 3) if self._ancora else None,
+            "conferida_ha_s": round(agora - self.conferida_em, 3) if self._ancora else None,
+            "escrita_pendente": self._escritas != self._escritas_na_copia,
+            "intervalo_s": self.intervalo,
+            "atraso_maximo_s": self.atraso_maximo,
+            "copias": self.copias,
+            "media_copia_ms": round(1000 * self.segundos_copiando / self.copias, 2) if self.copias else 0.0,
+            "leituras_replica": leituras_replica,
+            "leituras_principal": leituras_principal,
+            "taxa_replica": round(leituras_replica / total, 4) if total else 0.0,
+        }
+
+
+_replica = ReplicaMemoria()
+
+
+def obter_replica() -> ReplicaMemoria:
+    """
+    Retorna a réplica global.
+    """
+    return _replica
+
+
+def iniciar_replica():
+    """
+    Inicia a réplica se CLIENTES_REPLICA=1. Chamada ao iniciar a aplicação.
+    """
+    if REPLICA_LEITURA:
+        _replica.iniciar()
+
+
+def notificar_escrita():
+    """
+    Avisa a réplica de um commit de escrita (sem efeito se desligada).
+    """
+    if REPLICA_LEITURA:
+        _replica.notificar_escrita()
+        lembrar_escrita()
+
+
+def lembrar_escrita():
+    """
+    A thread atual passa a só ler de cópias que tenham todas as escritas
+    já notificadas (ex.: depois de uma escrita feita pela fila de escrita
+    agrupada, cuja notificação roda na thread escritora).
+    """
+    if REPLICA_LEITURA:
+        _local.escritas = _replica._escritas
+
+
+def iniciar_leitura(forte: bool = False, versao_minima: int = None):
+    """
+    Define a consistência das leituras da requisição atual: 'forte' manda
+    tudo para o banco principal; 'versao_minima' só aceita a réplica se ela
+    já tiver essa versão da tabela (leia-suas-escritas entre processos).
+    A primeira leitura escolhe a fonte e ela vale até encerrar_leitura(),
+    para a requisição inteira (e seu ETag) ver um só estado do banco.
+    """
+    _local.em_requisicao = True
+    _local.forte = forte
+    _local.versao_minima = versao_minima
+    _local.usar_replica = None
+
+
+def encerrar_leitura():
+    """
+    Desfaz iniciar_leitura() (fim da requisição) e fecha a conexão da
+    requisição com a réplica, se abriu uma.
+    """
+    _local.em_requisicao = False
+    _local.forte = False
+    _local.versao_minima = None
+    _local.usar_replica = None
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
+def _usar_replica() -> bool:
+    if not REPLICA_LEITURA or getattr(_local, "forte", False):
+        return False
+    escritas = getattr(_local, "escritas", 0)
+    if not getattr(_local, "em_requisicao", False):
+        return _replica.utilizavel(escritas_minimas=escritas)
+    if _local.usar_replica is None:
+        _local.usar_replica = _replica.utilizavel(_local.versao_minima, escritas)
+    return _local.usar_replica
+
+
+@contextmanager
+def conexao_leitura():
+    """
+    Conexão para consultas só de leitura: a réplica, quando ligada e em
+    dia, ou o banco principal (conexao()).
+    Uso: with conexao_leitura() as conn: ...
+    """
+    if _usar_replica():
+        _replica.contar_leitura(True)
+        if getattr(_local, "em_requisicao", False):
+            conn = _replica.conexao_da_requisicao()
+            _local.copia_atrasada = _local.escritas_na_copia != _replica._escritas
+            yield conn
+            return
+        conn, _, escritas = _replica.abrir_conexao()
+        _local.copia_atrasada = escritas != _replica._escritas
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+    _local.copia_atrasada = False
+    if REPLICA_LEITURA:
+        _replica.contar_leitura(False)
+    with conexao() as conn:
+        yield conn
+
+
+def leitura_guardavel() -> bool:
+    """
+    Se o resultado da última leitura da thread pode ir para um cache: não
+    pode quando veio de uma cópia sem as últimas escritas deste processo.
+    """
+    return not getattr(_local, "copia_atrasada", False)
+
+
+def nova_conexao_leitura():
+    """
+    Conexão nova, que quem chamou deve fechar, para leituras longas (ex.:
+    a exportação): com a cópia em memória quando ela pode ser usada, senão
+    com o banco principal (criar_conexao()).
+    """
+    if _usar_replica():
+        _replica.contar_leitura(True)
+        return _replica.abrir_conexao()[0]
+    if REPLICA_LEITURA:
+        _replica.contar_leitura(False)
+    return criar_conexao()
+
+
+def estatisticas_replica() -> dict:
+    """
+    Contadores da réplica global (e se o modo está ligado).
+    """
+    return {"habilitada": REPLICA_LEITURA, **_replica.estatisticas()}
@@ -1,99 +1,920 @@
-from .database import criar_conexao
+import base64
+import json
+import re
+import sqlite3
+from datetime import date, timedelta
 
+from .cache import cache_registros, cache_paginas, invalidar_cliente, invalidar_paginas
+from .database import conexao
+from .escrita import ESCRITA_AGRUPADA, obter_fila_escrita
+from .migracoes import chaves_nascimento, criar_indice_busca
+from .replica import (
+    conexao_leitura,
+    leitura_guardavel,
+    lembrar_escrita,
+    notificar_escrita,
+    nova_conexao_leitura,
+)
+from .validators import normalizar_cpf, normalizar_email
 
-def inserir_cliente(nome, email, telefone, cpf, data_nascimento):
+# Paginação: limites aceitos para listar_clientes_pagina().
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+# Máximo de parâmetros por "IN (...)" nas buscas em lote.
+TAMANHO_LOTE_BUSCA = 500
+
+# Linhas por transação em inserir_clientes_em_lote().
+TAMANHO_LOTE_INSERCAO = 1000
+
+# Linhas lidas do cursor por vez em exportar_clientes().
+TAMANHO_BLOCO_EXPORTACAO = 1000
+
+# Maior idade aceita por listar_por_idade().
+IDADE_MAXIMA = 150
+
+# Colunas públicas de um cliente, na ordem dos SELECTs.
+COLUNAS_CLIENTE = ("id", "nome", "email", "telefone", "cpf", "data_nascimento")
+
+# Ordenações aceitas pela paginação e as colunas da chave (sempre
+# terminando em id, para desempate). Cada uma tem um índice com as mesmas
+# colunas, criado pelas migrações (migracoes.py).
+ORDENACOES = {
+    "id": ("id",),
+    "nome": ("nome", "id"),
+}
+
+
+class VersaoDesatualizada(Exception):
     """
-    Insere um novo cliente na tabela.
+    A escrita foi condicionada a uma versão do cliente que não é mais a
+    atual (outra requisição alterou o registro antes).
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
+
+    def __init__(self, id_cliente, versao_esperada, versao_atual):
+        super().__init__(
+            f"Cliente {id_cliente} está na versão {versao_atual}, "
+            f"não na {versao_esperada}."
+        )
+        self.id_cliente = id_cliente
+        self.versao_esperada = versao_esperada
+        self.versao_atual = versao_atual
+
+
+_SQL_INSERIR = """
+    INSERT INTO clientes (
+        nome, email, telefone, cpf, data_nascimento,
+        cpf_digitos, email_normalizado, nascimento_iso, nascimento_mmdd
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _parametros_insercao(nome, email, telefone, cpf, data_nascimento) -> tuple:
+    return (
+        nome, email, telefone, cpf, data_nascimento,
+        normalizar_cpf(cpf), normalizar_email(email),
+        *chaves_nascimento(data_nascimento),
+    )
+
+
+# Colunas devolvidas pelas escritas (mesmas de buscar_cliente_por_id).
+_SQL_RETORNO = " RETURNING id, nome, email, telefone, cpf, data_nascimento, versao"
+
+# INSERT/UPDATE ... RETURNING existe a partir do SQLite 3.35.
+_SUPORTA_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _executar_retornando(cursor, sql, parametros, id_cliente=None):
+    # Executa a escrita e devolve a linha afetada na mesma conexão, sem
+    # consultar a tabela de novo quando o SQLite suporta RETURNING.
+    if _SUPORTA_RETURNING:
+        cursor.execute(sql + _SQL_RETORNO, parametros)
+        linhas = cursor.fetchall()
+        return linhas[0] if linhas else None
+
+    cursor.execute(sql, parametros)
+    if cursor.rowcount == 0:
+        return None
     cursor.execute(
         """
-        INSERT INTO clientes (nome, email, telefone, cpf, data_nascimento)
-        VALUES (?, ?, ?, ?, ?)
+        SELECT id, nome, email, telefone, cpf, data_nascimento, versao
+        FROM clientes
+        WHERE id = ?
         """,
-        (nome, email, telefone, cpf, data_nascimento),
+        (cursor.lastrowid if id_cliente is None else id_cliente,),
     )
-    conn.commit()
-    conn.close()
+    return cursor.fetchone()
+
+
+def _apos_escrever(id_cliente: int = None):
+    # Depois de todo commit de escrita. A réplica é avisada antes de limpar
+    # os caches: uma leitura da cópia antiga que comece depois disso não
+    # devolve o valor antigo ao cache (ver replica.leitura_guardavel).
+    notificar_escrita()
+    if id_cliente is None:
+        invalidar_paginas()
+    else:
+        invalidar_cliente(id_cliente)
+
+
+def inserir_cliente(nome, email, telefone, cpf, data_nascimento):
+    """
+    Insere um novo cliente na tabela e retorna o registro criado.
+    Com a escrita agrupada ligada (escrita.py), o commit é feito junto com
+    o de outras escritas concorrentes.
+    """
+    parametros = _parametros_insercao(nome, email, telefone, cpf, data_nascimento)
+    if ESCRITA_AGRUPADA:
+        resultado = obter_fila_escrita().executar(
+            _executar_retornando, _SQL_INSERIR, parametros,
+            depois=lambda _: _apos_escrever(),
+        )
+        lembrar_escrita()
+        return resultado
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        resultado = _executar_retornando(cursor, _SQL_INSERIR, parametros)
+        conn.commit()
+    _apos_escrever()
+    return resultado
+
+
+def escrita_confirmada(registros_alterados: bool = False):
+    """
+    Avisa a réplica e invalida os caches depois do commit de quem gravou
+    com um cursor próprio (inserir_clientes_em_lote/upsert_clientes_por_cpf
+    com 'cursor'). 'registros_alterados': clientes existentes mudaram.
+    """
+    if registros_alterados:
+        cache_registros.limpar()
+    _apos_escrever()
+
+
+def _inserir_lote_no_cursor(cursor, lote) -> list:
+    # Na transação já aberta do cursor, sem commit. Retorna os ids (None
+    # para os que repetiram um CPF/email já cadastrado).
+    cursor.execute("SAVEPOINT lote_insercao")
+    try:
+        cursor.executemany(_SQL_INSERIR, lote)
+        # A transação segura o lock de escrita do começo ao fim e a
+        # tabela usa AUTOINCREMENT: os ids do lote são consecutivos.
+        ultimo_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        ids = list(range(ultimo_id - len(lote) + 1, ultimo_id + 1))
+    except sqlite3.IntegrityError:
+        # Algum CPF/email repetido: desfaz o lote e refaz linha a linha
+        # (ainda na mesma transação) para saber quais falharam.
+        cursor.execute("ROLLBACK TO lote_insercao")
+        ids = []
+        for parametros in lote:
+            try:
+                cursor.execute(_SQL_INSERIR, parametros)
+                ids.append(cursor.lastrowid)
+            except sqlite3.IntegrityError:
+                ids.append(None)
+    cursor.execute("RELEASE lote_insercao")
+    return ids
+
+
+def inserir_clientes_em_lote(clientes, tamanho_lote: int = TAMANHO_LOTE_INSERCAO,
+                             cursor=None):
+    """
+    Insere vários clientes com executemany, em transações de até
+    'tamanho_lote' linhas (um commit por transação, não por cliente).
+    'clientes' é uma lista de tuplas (nome, email, telefone, cpf, data_nascimento).
+    Retorna uma lista alinhada com 'clientes' com o id gerado de cada um,
+    ou None para os que repetiram um CPF/email já cadastrado.
+    Com 'cursor', grava tudo na transação já aberta (BEGIN IMMEDIATE) de
+    quem chamou, sem commit: quem chamou faz o commit e depois chama
+    escrita_confirmada().
+    """
+    if tamanho_lote < 1:
+        raise ValueError("O tamanho do lote deve ser maior que zero.")
+    if cursor is not None:
+        return _inserir_lote_no_cursor(
+            cursor, [_parametros_insercao(*cliente) for cliente in clientes]
+        )
+
+    ids = []
+    with conexao() as conn:
+        cursor = conn.cursor()
+        for inicio in range(0, len(clientes), tamanho_lote):
+            lote = [
+                _parametros_insercao(*cliente)
+                for cliente in clientes[inicio:inicio + tamanho_lote]
+            ]
+            cursor.execute("BEGIN IMMEDIATE")
+            ids.extend(_inserir_lote_no_cursor(cursor, lote))
+            conn.commit()
+            _apos_escrever()
+    return ids
+
+
+# Upsert por CPF: insere ou, se o CPF já existir, atualiza os dados. O
+# WHERE do DO UPDATE não regrava (nem muda a versão de) quem veio igual.
+_SQL_UPSERT_POR_CPF = _SQL_INSERIR + """
+    ON CONFLICT (cpf_digitos) WHERE cpf_digitos IS NOT NULL DO UPDATE SET
+        nome = excluded.nome,
+        email = excluded.email,
+        telefone = excluded.telefone,
+        cpf = excluded.cpf,
+        data_nascimento = excluded.data_nascimento,
+        email_normalizado = excluded.email_normalizado,
+        nascimento_iso = excluded.nascimento_iso,
+        nascimento_mmdd = excluded.nascimento_mmdd,
+        versao = versao + 1
+    WHERE (nome, email, telefone, cpf, data_nascimento)
+        IS NOT (excluded.nome, excluded.email, excluded.telefone,
+                excluded.cpf, excluded.data_nascimento)
+"""
+
+# Situação de cada cliente em upsert_clientes_por_cpf().
+INSERIDO, ATUALIZADO, INALTERADO, FALHOU = "inserido", "atualizado", "inalterado", "falhou"
+
+
+def _ids_por_cpf(cursor, cpfs_digitos) -> dict:
+    # {cpf_digitos: (id, (nome, email, telefone, cpf, data_nascimento))}
+    encontrados = {}
+    for inicio in range(0, len(cpfs_digitos), TAMANHO_LOTE_BUSCA):
+        lote = cpfs_digitos[inicio:inicio + TAMANHO_LOTE_BUSCA]
+        cursor.execute(
+            f"""
+            SELECT cpf_digitos, id, nome, email, telefone, cpf, data_nascimento
+            FROM clientes
+            WHERE cpf_digitos IN ({", ".join("?" for _ in lote)})
+            """,
+            lote,
+        )
+        for row in cursor.fetchall():
+            encontrados[row[0]] = (row[1], tuple(row[2:]))
+    return encontrados
+
+
+def _upsert_linha_a_linha(cursor, lote) -> tuple:
+    # Refaz o lote um cliente por vez: a situação e o id de cada um saem do
+    # que de fato aconteceu (um CPF repetido cuja primeira ocorrência falhou
+    # é comparado com o que está no banco, não com a que falhou).
+    estado = _ids_por_cpf(cursor, list({p[5] for p in lote}))
+    resultados = []
+    alterou = False
+    for parametros in lote:
+        atual = estado.get(parametros[5])
+        if atual is not None and atual[1] == parametros[:5]:
+            resultados.append((INALTERADO, atual[0]))
+            continue
+        try:
+            cursor.execute(_SQL_UPSERT_POR_CPF, parametros)
+        except sqlite3.IntegrityError:
+            resultados.append((FALHOU, None))
+            continue
+        id_cliente = atual[0] if atual is not None else cursor.lastrowid
+        estado[parametros[5]] = (id_cliente, parametros[:5])
+        resultados.append((ATUALIZADO if atual is not None else INSERIDO, id_cliente))
+        alterou = True
+    return resultados, alterou
+
+
+def _upsert_lote_no_cursor(cursor, lote) -> tuple:
+    """
+    Upsert de um lote (parâmetros de _parametros_insercao) na transação já
+    aberta do cursor, sem commit. Retorna ([(situacao, id), ...], alterou).
+    """
+    atuais = _ids_por_cpf(cursor, list({p[5] for p in lote}))
+    situacoes = []
+    gravar = []
+    for parametros in lote:
+        atual = atuais.get(parametros[5])
+        if atual is None:
+            situacoes.append(INSERIDO)
+        elif atual[1] == parametros[:5]:
+            situacoes.append(INALTERADO)
+            continue
+        else:
+            situacoes.append(ATUALIZADO)
+        # CPF repetido no mesmo lote: compara com a versão anterior.
+        atuais[parametros[5]] = (atual and atual[0], parametros[:5])
+        gravar.append(parametros)
+
+    cursor.execute("SAVEPOINT lote_upsert")
+    try:
+        cursor.executemany(_SQL_UPSERT_POR_CPF, gravar)
+    except sqlite3.IntegrityError:
+        # Algum email de outro cliente: desfaz o lote e refaz linha a linha
+        # (na mesma transação) para saber quais falharam.
+        cursor.execute("ROLLBACK TO lote_upsert")
+        cursor.execute("RELEASE lote_upsert")
+        return _upsert_linha_a_linha(cursor, lote)
+    cursor.execute("RELEASE lote_upsert")
+
+    # Sem falhas, a situação calculada antes é a que foi gravada; falta só
+    # o id de quem foi inserido.
+    inseridos = [p[5] for p, situacao in zip(lote, situacoes) if situacao == INSERIDO]
+    if inseridos:
+        for cpf_digitos, (id_cliente, _) in _ids_por_cpf(cursor, inseridos).items():
+            atuais[cpf_digitos] = (id_cliente, None)
+    resultados = [
+        (situacao, atuais[parametros[5]][0]) for parametros, situacao in zip(lote, situacoes)
+    ]
+    return resultados, bool(gravar)
+
+
+def upsert_clientes_por_cpf(clientes, tamanho_lote: int = TAMANHO_LOTE_INSERCAO,
+                            cursor=None):
+    """
+    Insere ou atualiza vários clientes usando o CPF normalizado como chave
+    (INSERT ... ON CONFLICT DO UPDATE), em transações de até 'tamanho_lote'
+    linhas. 'clientes' é uma lista de tuplas (nome, email, telefone, cpf,
+    data_nascimento), todas com CPF.
+    Quem veio igual ao que já está no banco não é regravado.
+    Retorna uma lista alinhada com 'clientes' de (situacao, id), com
+    situacao INSERIDO, ATUALIZADO, INALTERADO ou FALHOU (ex.: email de
+    outro cliente; id None).
+    Com 'cursor', grava tudo na transação já aberta (BEGIN IMMEDIATE) de
+    quem chamou, sem commit: quem chamou faz o commit e depois chama
+    escrita_confirmada(registros_alterados=True).
+    """
+    if tamanho_lote < 1:
+        raise ValueError("O tamanho do lote deve ser maior que zero.")
+    if cursor is not None:
+        return _upsert_lote_no_cursor(
+            cursor, [_parametros_insercao(*cliente) for cliente in clientes]
+        )[0]
+
+    resultados = []
+    alterou = False
+    with conexao() as conn:
+        cursor = conn.cursor()
+        for inicio in range(0, len(clientes), tamanho_lote):
+            lote = [
+                _parametros_insercao(*cliente)
+                for cliente in clientes[inicio:inicio + tamanho_lote]
+            ]
+            # BEGIN IMMEDIATE: ninguém escreve entre a leitura dos atuais e
+            # o upsert, então a situação calculada é a que foi gravada.
+            cursor.execute("BEGIN IMMEDIATE")
+            do_lote, alterou_lote = _upsert_lote_no_cursor(cursor, lote)
+            conn.commit()
+            resultados.extend(do_lote)
+            alterou = alterou or alterou_lote
+
+    if alterou:
+        cache_registros.limpar()
+        _apos_escrever()
+    return resultados
 
 
 def listar_clientes():
     """
     Retorna a lista de todos os clientes.
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, nome, email, telefone, cpf, data_nascimento FROM clientes"
-    )
-    resultados = cursor.fetchall()
-    conn.close()
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, nome, email, telefone, cpf, data_nascimento FROM clientes"
+        )
+        resultados = cursor.fetchall()
     return resultados
 
 
+def _codificar_cursor(colunas, row) -> str:
+    if colunas == ("id",):
+        return str(row["id"])
+    valores = [row[coluna] for coluna in colunas]
+    bruto = json.dumps(valores, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def _decodificar_cursor(colunas, cursor: str) -> list:
+    try:
+        if colunas == ("id",):
+            return [int(cursor)]
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(bruto.decode("utf-8"))
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginação inválido.")
+    if not isinstance(valores, list) or len(valores) != len(colunas):
+        raise ValueError("Cursor de paginação inválido.")
+    return valores
+
+
+def _colunas_selecionadas(colunas, obrigatorias=()) -> tuple:
+    """
+    Colunas do SELECT para uma projeção: as pedidas (na ordem pedida,
+    validadas contra COLUNAS_CLIENTE) seguidas das obrigatórias que
+    faltarem (ex.: as colunas da ordenação, usadas no cursor).
+    """
+    for coluna in colunas:
+        if coluna not in COLUNAS_CLIENTE:
+            raise ValueError(f"Coluna desconhecida: {coluna}")
+    return tuple(colunas) + tuple(c for c in obrigatorias if c not in colunas)
+
+
+def listar_clientes_pagina(limite: int = LIMITE_PADRAO, apos: str = None, ordem: str = "id",
+                           colunas: tuple = COLUNAS_CLIENTE):
+    """
+    Retorna uma página de clientes usando paginação por chave (keyset).
+    'apos' é o cursor devolvido pela página anterior e 'ordem' é uma das
+    chaves de ORDENACOES (prefixo '-' para ordem decrescente).
+    'colunas' limita o SELECT; cada linha traz essas colunas primeiro
+    (as da ordenação que faltarem vêm depois).
+    Retorna (clientes, proximo_cursor); proximo_cursor é None na última página.
+    """
+    decrescente = ordem.startswith("-")
+    chave = ordem.lstrip("-")
+    if chave not in ORDENACOES:
+        raise ValueError(f"Ordenação inválida: {ordem}")
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise ValueError(f"O limite deve estar entre 1 e {LIMITE_MAXIMO}.")
+
+    colunas_ordem = ORDENACOES[chave]
+    selecionadas = _colunas_selecionadas(colunas, colunas_ordem)
+    lista_colunas = ", ".join(colunas_ordem)
+    direcao = "DESC" if decrescente else "ASC"
+
+    sql = f"SELECT {', '.join(selecionadas)} FROM clientes"
+    parametros = []
+    if apos:
+        operador = "<" if decrescente else ">"
+        marcadores = ", ".join("?" for _ in colunas_ordem)
+        sql += f" WHERE ({lista_colunas}) {operador} ({marcadores})"
+        parametros.extend(_decodificar_cursor(colunas_ordem, apos))
+    sql += " ORDER BY " + ", ".join(f"{coluna} {direcao}" for coluna in colunas_ordem)
+    sql += " LIMIT ?"
+    parametros.append(limite + 1)
+
+    def carregar():
+        with conexao_leitura() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, parametros)
+            resultados = cursor.fetchall()
+
+        proximo_cursor = None
+        if len(resultados) > limite:
+            resultados = resultados[:limite]
+            proximo_cursor = _codificar_cursor(colunas_ordem, resultados[-1])
+        return tuple(resultados), proximo_cursor
+
+    resultados, proximo_cursor = cache_paginas.obter_ou_carregar(
+        ("pagina", limite, apos, ordem, selecionadas), carregar,
+        guardar_se=leitura_guardavel,
+    )
+    return list(resultados), proximo_cursor
+
+
 def buscar_cliente_por_id(id_cliente: int):
     """
-    Busca um cliente específico pelo ID.
+    Busca um cliente específico pelo ID (inclui a coluna 'versao').
+    Passa pelo cache de registros (ver cache.py).
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, nome, email, telefone, cpf, data_nascimento
-        FROM clientes
-        WHERE id = ?
-        """,
-        (id_cliente,),
+    return cache_registros.obter_ou_carregar(
+        id_cliente, lambda: _buscar_cliente_por_id_no_banco(id_cliente),
+        guardar_se=leitura_guardavel,
     )
-    resultado = cursor.fetchone()
-    conn.close()
+
+
+def _buscar_cliente_por_id_no_banco(id_cliente: int):
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, nome, email, telefone, cpf, data_nascimento, versao
+            FROM clientes
+            WHERE id = ?
+            """,
+            (id_cliente,),
+        )
+        resultado = cursor.fetchone()
     return resultado
 
 
-def buscar_clientes_por_nome(nome_parcial: str):
+def buscar_cliente_por_cpf(cpf: str):
     """
-    Busca clientes cujo nome contenha o texto informado.
+    Busca um cliente pelo CPF (com ou sem máscara).
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, nome, email, telefone, cpf, data_nascimento
-        FROM clientes
-        WHERE nome LIKE ?
-        """,
-        (f"%{nome_parcial}%",),
+    cpf_digitos = normalizar_cpf(cpf)
+    if not cpf_digitos:
+        return None
+
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, nome, email, telefone, cpf, data_nascimento
+            FROM clientes
+            WHERE cpf_digitos = ?
+            """,
+            (cpf_digitos,),
+        )
+        resultado = cursor.fetchone()
+    return resultado
+
+
+def buscar_cliente_por_email(email: str):
+    """
+    Busca um cliente pelo email (sem diferenciar maiúsculas).
+    """
+    email_normalizado = normalizar_email(email)
+    if not email_normalizado:
+        return None
+
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, nome, email, telefone, cpf, data_nascimento
+            FROM clientes
+            WHERE email_normalizado = ?
+            """,
+            (email_normalizado,),
+        )
+        resultado = cursor.fetchone()
+    return resultado
+
+
+def buscar_clientes_por_cpfs(cpfs):
+    """
+    Busca vários clientes de uma vez pelo CPF.
+    Retorna um dict {cpf_digitos: cliente} só com os CPFs encontrados.
+    """
+    cpfs_digitos = list(dict.fromkeys(filter(None, map(normalizar_cpf, cpfs))))
+    encontrados = {}
+
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        for inicio in range(0, len(cpfs_digitos), TAMANHO_LOTE_BUSCA):
+            lote = cpfs_digitos[inicio:inicio + TAMANHO_LOTE_BUSCA]
+            marcadores = ", ".join("?" for _ in lote)
+            cursor.execute(
+                f"""
+                SELECT id, nome, email, telefone, cpf, data_nascimento, cpf_digitos
+                FROM clientes
+                WHERE cpf_digitos IN ({marcadores})
+                """,
+                lote,
+            )
+            for row in cursor.fetchall():
+                encontrados[row["cpf_digitos"]] = row
+    return encontrados
+
+
+def _montar_consulta_fts(texto: str) -> str:
+    # Cada palavra vira um prefixo entre aspas ("jo"* "sil"*), o que também
+    # neutraliza operadores da sintaxe FTS5 digitados pelo usuário.
+    termos = re.findall(r"\w+", texto)
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def buscar_clientes_por_nome(nome_parcial: str, limite: int = LIMITE_PADRAO,
+                             colunas: tuple = COLUNAS_CLIENTE, deslocamento: int = 0):
+    """
+    Busca clientes cujo nome tenha palavras começando pelos termos informados.
+    Usa o índice FTS5 (sem diferenciar maiúsculas/acentos) e retorna os
+    resultados mais relevantes primeiro, até 'limite' registros, pulando
+    os 'deslocamento' primeiros (páginas seguintes da mesma busca).
+    'colunas' limita o SELECT (as linhas vêm nessa ordem).
+    """
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise ValueError(f"O limite deve estar entre 1 e {LIMITE_MAXIMO}.")
+    if deslocamento < 0:
+        raise ValueError("O deslocamento não pode ser negativo.")
+
+    consulta = _montar_consulta_fts(nome_parcial)
+    if not consulta:
+        return []
+
+    selecionadas = _colunas_selecionadas(colunas)
+    resultados = cache_paginas.obter_ou_carregar(
+        ("busca", consulta, limite, selecionadas, deslocamento),
+        lambda: tuple(_buscar_clientes_por_nome_no_banco(
+            nome_parcial, consulta, limite, selecionadas, deslocamento
+        )),
+        guardar_se=leitura_guardavel,
     )
-    resultados = cursor.fetchall()
-    conn.close()
+    return list(resultados)
+
+
+def _buscar_clientes_por_nome_no_banco(nome_parcial: str, consulta: str, limite: int,
+                                       colunas: tuple = COLUNAS_CLIENTE,
+                                       deslocamento: int = 0):
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT {', '.join('c.' + coluna for coluna in colunas)}
+                FROM clientes_fts
+                JOIN clientes c ON c.id = clientes_fts.rowid
+                WHERE clientes_fts MATCH ?
+                ORDER BY clientes_fts.rank
+                LIMIT ? OFFSET ?
+                """,
+                (consulta, limite, deslocamento),
+            )
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5: volta para a busca antiga (varredura completa).
+            cursor.execute(
+                f"""
+                SELECT {', '.join(colunas)}
+                FROM clientes
+                WHERE nome LIKE ?
+                ORDER BY id
+                LIMIT ? OFFSET ?
+                """,
+                (f"%{nome_parcial}%", limite, deslocamento),
+            )
+        resultados = cursor.fetchall()
     return resultados
 
 
-def atualizar_cliente(id_cliente, nome, email, telefone, cpf, data_nascimento):
+def _pagina_por_faixas(coluna: str, faixas: tuple, limite: int, apos: str,
+                       colunas: tuple):
     """
-    Atualiza os dados de um cliente existente.
+    Página de clientes com 'coluna' dentro de uma ou mais faixas
+    (minimo, maximo), inclusivas, percorridas na ordem dada. Cada faixa é
+    lida pelo índice (coluna, id), com paginação por chave como em
+    listar_clientes_pagina. Retorna (clientes, proximo_cursor).
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise ValueError(f"O limite deve estar entre 1 e {LIMITE_MAXIMO}.")
+
+    colunas_ordem = (coluna, "id")
+    selecionadas = _colunas_selecionadas(colunas, colunas_ordem)
+    valores_cursor = _decodificar_cursor(colunas_ordem, apos) if apos else None
+    primeira = 0
+    if valores_cursor:
+        # O cursor diz em qual faixa a página anterior parou.
+        try:
+            primeira = next(
+                i for i, (minimo, maximo) in enumerate(faixas)
+                if minimo <= valores_cursor[0] <= maximo
+            )
+        except (StopIteration, TypeError):
+            raise ValueError("Cursor de paginação inválido.")
+
+    def carregar():
+        resultados = []
+        with conexao_leitura() as conn:
+            cursor = conn.cursor()
+            for posicao in range(primeira, len(faixas)):
+                sql = (
+                    f"SELECT {', '.join(selecionadas)} FROM clientes "
+                    f"WHERE {coluna} BETWEEN ? AND ?"
+                )
+                parametros = list(faixas[posicao])
+                if valores_cursor and posicao == primeira:
+                    sql += f" AND ({coluna}, id) > (?, ?)"
+                    parametros.extend(valores_cursor)
+                sql += f" ORDER BY {coluna}, id LIMIT ?"
+                parametros.append(limite + 1 - len(resultados))
+                cursor.execute(sql, parametros)
+                resultados.extend(cursor.fetchall())
+                if len(resultados) > limite:
+                    break
+
+        proximo_cursor = None
+        if len(resultados) > limite:
+            resultados = resultados[:limite]
+            proximo_cursor = _codificar_cursor(colunas_ordem, resultados[-1])
+        return tuple(resultados), proximo_cursor
+
+    resultados, proximo_cursor = cache_paginas.obter_ou_carregar(
+        ("faixas", coluna, faixas, limite, apos, selecionadas), carregar,
+        guardar_se=leitura_guardavel,
+    )
+    return list(resultados), proximo_cursor
+
+
+def _mes_dia(mes: int, dia: int) -> int:
+    if not 1 <= mes <= 12 or not 1 <= dia <= 31:
+        raise ValueError("Mês ou dia inválido.")
+    return mes * 100 + dia
+
+
+def listar_aniversariantes(inicio: tuple, fim: tuple, limite: int = LIMITE_PADRAO,
+                           apos: str = None, colunas: tuple = COLUNAS_CLIENTE):
+    """
+    Clientes que fazem aniversário entre 'inicio' e 'fim', tuplas
+    (mes, dia) inclusivas, em ordem de data de aniversário. Se 'fim' vier
+    antes de 'inicio', a faixa atravessa a virada do ano (ex.: de (12, 20)
+    a (1, 10)). Usa o índice de nascimento_mmdd.
+    Retorna (clientes, proximo_cursor), como listar_clientes_pagina.
+    """
+    de, ate = _mes_dia(*inicio), _mes_dia(*fim)
+    faixas = ((de, ate),) if de <= ate else ((de, 1231), (101, ate))
+    return _pagina_por_faixas("nascimento_mmdd", faixas, limite, apos, colunas)
+
+
+def listar_nascidos_no_mes(mes: int, limite: int = LIMITE_PADRAO, apos: str = None,
+                           colunas: tuple = COLUNAS_CLIENTE):
+    """
+    Clientes nascidos no mês 'mes' (1 a 12), por dia do mês.
+    Retorna (clientes, proximo_cursor).
+    """
+    return listar_aniversariantes((mes, 1), (mes, 31), limite, apos, colunas)
+
+
+def _anos_antes(dia: date, anos: int) -> date:
+    # 29/02 num ano que não é bissexto vira 28/02.
+    try:
+        return dia.replace(year=dia.year - anos)
+    except ValueError:
+        return dia.replace(year=dia.year - anos, day=28)
+
+
+def listar_por_idade(idade_minima: int, idade_maxima: int, hoje: date = None,
+                     limite: int = LIMITE_PADRAO, apos: str = None,
+                     colunas: tuple = COLUNAS_CLIENTE):
+    """
+    Clientes com idade entre 'idade_minima' e 'idade_maxima' anos
+    (inclusive) na data 'hoje' (padrão: hoje), do mais velho para o mais
+    novo. A faixa de idade vira uma faixa de nascimento_iso (índice).
+    Retorna (clientes, proximo_cursor).
+    """
+    if not 0 <= idade_minima <= idade_maxima <= IDADE_MAXIMA:
+        raise ValueError(f"Use 0 <= idade mínima <= idade máxima <= {IDADE_MAXIMA}.")
+    hoje = hoje or date.today()
+    nascidos_desde = _anos_antes(hoje, idade_maxima + 1) + timedelta(days=1)
+    nascidos_ate = _anos_antes(hoje, idade_minima)
+    faixas = ((nascidos_desde.isoformat(), nascidos_ate.isoformat()),)
+    return _pagina_por_faixas("nascimento_iso", faixas, limite, apos, colunas)
+
+
+def exportar_clientes(termo: str = None, apos_id: int = None,
+                      tamanho_bloco: int = TAMANHO_BLOCO_EXPORTACAO,
+                      colunas: tuple = COLUNAS_CLIENTE):
+    """
+    Gera todos os clientes (tuplas na ordem de 'colunas', por padrão
+    COLUNAS_CLIENTE), por id, lendo o cursor em blocos de 'tamanho_bloco'
+    linhas.
+    Filtros opcionais: 'termo' (mesma busca de buscar_clientes_por_nome) e
+    'apos_id' (só ids maiores).
+    Usa uma conexão própria dentro de uma transação de leitura: a exportação
+    inteira enxerga o mesmo snapshot, mesmo com escritas em paralelo (com a
+    réplica de leitura ligada, a conexão é com a cópia em memória).
+    """
+    lista_colunas = ", ".join(_colunas_selecionadas(colunas))
+    condicoes = ["id > ?"]
+    parametros = [apos_id or 0]
+    consulta_fts = _montar_consulta_fts(termo) if termo else None
+    if termo and not consulta_fts:
+        return
+
+    conn = nova_conexao_leitura()
+    conn.row_factory = None
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        try:
+            if consulta_fts:
+                condicoes.append(
+                    "id IN (SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH ?)"
+                )
+                parametros.append(consulta_fts)
+            cursor.execute(
+                f"SELECT {lista_colunas} "
+                "FROM clientes WHERE " + " AND ".join(condicoes) + " ORDER BY id",
+                parametros,
+            )
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5: mesma troca por LIKE de buscar_clientes_por_nome.
+            condicoes[-1] = "nome LIKE ?"
+            parametros[-1] = f"%{termo}%"
+            cursor.execute(
+                f"SELECT {lista_colunas} "
+                "FROM clientes WHERE " + " AND ".join(condicoes) + " ORDER BY id",
+                parametros,
+            )
+
+        while True:
+            linhas = cursor.fetchmany(tamanho_bloco)
+            if not linhas:
+                break
+            yield from linhas
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def reconstruir_indice_busca():
+    """
+    Reconstrói do zero o índice de busca por nome (clientes_fts).
+    Útil para bancos antigos ou após alterações feitas fora da aplicação.
+    """
+    with conexao() as conn:
+        criar_indice_busca(conn)
+        conn.execute("INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')")
+        conn.commit()
+    _apos_escrever()
+
+
+def versao_tabela() -> int:
+    """
+    Retorna o contador de alterações da tabela clientes (muda a cada
+    INSERT/UPDATE/DELETE). Usado nos ETags das listagens.
+    """
+    with conexao_leitura() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT valor FROM clientes_controle WHERE chave = 'versao'")
+        resultado = cursor.fetchone()
+    return resultado[0] if resultado else 0
+
+
+def _verificar_conflito(cursor, id_cliente, versao_esperada):
+    # Chamado só quando a escrita condicionada à versão não afetou nada:
+    # se o cliente existe, a versão enviada estava desatualizada.
+    if versao_esperada is None:
+        return
+    cursor.execute("SELECT versao FROM clientes WHERE id = ?", (id_cliente,))
+    atual = cursor.fetchone()
+    if atual is not None:
+        raise VersaoDesatualizada(id_cliente, versao_esperada, atual[0])
+
+
+def _atualizar_no_cursor(cursor, sql, parametros, id_cliente, versao_esperada):
+    resultado = _executar_retornando(cursor, sql, parametros, id_cliente=id_cliente)
+    if resultado is None:
+        _verificar_conflito(cursor, id_cliente, versao_esperada)
+    return resultado
+
+
+def atualizar_cliente(id_cliente, nome, email, telefone, cpf, data_nascimento,
+                      versao_esperada: int = None):
+    """
+    Atualiza os dados de um cliente existente e incrementa sua versão.
+    Se 'versao_esperada' for informada, só atualiza se a versão atual for
+    essa (senão levanta VersaoDesatualizada).
+    Retorna o registro atualizado, ou None se o cliente não existir.
+    Passa pela escrita agrupada quando ela está ligada.
+    """
+    sql = """
         UPDATE clientes
-        SET nome = ?, email = ?, telefone = ?, cpf = ?, data_nascimento = ?
+        SET nome = ?, email = ?, telefone = ?, cpf = ?, data_nascimento = ?,
+            cpf_digitos = ?, email_normalizado = ?,
+            nascimento_iso = ?, nascimento_mmdd = ?, versao = versao + 1
         WHERE id = ?
-        """,
-        (nome, email, telefone, cpf, data_nascimento, id_cliente),
-    )
-    conn.commit()
-    conn.close()
+    """
+    parametros = [
+        nome, email, telefone, cpf, data_nascimento,
+        normalizar_cpf(cpf), normalizar_email(email),
+        *chaves_nascimento(data_nascimento), id_cliente,
+    ]
+    if versao_esperada is not None:
+        sql += " AND versao = ?"
+        parametros.append(versao_esperada)
+
+    if ESCRITA_AGRUPADA:
+        resultado = obter_fila_escrita().executar(
+            _atualizar_no_cursor, sql, parametros, id_cliente, versao_esperada,
+            depois=lambda resultado: _apos_escrever(id_cliente),
+        )
+        lembrar_escrita()
+        return resultado
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        resultado = _atualizar_no_cursor(cursor, sql, parametros, id_cliente, versao_esperada)
+        conn.commit()
+    # Só invalida: guardar 'resultado' aqui poderia deixar no cache a
+    # versão mais velha quando duas atualizações do mesmo id terminam fora
+    # de ordem. A próxima leitura recarrega (com a checagem de geração).
+    _apos_escrever(id_cliente)
+    return resultado
+
+
+def _excluir_no_cursor(cursor, sql, parametros, id_cliente, versao_esperada):
+    cursor.execute(sql, parametros)
+    excluido = cursor.rowcount > 0
+    if not excluido:
+        _verificar_conflito(cursor, id_cliente, versao_esperada)
+    return excluido
 
 
-def excluir_cliente(id_cliente: int):
+def excluir_cliente(id_cliente: int, versao_esperada: int = None):
     """
     Exclui um cliente pelo ID.
+    Se 'versao_esperada' for informada, só exclui se a versão atual for
+    essa (senão levanta VersaoDesatualizada).
+    Retorna True se o cliente existia.
+    Passa pela escrita agrupada quando ela está ligada.
     """
-    conn = criar_conexao()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM clientes WHERE id = ?", (id_cliente,))
-    conn.commit()
-    conn.close()
+    sql = "DELETE FROM clientes WHERE id = ?"
+    parametros = [id_cliente]
+    if versao_esperada is not None:
+        sql += " AND versao = ?"
+        parametros.append(versao_esperada)
+
+    if ESCRITA_AGRUPADA:
+        excluido = obter_fila_escrita().executar(
+            _excluir_no_cursor, sql, parametros, id_cliente, versao_esperada,
+            depois=lambda _: _apos_escrever(id_cliente),
+        )
+        lembrar_escrita()
+        return excluido
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        excluido = _excluir_no_cursor(cursor, sql, parametros, id_cliente, versao_esperada)
+        conn.commit()
+    _apos_escrever(id_cliente)
+    return excluido
@@ -1,13 +1,94 @@
+import os
 from typing import List, Dict, Any, Tuple
-from .repository import inserir_cliente
-from .validators import validar_email, validar_cpf, validar_data
+from .repository import (
+    inserir_clientes_em_lote,
+    upsert_clientes_por_cpf,
+    FALHOU,
+    TAMANHO_LOTE_INSERCAO,
+)
+from .validators import validar_colunas
 
+# Com CLIENTES_VERIFICAR_DIGITOS_CPF=1 a validação em lote (lotes,
+# upsert, tarefas e importação) também confere os dígitos verificadores
+# do CPF. Desligado por padrão: as rotas de um cliente só (validar_cpf)
+# exigem só os 11 dígitos e um lote deve aceitar o mesmo que elas.
+VERIFICAR_DIGITOS_CPF = os.environ.get("CLIENTES_VERIFICAR_DIGITOS_CPF", "0") == "1"
 
-def processar_lote_clientes(payload: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+# Mensagens de erro por coluna, na ordem em que aparecem em 'erros'.
+MENSAGENS_ERRO_LOTE = (
+    ("nome", "nome obrigatório"),
+    ("email", "email inválido"),
+    ("cpf", "cpf inválido (precisa ter 11 dígitos e dígitos verificadores corretos)"
+     if VERIFICAR_DIGITOS_CPF else "cpf inválido (precisa ter 11 dígitos)"),
+    ("data_nascimento", "data inválida (formato dd/mm/aaaa)"),
+)
+
+
+def _extrair_campos(cliente: Dict[str, Any]):
+    if not isinstance(cliente, dict):
+        return None
+    return (
+        str(cliente.get("nome") or "").strip(),
+        str(cliente.get("email") or "").strip(),
+        str(cliente.get("telefone") or "").strip(),
+        str(cliente.get("cpf") or "").strip(),
+        str(cliente.get("data_nascimento") or "").strip(),
+    )
+
+
+def validar_clientes(clientes: List[Dict[str, Any]]) -> List[Tuple[tuple, List[str]]]:
+    """
+    Normaliza e valida vários clientes de uma vez (validar_colunas).
+    Retorna, na ordem recebida, uma lista de (campos, erros): 'campos' é a
+    tupla (nome, email, telefone, cpf, data_nascimento) pronta para
+    inserir_clientes_em_lote e 'erros' a lista de mensagens (vazia se o
+    cliente for válido).
+    """
+    todos_campos = [_extrair_campos(cliente) for cliente in clientes]
+    extraidos = [campos for campos in todos_campos if campos is not None]
+    nomes, emails, _, cpfs, datas = (
+        zip(*extraidos) if extraidos else ((), (), (), (), ())
+    )
+    mascaras = validar_colunas(
+        nomes=nomes, emails=emails, cpfs=cpfs, datas=datas,
+        verificar_digitos_cpf=VERIFICAR_DIGITOS_CPF,
+    )
+    colunas = [
+        (mascaras[coluna], mensagem) for coluna, mensagem in MENSAGENS_ERRO_LOTE
+    ]
+
+    resultados = []
+    posicao = 0
+    for campos in todos_campos:
+        if campos is None:
+            resultados.append((None, ["registro deve ser um objeto JSON"]))
+            continue
+        erros = [mensagem for mascara, mensagem in colunas if mascara[posicao]]
+        resultados.append((campos, erros))
+        posicao += 1
+    return resultados
+
+
+def validar_cliente(cliente: Dict[str, Any]) -> Tuple[tuple, List[str]]:
+    """
+    Normaliza e valida um único cliente (ver validar_clientes).
+    """
+    return validar_clientes([cliente])[0]
+
+
+def processar_lote_clientes(
+    payload: List[Dict[str, Any]],
+    tamanho_lote: int = TAMANHO_LOTE_INSERCAO,
+    cursor=None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
     Função de serviço para processar um lote de clientes.
-    Não é rota HTTP. Fica engatilhada para uso futuro em API ou importação.
-    Retorna (criadas, falhas).
+    Usada pela rota /api/clientes/lote e disponível para importações.
+    Valida o lote inteiro primeiro e depois grava os válidos de uma vez
+    (inserir_clientes_em_lote), em transações de 'tamanho_lote' linhas.
+    Retorna (criadas, falhas); cada item de 'criadas' é o cliente recebido
+    acrescido do 'id' gerado. Com 'cursor', grava na transação de quem
+    chamou, sem commit (ver inserir_clientes_em_lote).
     """
     criadas: List[Dict[str, Any]] = []
     falhas: List[Dict[str, Any]] = []
@@ -15,24 +96,10 @@ def processar_lote_clientes(payload: List[Dict[str, Any]]) -> Tuple[List[Dict[st
     if not isinstance(payload, list):
         raise ValueError("Payload de lote deve ser uma lista de clientes.")
 
-    for indice, cliente in enumerate(payload):
-        nome = (cliente.get("nome") or "").strip()
-        email = (cliente.get("email") or "").strip()
-        telefone = (cliente.get("telefone") or "").strip()
-        cpf = (cliente.get("cpf") or "").strip()
-        data_nascimento = (cliente.get("data_nascimento") or "").strip()
-
-        erros = []
-
-        if not nome:
-            erros.append("nome obrigatório")
-        if not validar_email(email):
-            erros.append("email inválido")
-        if not validar_cpf(cpf):
-            erros.append("cpf inválido (11 dígitos)")
-        if not validar_data(data_nascimento):
-            erros.append("data inválida (dd/mm/aaaa)")
-
+    validos = []
+    for indice, (cliente, (campos, erros)) in enumerate(
+        zip(payload, validar_clientes(payload))
+    ):
         if erros:
             falhas.append({
                 "indice": indice,
@@ -41,7 +108,65 @@ def processar_lote_clientes(payload: List[Dict[str, Any]]) -> Tuple[List[Dict[st
             })
             continue
 
-        inserir_cliente(nome, email, telefone, cpf, data_nascimento)
-        criadas.append(cliente)
+        validos.append((indice, cliente, campos))
 
+    ids = inserir_clientes_em_lote(
+        [campos for _, _, campos in validos], tamanho_lote=tamanho_lote, cursor=cursor
+    )
+
+    for (indice, cliente, _), id_cliente in zip(validos, ids):
+        if id_cliente is None:
+            falhas.append({
+                "indice": indice,
+                "cliente": cliente,
+                "erros": ["cpf ou email já cadastrado"],
+            })
+            continue
+        criadas.append({**cliente, "id": id_cliente})
+
+    falhas.sort(key=lambda falha: falha["indice"])
     return criadas, falhas
+
+
+def sincronizar_lote_clientes(
+    payload: List[Dict[str, Any]],
+    tamanho_lote: int = TAMANHO_LOTE_INSERCAO,
+    cursor=None,
+) -> List[Dict[str, Any]]:
+    """
+    Função de serviço do upsert em lote (rota PUT /api/clientes/lote).
+    Valida o lote inteiro e grava os válidos com upsert_clientes_por_cpf:
+    CPF novo é inserido, CPF existente é atualizado (ou fica como está,
+    se nada mudou).
+    Retorna um resultado por cliente, na ordem recebida:
+    {"indice", "situacao", "id"} ou {"indice", "situacao": "falhou", "erros"}.
+    Com 'cursor', grava na transação de quem chamou, sem commit (ver
+    upsert_clientes_por_cpf).
+    """
+    if not isinstance(payload, list):
+        raise ValueError("Payload de lote deve ser uma lista de clientes.")
+
+    resultados: List[Dict[str, Any]] = []
+    validos = []
+    for indice, (campos, erros) in enumerate(validar_clientes(payload)):
+        if not erros and not campos[3]:
+            erros = ["cpf obrigatório (é a chave do upsert)"]
+        if erros:
+            resultados.append({"indice": indice, "situacao": FALHOU, "erros": erros})
+        else:
+            resultados.append(None)
+            validos.append((indice, campos))
+
+    gravados = upsert_clientes_por_cpf(
+        [campos for _, campos in validos], tamanho_lote=tamanho_lote, cursor=cursor
+    )
+    for (indice, _), (situacao, id_cliente) in zip(validos, gravados):
+        if situacao == FALHOU:
+            resultados[indice] = {
+                "indice": indice,
+                "situacao": FALHOU,
+                "erros": ["email já cadastrado para outro cliente"],
+            }
+        else:
+            resultados[indice] = {"indice": indice, "situacao": situacao, "id": id_cliente}
+    return resultados
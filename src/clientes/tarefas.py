@@ -0,0 +1,520 @@
+"""
+Tarefas em segundo plano: lotes grandes (importação e upsert) e o
+relatório de duplicados.
+
+A rota de lote grava os itens no próprio SQLite (tabela tarefas_blocos,
+em blocos de TAREFA_BLOCO itens) e responde na hora com o id da tarefa.
+Um pool local de threads processa os blocos em ordem. Cada bloco é uma
+transação só (BEGIN IMMEDIATE): os clientes do bloco, o progresso, os
+contadores e as falhas por item são gravados juntos, com um commit, então
+GET /api/jobs/<id> sempre mostra o que de fato está no banco.
+
+Não há broker: a fila é a tabela tarefas. Ao subir, o processo retoma as
+tarefas pendentes e as que ficaram "executando" sem sinal de vida há
+mais de TAREFA_ABANDONADA_APOS segundos (processo que caiu), a partir do
+próximo bloco ainda não registrado. Enquanto um worker executa, uma
+thread renova atualizada_em a cada TAREFA_BATIMENTO segundos, então um
+bloco demorado (ex.: o relatório de duplicados) não parece abandonado. Um bloco interrompido no meio não
+deixou nada gravado e é processado de novo do zero.
+
+O cancelamento é cooperativo: marca a tarefa e o worker para antes do
+próximo bloco. Tarefas canceladas ou que falharam podem ser retomadas.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .database import conexao
+from .deduplicacao import encontrar_duplicados, salvar_relatorio
+from .replica import encerrar_leitura, iniciar_leitura
+from .repository import FALHOU, escrita_confirmada
+from .service import processar_lote_clientes, sincronizar_lote_clientes
+
+logger = logging.getLogger(__name__)
+
+# Threads que processam tarefas (o SQLite tem um escritor por vez, então
+# mais de 1 só ajuda quando há várias tarefas pequenas na fila).
+TAREFAS_WORKERS = int(os.environ.get("CLIENTES_TAREFAS_WORKERS", "1"))
+
+# Itens por bloco: unidade de gravação, de progresso e de retomada.
+TAREFA_BLOCO = int(os.environ.get("CLIENTES_TAREFA_BLOCO", "1000"))
+
+# Tarefa "executando" sem atualização há mais que isso (segundos) é
+# considerada abandonada e pode ser retomada por outro processo.
+TAREFA_ABANDONADA_APOS = float(os.environ.get("CLIENTES_TAREFA_ABANDONADA_APOS", "60"))
+
+# De quanto em quanto tempo (segundos) o worker renova atualizada_em
+# enquanto executa (bem menos que TAREFA_ABANDONADA_APOS).
+TAREFA_BATIMENTO = TAREFA_ABANDONADA_APOS / 4
+
+# Lotes com mais itens que isso vão para segundo plano mesmo sem ?async=1
+# (0 desliga).
+LOTE_ASSINCRONO_A_PARTIR_DE = int(
+    os.environ.get("CLIENTES_LOTE_ASSINCRONO_A_PARTIR_DE", "10000")
+)
+
+# Estados de uma tarefa.
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+CANCELADA = "cancelada"
+FALHA = "falhou"
+
+ESTADOS_FINAIS = (CONCLUIDA, CANCELADA, FALHA)
+
+# Tipos de tarefa (um por rota de lote, mais o relatório de duplicados).
+INSERCAO = "insercao"
+UPSERT = "upsert"
+DEDUPLICACAO = "deduplicacao"
+
+
+class TarefaNaoEncontrada(LookupError):
+    """
+    Nenhuma tarefa com o id informado.
+    """
+
+
+class EstadoInvalido(ValueError):
+    """
+    A operação não vale para o estado atual da tarefa.
+    """
+
+
+def _processar_insercao(conn, itens: list, inicio: int):
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    criadas, falhas = processar_lote_clientes(
+        itens, tamanho_lote=len(itens) or 1, cursor=cursor
+    )
+    contadores = {"criadas": len(criadas)}
+    return contadores, [
+        (inicio + falha["indice"], falha["erros"], falha["cliente"]) for falha in falhas
+    ]
+
+
+def _processar_upsert(conn, itens: list, inicio: int):
+    contadores = {"inseridos": 0, "atualizados": 0, "inalterados": 0}
+    falhas = []
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    resultados = sincronizar_lote_clientes(itens, tamanho_lote=len(itens) or 1, cursor=cursor)
+    for resultado in resultados:
+        situacao = resultado["situacao"]
+        if situacao == FALHOU:
+            indice = resultado["indice"]
+            falhas.append((inicio + indice, resultado["erros"], itens[indice]))
+        else:
+            contadores[situacao + "s"] += 1
+    return contadores, falhas
+
+
+def _processar_deduplicacao(conn, itens: list, inicio: int):
+    # Um item só, {"limiar": ...}. Roda no processo atual (processos=1):
+    # a aplicação web não abre um pool de processos. A comparação roda
+    # fora da transação; só a gravação do relatório segura o lock. Lê do
+    # banco principal: a réplica pode não ter as escritas de outras threads.
+    limiar = itens[0]["limiar"]
+    iniciar_leitura(forte=True)
+    try:
+        candidatos, estatisticas = encontrar_duplicados(limiar=limiar, processos=1)
+    finally:
+        encerrar_leitura()
+    conn.execute("BEGIN IMMEDIATE")
+    salvar_relatorio(conn, candidatos, estatisticas, limiar)
+    return {"candidatos": len(candidatos)}, []
+
+
+# tipo -> função(conexão, itens do bloco, índice do primeiro item) que
+# grava o bloco numa transação aberta na conexão (BEGIN IMMEDIATE), sem
+# commit, e devolve (contadores do bloco, [(índice, erros, item), ...]).
+PROCESSADORES = {
+    INSERCAO: _processar_insercao,
+    UPSERT: _processar_upsert,
+    DEDUPLICACAO: _processar_deduplicacao,
+}
+
+# Tipos que gravam clientes (avisam a réplica e invalidam os caches).
+GRAVAM_CLIENTES = (INSERCAO, UPSERT)
+
+
+def _iso(instante: Optional[float]) -> Optional[str]:
+    if instante is None:
+        return None
+    return datetime.fromtimestamp(instante, timezone.utc).isoformat(timespec="seconds")
+
+
+def criar_tarefa(tipo: str, itens: List[Any]) -> str:
+    """
+    Grava a tarefa e seus itens (em blocos) e a coloca na fila.
+    Retorna o id da tarefa.
+    """
+    if tipo not in PROCESSADORES:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}.")
+    if not isinstance(itens, list):
+        raise ValueError("Payload de lote deve ser uma lista de clientes.")
+
+    id_tarefa = uuid.uuid4().hex
+    blocos = (
+        (id_tarefa, numero, json.dumps(itens[inicio:inicio + TAREFA_BLOCO], ensure_ascii=False))
+        for numero, inicio in enumerate(range(0, len(itens), TAREFA_BLOCO))
+    )
+    with conexao() as conn:
+        conn.execute(
+            "INSERT INTO tarefas (id, tipo, estado, total, criada_em) VALUES (?, ?, ?, ?, ?)",
+            (id_tarefa, tipo, PENDENTE, len(itens), time.time()),
+        )
+        conn.executemany(
+            "INSERT INTO tarefas_blocos (tarefa_id, bloco, itens) VALUES (?, ?, ?)", blocos
+        )
+        conn.commit()
+
+    _executor.enviar(id_tarefa)
+    return id_tarefa
+
+
+def _descrever(linha) -> Dict[str, Any]:
+    total = linha["total"]
+    processados = linha["processados"]
+    segundos = linha["segundos"]
+    return {
+        "id": linha["id"],
+        "tipo": linha["tipo"],
+        "estado": linha["estado"],
+        "cancelamento_pedido": bool(linha["cancelar"]) and linha["estado"] not in ESTADOS_FINAIS,
+        "total": total,
+        "processados": processados,
+        "percentual": round(100 * processados / total, 1) if total else 100.0,
+        "linhas_por_segundo": round(processados / segundos, 1) if segundos else None,
+        "segundos_processando": round(segundos, 3),
+        "contadores": json.loads(linha["contadores"]),
+        "falhas": linha["falhas"],
+        "erro": linha["erro"],
+        "criada_em": _iso(linha["criada_em"]),
+        "iniciada_em": _iso(linha["iniciada_em"]),
+        "atualizada_em": _iso(linha["atualizada_em"]),
+        "concluida_em": _iso(linha["concluida_em"]),
+    }
+
+
+def obter_tarefa(id_tarefa: str, falhas_apos: int = -1,
+                 limite_falhas: int = 100) -> Dict[str, Any]:
+    """
+    Estado e progresso da tarefa, com até 'limite_falhas' falhas de item
+    de índice maior que 'falhas_apos' (para paginar as falhas).
+    Levanta TarefaNaoEncontrada.
+    """
+    with conexao() as conn:
+        linha = conn.execute("SELECT * FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone()
+        if linha is None:
+            raise TarefaNaoEncontrada(id_tarefa)
+        falhas = conn.execute(
+            """
+            SELECT indice, erros, item FROM tarefas_falhas
+            WHERE tarefa_id = ? AND indice > ?
+            ORDER BY indice
+            LIMIT ?
+            """,
+            (id_tarefa, falhas_apos, limite_falhas),
+        ).fetchall()
+
+    tarefa = _descrever(linha)
+    tarefa["detalhes_falhas"] = [
+        {"indice": indice, "erros": json.loads(erros), "cliente": json.loads(item)}
+        for indice, erros, item in falhas
+    ]
+    return tarefa
+
+
+def listar_tarefas(limite: int = 20, estado: str = None) -> List[Dict[str, Any]]:
+    """
+    Tarefas mais recentes primeiro (sem os detalhes de falhas).
+    """
+    sql = "SELECT * FROM tarefas"
+    parametros = []
+    if estado:
+        sql += " WHERE estado = ?"
+        parametros.append(estado)
+    sql += " ORDER BY criada_em DESC LIMIT ?"
+    parametros.append(limite)
+    with conexao() as conn:
+        return [_descrever(linha) for linha in conn.execute(sql, parametros)]
+
+
+def cancelar_tarefa(id_tarefa: str) -> Dict[str, Any]:
+    """
+    Pede o cancelamento. Tarefa pendente é cancelada na hora; em execução,
+    o worker para antes do próximo bloco. Levanta TarefaNaoEncontrada ou
+    EstadoInvalido (tarefa já terminada).
+    """
+    agora = time.time()
+    with conexao() as conn:
+        linha = conn.execute("SELECT estado FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone()
+        if linha is None:
+            raise TarefaNaoEncontrada(id_tarefa)
+        if linha["estado"] in ESTADOS_FINAIS:
+            raise EstadoInvalido(f"Tarefa já terminou ({linha['estado']}).")
+        conn.execute(
+            """
+            UPDATE tarefas
+            SET cancelar = 1,
+                estado = CASE estado WHEN ? THEN ? ELSE estado END,
+                concluida_em = CASE estado WHEN ? THEN ? ELSE concluida_em END
+            WHERE id = ?
+            """,
+            (PENDENTE, CANCELADA, PENDENTE, agora, id_tarefa),
+        )
+        conn.commit()
+    return obter_tarefa(id_tarefa, limite_falhas=0)
+
+
+def retomar_tarefa(id_tarefa: str) -> Dict[str, Any]:
+    """
+    Recoloca na fila uma tarefa cancelada ou que falhou, continuando do
+    próximo bloco. Levanta TarefaNaoEncontrada ou EstadoInvalido.
+    """
+    with conexao() as conn:
+        linha = conn.execute("SELECT estado FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone()
+        if linha is None:
+            raise TarefaNaoEncontrada(id_tarefa)
+        if linha["estado"] not in (CANCELADA, FALHA):
+            raise EstadoInvalido(
+                f"Só tarefas canceladas ou com falha podem ser retomadas ({linha['estado']})."
+            )
+        conn.execute(
+            """
+            UPDATE tarefas
+            SET estado = ?, cancelar = 0, erro = NULL, concluida_em = NULL
+            WHERE id = ?
+            """,
+            (PENDENTE, id_tarefa),
+        )
+        conn.commit()
+    _executor.enviar(id_tarefa)
+    return obter_tarefa(id_tarefa, limite_falhas=0)
+
+
+def _assumir(conn, id_tarefa: str) -> bool:
+    # Só um worker (de qualquer processo) consegue passar do UPDATE.
+    agora = time.time()
+    cursor = conn.execute(
+        """
+        UPDATE tarefas
+        SET estado = ?, atualizada_em = ?, iniciada_em = COALESCE(iniciada_em, ?)
+        WHERE id = ?
+          AND cancelar = 0
+          AND (estado = ? OR (estado = ? AND atualizada_em < ?))
+        """,
+        (EXECUTANDO, agora, agora, id_tarefa, PENDENTE, EXECUTANDO,
+         agora - TAREFA_ABANDONADA_APOS),
+    )
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def _finalizar(conn, id_tarefa: str, estado: str, erro: str = None):
+    agora = time.time()
+    conn.execute(
+        "UPDATE tarefas SET estado = ?, erro = ?, concluida_em = ?, atualizada_em = ? WHERE id = ?",
+        (estado, erro, agora, agora, id_tarefa),
+    )
+    if estado == CONCLUIDA:
+        conn.execute("DELETE FROM tarefas_blocos WHERE tarefa_id = ?", (id_tarefa,))
+    conn.commit()
+
+
+def _registrar_bloco(conn, id_tarefa: str, numero: int, itens: list,
+                     contadores: dict, falhas: list, segundos: float):
+    # Na transação do bloco; o commit é de executar_tarefa.
+    conn.executemany(
+        "INSERT OR REPLACE INTO tarefas_falhas (tarefa_id, indice, erros, item) VALUES (?, ?, ?, ?)",
+        [
+            (id_tarefa, indice, json.dumps(erros, ensure_ascii=False),
+             json.dumps(item, ensure_ascii=False))
+            for indice, erros, item in falhas
+        ],
+    )
+    conn.execute(
+        """
+        UPDATE tarefas
+        SET processados = processados + ?,
+            proximo_bloco = ?,
+            contadores = ?,
+            falhas = falhas + ?,
+            segundos = segundos + ?,
+            atualizada_em = ?
+        WHERE id = ?
+        """,
+        (len(itens), numero + 1, json.dumps(contadores), len(falhas), segundos,
+         time.time(), id_tarefa),
+    )
+
+
+@contextmanager
+def _batimento(id_tarefa: str):
+    """
+    Renova atualizada_em da tarefa, numa thread e conexão próprias, a cada
+    TAREFA_BATIMENTO segundos enquanto o bloco 'with' roda.
+    """
+    parar = threading.Event()
+
+    def _laco():
+        with conexao() as conn:
+            while not parar.wait(TAREFA_BATIMENTO):
+                try:
+                    conn.execute(
+                        "UPDATE tarefas SET atualizada_em = ? WHERE id = ? AND estado = ?",
+                        (time.time(), id_tarefa, EXECUTANDO),
+                    )
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    logger.warning("Tarefa %s: falha ao renovar atualizada_em.", id_tarefa)
+
+    thread = threading.Thread(target=_laco, name=f"batimento-{id_tarefa[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+def executar_tarefa(id_tarefa: str):
+    """
+    Processa a tarefa a partir do próximo bloco pendente, se conseguir
+    assumi-la. Roda nas threads do pool (ou direto, em scripts).
+    """
+    with conexao() as conn:
+        if not _assumir(conn, id_tarefa):
+            return
+        tarefa = conn.execute(
+            "SELECT tipo, proximo_bloco, contadores FROM tarefas WHERE id = ?", (id_tarefa,)
+        ).fetchone()
+        processar = PROCESSADORES[tarefa["tipo"]]
+        contadores = json.loads(tarefa["contadores"])
+        numero = tarefa["proximo_bloco"]
+        logger.info("Tarefa %s (%s) iniciada no bloco %s.", id_tarefa, tarefa["tipo"], numero)
+
+        with _batimento(id_tarefa):
+            try:
+                while True:
+                    cancelar = conn.execute(
+                        "SELECT cancelar FROM tarefas WHERE id = ?", (id_tarefa,)
+                    ).fetchone()[0]
+                    if cancelar:
+                        _finalizar(conn, id_tarefa, CANCELADA)
+                        logger.info("Tarefa %s cancelada no bloco %s.", id_tarefa, numero)
+                        return
+
+                    linha = conn.execute(
+                        "SELECT itens FROM tarefas_blocos WHERE tarefa_id = ? AND bloco = ?",
+                        (id_tarefa, numero),
+                    ).fetchone()
+                    if linha is None:
+                        break
+
+                    inicio = time.perf_counter()
+                    itens = json.loads(linha[0])
+                    do_bloco, falhas = processar(conn, itens, numero * TAREFA_BLOCO)
+                    for nome, valor in do_bloco.items():
+                        contadores[nome] = contadores.get(nome, 0) + valor
+                    _registrar_bloco(
+                        conn, id_tarefa, numero, itens, contadores, falhas,
+                        time.perf_counter() - inicio,
+                    )
+                    conn.commit()
+                    if tarefa["tipo"] in GRAVAM_CLIENTES:
+                        escrita_confirmada(registros_alterados=tarefa["tipo"] == UPSERT)
+                    numero += 1
+            except Exception as erro:
+                logger.exception("Tarefa %s falhou no bloco %s.", id_tarefa, numero)
+                if conn.in_transaction:
+                    conn.rollback()
+                _finalizar(conn, id_tarefa, FALHA, f"{type(erro).__name__}: {erro}")
+                return
+
+            _finalizar(conn, id_tarefa, CONCLUIDA)
+        logger.info("Tarefa %s concluída.", id_tarefa)
+
+
+class ExecutorTarefas:
+    """
+    Pool de threads que executa tarefas pelo id.
+    """
+
+    def __init__(self, workers: int = TAREFAS_WORKERS):
+        self.workers = max(1, workers)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def enviar(self, id_tarefa: str):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="tarefas"
+                    )
+        self._pool.submit(executar_tarefa, id_tarefa)
+
+    def encerrar(self, esperar: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=esperar, cancel_futures=True)
+            self._pool = None
+
+
+_executor = ExecutorTarefas()
+
+
+def retomar_tarefas_pendentes() -> int:
+    """
+    Coloca na fila as tarefas pendentes e as abandonadas por um processo
+    que caiu. Chamada ao iniciar a aplicação. Se ainda houver tarefas
+    "executando" atualizadas há pouco (o processo pode ter acabado de
+    cair), confere de novo depois de TAREFA_ABANDONADA_APOS segundos.
+    Retorna quantas enviou.
+    """
+    agora = time.time()
+    limite = agora - TAREFA_ABANDONADA_APOS
+    with conexao() as conn:
+        # Cancelamento pedido a um worker que morreu antes de atender.
+        conn.execute(
+            """
+            UPDATE tarefas SET estado = ?, concluida_em = ?
+            WHERE estado = ? AND cancelar = 1 AND atualizada_em < ?
+            """,
+            (CANCELADA, agora, EXECUTANDO, limite),
+        )
+        conn.commit()
+        ids = [
+            linha[0] for linha in conn.execute(
+                """
+                SELECT id FROM tarefas
+                WHERE cancelar = 0
+                  AND (estado = ? OR (estado = ? AND atualizada_em < ?))
+                ORDER BY criada_em
+                """,
+                (PENDENTE, EXECUTANDO, limite),
+            )
+        ]
+        recentes = conn.execute(
+            "SELECT COUNT(*) FROM tarefas WHERE estado = ? AND atualizada_em >= ?",
+            (EXECUTANDO, limite),
+        ).fetchone()[0]
+
+    for id_tarefa in ids:
+        _executor.enviar(id_tarefa)
+    if ids:
+        logger.info("%s tarefa(s) retomada(s).", len(ids))
+    if recentes and TAREFA_ABANDONADA_APOS > 0:
+        conferir = threading.Timer(TAREFA_ABANDONADA_APOS + 1, retomar_tarefas_pendentes)
+        conferir.daemon = True
+        conferir.start()
+    return len(ids)
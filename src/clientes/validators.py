@@ -1,6 +1,14 @@
 import re
 from datetime import datetime
 
+# Padrões pré-compilados (usados também pela validação em colunas).
+_PADRAO_EMAIL = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+_NAO_DIGITO = re.compile(r"\D")
+_SEM_MASCARA_CPF = str.maketrans("", "", ".- ")
+
+# Dias de cada mês (fevereiro ajustado para anos bissextos).
+_DIAS_NO_MES = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
 
 def validar_email(email: str) -> bool:
     """
@@ -10,8 +18,7 @@ def validar_email(email: str) -> bool:
     if not email:
         return True
 
-    padrao = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-    return re.match(padrao, email) is not None
+    return _PADRAO_EMAIL.match(email) is not None
 
 
 def validar_cpf(cpf: str) -> bool:
@@ -23,7 +30,7 @@ def validar_cpf(cpf: str) -> bool:
     if not cpf:
         return True
 
-    cpf_limpo = re.sub(r"\D", "", cpf)
+    cpf_limpo = _NAO_DIGITO.sub("", cpf)
     return len(cpf_limpo) == 11
 
 
@@ -40,3 +47,118 @@ def validar_data(data_str: str) -> bool:
         return True
     except ValueError:
         return False
+
+
+def normalizar_cpf(cpf: str):
+    """
+    Retorna apenas os dígitos do CPF (sem máscara).
+    CPF vazio vira None, para não colidir no índice único.
+    """
+    if not cpf:
+        return None
+    return _NAO_DIGITO.sub("", cpf) or None
+
+
+def normalizar_email(email: str):
+    """
+    Retorna o email sem espaços nas pontas e em minúsculas.
+    Email vazio vira None, para não colidir no índice único.
+    """
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+
+def normalizar_data(data_str: str):
+    """
+    Converte uma data dd/mm/aaaa para aaaa-mm-dd (ISO, que ordena como
+    texto). Data vazia ou inválida vira None.
+    """
+    if not data_str or _data_invalida(data_str):
+        return None
+    if len(data_str) == 10 and data_str[2] == "/" and data_str[5] == "/":
+        return f"{data_str[6:]}-{data_str[3:5]}-{data_str[:2]}"
+    return datetime.strptime(data_str, "%d/%m/%Y").date().isoformat()
+
+
+def cpf_digitos_verificadores_validos(cpf: str) -> bool:
+    """
+    Confere os dois dígitos verificadores do CPF (aceita com ou sem máscara).
+    CPFs com todos os dígitos iguais (000.000.000-00 etc.) são inválidos.
+    """
+    digitos = _NAO_DIGITO.sub("", cpf or "")
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        return False
+
+    numeros = [ord(c) - 48 for c in digitos]
+    soma = sum(n * peso for n, peso in zip(numeros, range(10, 1, -1)))
+    if (soma * 10 % 11) % 10 != numeros[9]:
+        return False
+    soma = sum(n * peso for n, peso in zip(numeros, range(11, 1, -1)))
+    return (soma * 10 % 11) % 10 == numeros[10]
+
+
+def _cpf_invalido(cpf: str) -> bool:
+    # Mesma regra de validar_cpf, com atalhos para os formatos comuns
+    # (só dígitos ou com máscara) que evitam a regex.
+    if not cpf:
+        return False
+    if cpf.isdecimal():
+        return len(cpf) != 11
+    sem_mascara = cpf.translate(_SEM_MASCARA_CPF)
+    if sem_mascara.isdecimal():
+        return len(sem_mascara) != 11
+    return len(_NAO_DIGITO.sub("", cpf)) != 11
+
+
+def _data_invalida(data_str: str) -> bool:
+    # Mesma regra de validar_data. O formato canônico dd/mm/aaaa é
+    # conferido com aritmética; o resto (ex.: "1/2/1990") cai no strptime.
+    if not data_str:
+        return False
+    if (
+        len(data_str) == 10
+        and data_str[2] == "/"
+        and data_str[5] == "/"
+        and data_str[:2].isdecimal()
+        and data_str[3:5].isdecimal()
+        and data_str[6:].isdecimal()
+    ):
+        dia = int(data_str[:2])
+        mes = int(data_str[3:5])
+        ano = int(data_str[6:])
+        if ano < 1 or mes < 1 or mes > 12 or dia < 1:
+            return True
+        if mes == 2 and ano % 4 == 0 and (ano % 100 != 0 or ano % 400 == 0):
+            return dia > 29
+        return dia > _DIAS_NO_MES[mes - 1]
+    return not validar_data(data_str)
+
+
+def validar_colunas(nomes=None, emails=None, cpfs=None, datas=None,
+                    verificar_digitos_cpf: bool = False) -> dict:
+    """
+    Valida colunas inteiras de uma vez (listas, tuplas ou arrays de str).
+    Retorna um dict com uma máscara por coluna informada, na mesma ordem
+    das linhas: True indica valor inválido. Chaves: "nome", "email",
+    "cpf" e "data_nascimento".
+    As regras são as mesmas das funções validar_* (nome é obrigatório);
+    com verificar_digitos_cpf=True o CPF também precisa ter dígitos
+    verificadores corretos.
+    """
+    mascaras = {}
+    if nomes is not None:
+        mascaras["nome"] = [not nome for nome in nomes]
+    if emails is not None:
+        casar = _PADRAO_EMAIL.match
+        mascaras["email"] = [bool(email) and casar(email) is None for email in emails]
+    if cpfs is not None:
+        if verificar_digitos_cpf:
+            mascaras["cpf"] = [
+                bool(cpf) and not cpf_digitos_verificadores_validos(cpf) for cpf in cpfs
+            ]
+        else:
+            mascaras["cpf"] = [_cpf_invalido(cpf) for cpf in cpfs]
+    if datas is not None:
+        mascaras["data_nascimento"] = [_data_invalida(data) for data in datas]
+    return mascaras
@@ -1,5 +1,15 @@
+import csv
+import io
+import logging
+import sqlite3
+import zlib
+from datetime import date
+from itertools import islice
+
 from flask import (
     Flask,
+    Response,
+    stream_with_context,
     render_template,
     request,
     redirect,
@@ -7,19 +17,75 @@ from flask import (
     jsonify,
 )
 
-from src.clientes.database import criar_tabela
+from markupsafe import Markup
+
+from src.clientes.cache import cache_fragmentos, estatisticas_cache
+from src.clientes.database import (
+    obter_pool,
+    estatisticas_pool,
+    configuracao_armazenamento,
+    iniciar_checkpoint_periodico,
+    estatisticas_sql,
+    limpar_estatisticas_sql,
+    SQL_LENTO_MS,
+)
 from src.clientes.repository import (
     inserir_cliente,
-    listar_clientes,
+    listar_clientes_pagina,
+    listar_aniversariantes,
+    listar_nascidos_no_mes,
+    listar_por_idade,
+    LIMITE_MAXIMO,
+    LIMITE_PADRAO,
     buscar_cliente_por_id,
     buscar_clientes_por_nome,
+    buscar_cliente_por_cpf,
+    buscar_cliente_por_email,
+    buscar_clientes_por_cpfs,
+    exportar_clientes,
+    versao_tabela,
+    VersaoDesatualizada,
     atualizar_cliente,
     excluir_cliente,
 )
+from src.clientes.deduplicacao import LIMIAR_PADRAO, ler_relatorio
+from src.clientes.escrita import estatisticas_escrita
+from src.clientes.migracoes import preparar_esquema
+from src.clientes.replica import (
+    REPLICA_LEITURA,
+    encerrar_leitura,
+    estatisticas_replica,
+    iniciar_leitura,
+    iniciar_replica,
+)
+from src.clientes.service import processar_lote_clientes, sincronizar_lote_clientes
+from src.clientes.tarefas import (
+    DEDUPLICACAO,
+    INSERCAO,
+    LOTE_ASSINCRONO_A_PARTIR_DE,
+    UPSERT,
+    EstadoInvalido,
+    TarefaNaoEncontrada,
+    cancelar_tarefa,
+    criar_tarefa,
+    listar_tarefas,
+    obter_tarefa,
+    retomar_tarefa,
+    retomar_tarefas_pendentes,
+)
 from src.clientes.validators import (
     validar_email,
     validar_cpf,
     validar_data,
+    normalizar_cpf,
+)
+from src.web.metricas import instrumentar
+from src.web.serializacao import (
+    campos_da_projecao,
+    codificar_json,
+    resposta_json,
+    serializar_linhas,
+    serializar_ndjson,
 )
 
 
@@ -35,12 +101,174 @@ def serializar_cliente(row) -> dict:
     }
 
 
+def etag_cliente(row) -> str:
+    """ETag forte de um cliente: muda a cada nova versão do registro."""
+    return f"c{row['id']}-v{row['versao']}"
+
+
+def versao_do_if_match(id_cliente: int):
+    """
+    Lê o cabeçalho If-Match de um PUT/DELETE.
+    Retorna a versão esperada do cliente, ou None se não houver condição
+    (sem cabeçalho ou "*"). Levanta ValueError se o ETag não for deste
+    cliente.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    for etag in if_match.as_set():
+        prefixo = f"c{id_cliente}-v"
+        if etag.startswith(prefixo) and etag[len(prefixo):].isdigit():
+            return int(etag[len(prefixo):])
+    raise ValueError("If-Match não corresponde a este cliente.")
+
+
+def resposta_com_etag(dados, status: int, etag: str):
+    """Monta a resposta JSON já com o cabeçalho ETag."""
+    resposta = jsonify(dados)
+    resposta.status_code = status
+    resposta.set_etag(etag)
+    return resposta
+
+
+def resposta_pagina(clientes, campos: tuple, proximo_cursor, etag: str):
+    """
+    Resposta {"clientes": [...], "next_cursor": ...} das listagens, com as
+    linhas indo direto para o JSON (sem dict por cliente).
+    """
+    corpo = (
+        b'{"clientes":' + serializar_linhas(clientes, campos)
+        + b',"next_cursor":' + codificar_json(proximo_cursor) + b"}"
+    )
+    return resposta_json(corpo, 200, etag)
+
+
+def mes_dia(texto: str) -> tuple:
+    """
+    Lê "dd/mm" (ou "dd/mm/aaaa", ignorando o ano) como (mes, dia).
+    """
+    partes = texto.strip().split("/")
+    if len(partes) not in (2, 3) or not all(p.isdigit() for p in partes):
+        raise ValueError(f"Data inválida: {texto}. Use dd/mm.")
+    return int(partes[1]), int(partes[0])
+
+
+def linhas_html(termo: str, limite: int, apos: str, ordem: str, versao: int) -> tuple:
+    """
+    Renderiza as linhas <tr> de uma página da listagem HTML (_linhas.html).
+    Com 'termo' a página vem da busca por nome (mais relevantes primeiro,
+    'apos' é quantos já foram mostrados); sem ele, da paginação por chave.
+    O HTML fica em cache_fragmentos pela versão da tabela + parâmetros.
+    Retorna (html, proxima); 'proxima' são os parâmetros da página
+    seguinte, ou None na última.
+    """
+    def renderizar():
+        proxima = None
+        if termo:
+            deslocamento = int(apos or 0)
+            clientes = buscar_clientes_por_nome(
+                termo, limite=limite, deslocamento=deslocamento
+            )
+            # Página cheia: pode haver mais (no pior caso a próxima vem vazia).
+            if len(clientes) == limite:
+                proxima = {"q": termo, "after": deslocamento + limite}
+        else:
+            clientes, cursor = listar_clientes_pagina(limite=limite, apos=apos, ordem=ordem)
+            if cursor:
+                proxima = {"after": cursor}
+                if ordem != "id":
+                    proxima["sort"] = ordem
+        if proxima and limite != LIMITE_PADRAO:
+            proxima["limit"] = limite
+        html = render_template(
+            "_linhas.html", clientes=clientes, proxima=proxima, primeira=not apos
+        )
+        return Markup(html), proxima
+
+    return cache_fragmentos.obter_ou_carregar(
+        ("linhas", versao, termo, limite, apos, ordem), renderizar
+    )
+
+
+def parametros_listagem_html() -> tuple:
+    """
+    Lê ?q=, ?limit=, ?after= e ?sort= das rotas HTML de listagem.
+    """
+    return (
+        request.args.get("q", "").strip(),
+        request.args.get("limit", LIMITE_PADRAO, type=int),
+        request.args.get("after") or None,
+        request.args.get("sort", "id"),
+    )
+
+
+# Métodos cujas leituras podem ir para a réplica (ver replica.py).
+METODOS_LEITURA = ("GET", "HEAD", "OPTIONS")
+
+# Cookie com a versão da tabela após a última escrita do cliente.
+COOKIE_VERSAO = "clientes_versao"
+
+
+def consistencia_da_requisicao() -> dict:
+    """
+    Argumentos de iniciar_leitura() para a requisição atual: escritas e
+    quem pede ?consistencia=forte (ou o cabeçalho X-Consistencia: forte)
+    leem do banco principal; o cookie de versão garante que o cliente veja
+    as próprias escritas.
+    """
+    forte = (
+        request.method not in METODOS_LEITURA
+        or request.args.get("consistencia") == "forte"
+        or request.headers.get("X-Consistencia") == "forte"
+    )
+    return {
+        "forte": forte,
+        "versao_minima": request.cookies.get(COOKIE_VERSAO, type=int),
+    }
+
+
 def criar_app() -> Flask:
     app = Flask(__name__)
 
-    # Executa ao iniciar o servidor (Flask 3.x – sem before_first_request)
+    # Executa ao iniciar o servidor (Flask 3.x – sem before_first_request).
+    # Com o banco já migrado, preparar_esquema() é uma única consulta.
     with app.app_context():
-        criar_tabela()
+        versao = preparar_esquema()
+        if app.logger.isEnabledFor(logging.INFO):
+            app.logger.info(
+                "Esquema v%s; armazenamento SQLite: %s",
+                versao,
+                configuracao_armazenamento(),
+            )
+        iniciar_checkpoint_periodico()
+        retomar_tarefas_pendentes()
+        iniciar_replica()
+
+    # Cada requisição usa uma única conexão do pool, devolvida no teardown.
+    @app.before_request
+    def fixar_conexao_do_pool():
+        obter_pool().fixar()
+        iniciar_leitura(**consistencia_da_requisicao())
+
+    @app.teardown_request
+    def liberar_conexao_do_pool(exc):
+        encerrar_leitura()
+        obter_pool().liberar()
+
+    # Com a réplica de leitura ligada, cada escrita bem-sucedida devolve a
+    # versão da tabela num cookie; as leituras seguintes do mesmo cliente
+    # (em qualquer processo) só usam uma réplica que já tenha essa versão.
+    if REPLICA_LEITURA:
+        @app.after_request
+        def marcar_versao_escrita(resposta):
+            if request.method not in METODOS_LEITURA and resposta.status_code < 400:
+                resposta.set_cookie(
+                    COOKIE_VERSAO, str(versao_tabela()), httponly=True, samesite="Lax"
+                )
+            return resposta
+
+    # Latência, status, tamanhos e SQL por rota; expostos em GET /metrics.
+    instrumentar(app)
 
     # ============================
     # ROTAS HTML (INTERFACE WEB)
@@ -48,8 +276,42 @@ def criar_app() -> Flask:
 
     @app.route("/")
     def index():
-        clientes = listar_clientes()
-        return render_template("index.html", clientes=clientes)
+        """
+        Primeira página da listagem (ou da busca, com ?q=). As seguintes
+        chegam como fragmentos de /clientes/linhas conforme a rolagem.
+        """
+        termo, limite, apos, ordem = parametros_listagem_html()
+        versao = versao_tabela()
+        etag = f"h{versao}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+        try:
+            linhas, _ = linhas_html(termo, limite, apos, ordem, versao)
+        except ValueError:
+            return "Parâmetros de paginação inválidos.", 400
+        resposta = Response(render_template("index.html", termo=termo, linhas=linhas))
+        resposta.set_etag(etag)
+        return resposta
+
+    @app.get("/clientes/linhas")
+    def fragmento_clientes():
+        """
+        GET /clientes/linhas?q=&after=&limit=&sort=
+        Só as linhas <tr> de uma página (mesmos parâmetros de /), terminando
+        na linha "carregar-mais" com a URL da página seguinte.
+        """
+        termo, limite, apos, ordem = parametros_listagem_html()
+        versao = versao_tabela()
+        etag = f"f{versao}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+        try:
+            linhas, _ = linhas_html(termo, limite, apos, ordem, versao)
+        except ValueError:
+            return "Parâmetros de paginação inválidos.", 400
+        resposta = Response(str(linhas), mimetype="text/html")
+        resposta.set_etag(etag)
+        return resposta
 
     @app.route("/novo", methods=["GET", "POST"])
     def novo_cliente():
@@ -72,8 +334,11 @@ def criar_app() -> Flask:
                 erros.append("A data deve estar no formato dd/mm/aaaa.")
 
             if not erros:
-                inserir_cliente(nome, email, telefone, cpf, data_nascimento)
-                return redirect(url_for("index"))
+                try:
+                    inserir_cliente(nome, email, telefone, cpf, data_nascimento)
+                    return redirect(url_for("index"))
+                except sqlite3.IntegrityError:
+                    erros.append("Já existe um cliente com este CPF ou email.")
 
             dados = {
                 "nome": nome,
@@ -109,10 +374,6 @@ def criar_app() -> Flask:
 
     @app.route("/editar/<int:id_cliente>", methods=["GET", "POST"])
     def editar_cliente_view(id_cliente):
-        cliente = buscar_cliente_por_id(id_cliente)
-        if not cliente:
-            return "Cliente não encontrado.", 404
-
         erros = []
 
         if request.method == "POST":
@@ -132,10 +393,15 @@ def criar_app() -> Flask:
                 erros.append("A data deve estar no formato dd/mm/aaaa.")
 
             if not erros:
-                atualizar_cliente(
-                    id_cliente, nome, email, telefone, cpf, data_nascimento
-                )
-                return redirect(url_for("index"))
+                try:
+                    atualizado = atualizar_cliente(
+                        id_cliente, nome, email, telefone, cpf, data_nascimento
+                    )
+                    if not atualizado:
+                        return "Cliente não encontrado.", 404
+                    return redirect(url_for("index"))
+                except sqlite3.IntegrityError:
+                    erros.append("Já existe um cliente com este CPF ou email.")
 
             dados = {
                 "nome": nome,
@@ -153,6 +419,10 @@ def criar_app() -> Flask:
                 erros=erros,
             )
 
+        cliente = buscar_cliente_por_id(id_cliente)
+        if not cliente:
+            return "Cliente não encontrado.", 404
+
         dados = {
             "nome": cliente["nome"],
             "email": cliente["email"],
@@ -171,11 +441,9 @@ def criar_app() -> Flask:
 
     @app.route("/excluir/<int:id_cliente>", methods=["POST"])
     def excluir_cliente_route(id_cliente):
-        cliente = buscar_cliente_por_id(id_cliente)
-        if not cliente:
+        if not excluir_cliente(id_cliente):
             return "Cliente não encontrado.", 404
 
-        excluir_cliente(id_cliente)
         return redirect(url_for("index"))
 
     # ============================
@@ -186,27 +454,214 @@ def criar_app() -> Flask:
     def api_listar_clientes():
         """
         GET /api/clientes
-        Opcional: ?q=nome_parcial  para buscar por nome
+        Opcional: ?q=nome_parcial  para buscar por nome (prefixos das
+        palavras, sem acento/maiúscula, mais relevantes primeiro, até ?limit=)
+        Paginação: ?limit=50&after=<next_cursor>&sort=id|nome|-id|-nome
+        Projeção: ?fields=id,nome,email (só essas colunas são lidas)
+        Resposta: {"clientes": [...], "next_cursor": "..." ou null}
         """
+        # O ETag depende só do contador de alterações da tabela e dos
+        # parâmetros: se nada mudou, responde 304 sem consultar a lista.
+        etag = f"l{versao_tabela()}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+
         termo = request.args.get("q", "").strip()
-        if termo:
-            clientes = buscar_clientes_por_nome(termo)
-        else:
-            clientes = listar_clientes()
+        limite = request.args.get("limit", LIMITE_PADRAO, type=int)
+        proximo_cursor = None
+        try:
+            campos = campos_da_projecao(request.args.get("fields"))
+            if termo:
+                clientes = buscar_clientes_por_nome(termo, limite=limite, colunas=campos)
+            else:
+                clientes, proximo_cursor = listar_clientes_pagina(
+                    limite=limite,
+                    apos=request.args.get("after") or None,
+                    ordem=request.args.get("sort", "id"),
+                    colunas=campos,
+                )
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+        return resposta_pagina(clientes, campos, proximo_cursor, etag)
 
-        dados = [serializar_cliente(c) for c in clientes]
-        return jsonify(dados), 200
+    @app.get("/api/clientes/export")
+    def api_exportar_clientes():
+        """
+        GET /api/clientes/export?format=ndjson|csv
+        Filtros opcionais: ?q=nome_parcial e ?after=<id>
+        Projeção: ?fields=id,nome,email
+        Envia a tabela em streaming, direto do cursor, sem montar a
+        resposta inteira em memória.
+        """
+        formato = request.args.get("format", "ndjson")
+        if formato not in ("ndjson", "csv"):
+            return jsonify({"erro": "Use format=ndjson ou format=csv."}), 400
+        try:
+            apos_id = int(request.args.get("after") or 0)
+        except ValueError:
+            return jsonify({"erro": "O parâmetro 'after' deve ser um id."}), 400
+        try:
+            campos = campos_da_projecao(request.args.get("fields"))
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        linhas = exportar_clientes(
+            termo=request.args.get("q", "").strip() or None,
+            apos_id=apos_id,
+            colunas=campos,
+        )
+
+        def gerar():
+            # Junta 500 linhas por escrita para não mandar um chunk por linha.
+            if formato == "ndjson":
+                while bloco := list(islice(linhas, 500)):
+                    yield serializar_ndjson(bloco, campos)
+                return
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(campos)
+            while bloco := list(islice(linhas, 500)):
+                escritor.writerows(bloco)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+
+        mimetype = "text/csv" if formato == "csv" else "application/x-ndjson"
+        return Response(
+            stream_with_context(gerar()),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f"attachment; filename=clientes.{formato}"
+            },
+        )
+
+    @app.get("/api/clientes/aniversariantes")
+    def api_listar_aniversariantes():
+        """
+        GET /api/clientes/aniversariantes?de=20/12&ate=10/01
+        Clientes que fazem aniversário entre as datas (dd/mm, inclusive;
+        pode atravessar a virada do ano). Sem datas: os de hoje.
+        Ou ?mes=5 para os nascidos em um mês.
+        Paginação e projeção como em GET /api/clientes (?limit=, ?after=,
+        ?fields=), em ordem de aniversário.
+        """
+        hoje = date.today()
+        etag = f"a{versao_tabela()}-{hoje.toordinal()}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+
+        paginacao = {
+            "limite": request.args.get("limit", LIMITE_PADRAO, type=int),
+            "apos": request.args.get("after") or None,
+        }
+        try:
+            campos = campos_da_projecao(request.args.get("fields"))
+            if "mes" in request.args:
+                clientes, proximo_cursor = listar_nascidos_no_mes(
+                    int(request.args["mes"]), colunas=campos, **paginacao
+                )
+            else:
+                de = request.args.get("de")
+                inicio = mes_dia(de) if de else (hoje.month, hoje.day)
+                ate = request.args.get("ate")
+                fim = mes_dia(ate) if ate else inicio
+                clientes, proximo_cursor = listar_aniversariantes(
+                    inicio, fim, colunas=campos, **paginacao
+                )
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+        return resposta_pagina(clientes, campos, proximo_cursor, etag)
+
+    @app.get("/api/clientes/idade")
+    def api_listar_por_idade():
+        """
+        GET /api/clientes/idade?de=18&ate=30
+        Clientes com idade entre 'de' e 'ate' anos (inclusive), do mais
+        velho para o mais novo. Sem 'ate', só a idade 'de'.
+        Paginação e projeção como em GET /api/clientes.
+        """
+        hoje = date.today()
+        etag = f"i{versao_tabela()}-{hoje.toordinal()}-{zlib.crc32(request.query_string):08x}"
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+
+        idade_minima = request.args.get("de", type=int)
+        if idade_minima is None:
+            return jsonify({"erro": "Informe a idade: ?de=18&ate=30."}), 400
+        # 'ate' inválido não vira 'de' em silêncio; ate < de cai no
+        # ValueError de listar_por_idade.
+        idade_maxima = request.args.get("ate", type=int)
+        if idade_maxima is None:
+            if "ate" in request.args:
+                return jsonify({"erro": "'ate' deve ser um número inteiro."}), 400
+            idade_maxima = idade_minima
+        try:
+            campos = campos_da_projecao(request.args.get("fields"))
+            clientes, proximo_cursor = listar_por_idade(
+                idade_minima,
+                idade_maxima,
+                hoje=hoje,
+                limite=request.args.get("limit", LIMITE_PADRAO, type=int),
+                apos=request.args.get("after") or None,
+                colunas=campos,
+            )
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+        return resposta_pagina(clientes, campos, proximo_cursor, etag)
+
+    @app.get("/api/clientes/duplicados")
+    def api_listar_duplicados():
+        """
+        GET /api/clientes/duplicados?limiar=0.7&limit=50&after=<next_cursor>
+        Pares de clientes que parecem ser a mesma pessoa, lidos do último
+        relatório gerado (POST /api/clientes/duplicados ou o comando
+        python -m src.cli.deduplicar --salvar); 'limiar' filtra os pares
+        do relatório. 404 se nenhum relatório foi gerado.
+        """
+        limiar = request.args.get("limiar", type=float)
+        limite = request.args.get("limit", LIMITE_PADRAO, type=int)
+        apos = request.args.get("after", -1, type=int)
+        if (limiar is not None and not 0 <= limiar <= 1) or not 1 <= limite <= LIMITE_MAXIMO:
+            return jsonify(
+                {"erro": f"Use 0 <= limiar <= 1 e 1 <= limit <= {LIMITE_MAXIMO}."}
+            ), 400
+
+        relatorio = ler_relatorio(limite, apos, limiar)
+        if relatorio is None:
+            return jsonify({
+                "erro": "Nenhum relatório de duplicados gerado; use POST /api/clientes/duplicados."
+            }), 404
+        relatorio["next_cursor"] = relatorio.pop("proxima_posicao")
+        return resposta_json(codificar_json(relatorio))
+
+    @app.post("/api/clientes/duplicados")
+    def api_gerar_duplicados():
+        """
+        POST /api/clientes/duplicados?limiar=0.6
+        Gera um novo relatório de duplicados numa tarefa em segundo plano
+        (202 com o id da tarefa; acompanhe em /api/jobs/<id>).
+        """
+        limiar = request.args.get("limiar", LIMIAR_PADRAO, type=float)
+        if not 0 <= limiar <= 1:
+            return jsonify({"erro": "Use 0 <= limiar <= 1."}), 400
+        return resposta_tarefa_criada(criar_tarefa(DEDUPLICACAO, [{"limiar": limiar}]))
 
     @app.get("/api/clientes/<int:id_cliente>")
     def api_obter_cliente(id_cliente: int):
         """
         GET /api/clientes/<id>
+        Responde 304 se o If-None-Match tiver o ETag atual.
         """
         cliente = buscar_cliente_por_id(id_cliente)
         if not cliente:
             return jsonify({"erro": "Cliente não encontrado"}), 404
 
-        return jsonify(serializar_cliente(cliente)), 200
+        etag = etag_cliente(cliente)
+        if request.if_none_match.contains(etag):
+            return "", 304, {"ETag": f'"{etag}"'}
+        return resposta_com_etag(serializar_cliente(cliente), 200, etag)
 
     @app.post("/api/clientes")
     def api_criar_cliente():
@@ -242,20 +697,67 @@ def criar_app() -> Flask:
         if erros:
             return jsonify({"erros": erros}), 400
 
-        inserir_cliente(nome, email, telefone, cpf, data_nascimento)
-        # Recupera o último cliente inserido (mais simples: listar e pegar o último)
-        cliente = listar_clientes()[-1]
-        return jsonify(serializar_cliente(cliente)), 201
+        try:
+            cliente = inserir_cliente(nome, email, telefone, cpf, data_nascimento)
+        except sqlite3.IntegrityError:
+            return jsonify({"erro": "Já existe um cliente com este CPF ou email"}), 409
+        return resposta_com_etag(serializar_cliente(cliente), 201, etag_cliente(cliente))
+
+    @app.get("/api/clientes/cpf/<cpf>")
+    def api_obter_cliente_por_cpf(cpf: str):
+        """
+        GET /api/clientes/cpf/<cpf>
+        Aceita o CPF com ou sem máscara.
+        """
+        cliente = buscar_cliente_por_cpf(cpf)
+        if not cliente:
+            return jsonify({"erro": "Cliente não encontrado"}), 404
+
+        return jsonify(serializar_cliente(cliente)), 200
+
+    @app.get("/api/clientes/email/<email>")
+    def api_obter_cliente_por_email(email: str):
+        """
+        GET /api/clientes/email/<email>
+        """
+        cliente = buscar_cliente_por_email(email)
+        if not cliente:
+            return jsonify({"erro": "Cliente não encontrado"}), 404
+
+        return jsonify(serializar_cliente(cliente)), 200
+
+    @app.post("/api/clientes/cpfs")
+    def api_buscar_clientes_por_cpfs():
+        """
+        POST /api/clientes/cpfs
+        Body JSON: {"cpfs": ["123.456.789-01", "98765432100", ...]}
+        Busca todos os CPFs informados em uma única consulta.
+        """
+        payload = request.get_json(silent=True) or {}
+        cpfs = payload.get("cpfs")
+        if not isinstance(cpfs, list):
+            return jsonify({"erro": "Envie {\"cpfs\": [...]} como body."}), 400
+
+        encontrados = buscar_clientes_por_cpfs(str(c) for c in cpfs)
+        nao_encontrados = [
+            c for c in cpfs if normalizar_cpf(str(c)) not in encontrados
+        ]
+        return jsonify({
+            "encontrados": [serializar_cliente(c) for c in encontrados.values()],
+            "nao_encontrados": nao_encontrados,
+        }), 200
 
     @app.put("/api/clientes/<int:id_cliente>")
     def api_atualizar_cliente(id_cliente: int):
         """
         PUT /api/clientes/<id>
         JSON igual ao POST.
+        Com If-Match: <ETag>, só atualiza se o cliente não mudou (senão 412).
         """
-        cliente = buscar_cliente_por_id(id_cliente)
-        if not cliente:
-            return jsonify({"erro": "Cliente não encontrado"}), 404
+        try:
+            versao_esperada = versao_do_if_match(id_cliente)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 412
 
         payload = request.get_json(silent=True) or {}
         erros = []
@@ -278,136 +780,230 @@ def criar_app() -> Flask:
         if erros:
             return jsonify({"erros": erros}), 400
 
-        atualizar_cliente(id_cliente, nome, email, telefone, cpf, data_nascimento)
-        cliente_atualizado = buscar_cliente_por_id(id_cliente)
-        return jsonify(serializar_cliente(cliente_atualizado)), 200
+        try:
+            cliente_atualizado = atualizar_cliente(
+                id_cliente, nome, email, telefone, cpf, data_nascimento,
+                versao_esperada=versao_esperada,
+            )
+        except sqlite3.IntegrityError:
+            return jsonify({"erro": "Já existe um cliente com este CPF ou email"}), 409
+        except VersaoDesatualizada as e:
+            return jsonify({"erro": str(e)}), 412
+        if not cliente_atualizado:
+            return jsonify({"erro": "Cliente não encontrado"}), 404
+        return resposta_com_etag(
+            serializar_cliente(cliente_atualizado), 200, etag_cliente(cliente_atualizado)
+        )
 
     @app.delete("/api/clientes/<int:id_cliente>")
     def api_excluir_cliente(id_cliente: int):
         """
         DELETE /api/clientes/<id>
+        Com If-Match: <ETag>, só exclui se o cliente não mudou (senão 412).
         """
-        cliente = buscar_cliente_por_id(id_cliente)
-        if not cliente:
-            return jsonify({"erro": "Cliente não encontrado"}), 404
+        try:
+            if not excluir_cliente(
+                id_cliente, versao_esperada=versao_do_if_match(id_cliente)
+            ):
+                return jsonify({"erro": "Cliente não encontrado"}), 404
+        except (ValueError, VersaoDesatualizada) as e:
+            return jsonify({"erro": str(e)}), 412
 
-        excluir_cliente(id_cliente)
         return jsonify({"mensagem": "Cliente excluído com sucesso"}), 200
 
-    return app
-
-
-app = criar_app()
-
-if __name__ == "__main__":
-    app.run(debug=True)
-
-def criar_app() -> Flask:
-    app = Flask(__name__)
-
-    with app.app_context():
-        criar_tabela()
-
-    # ============================
-    # ROTAS HTML
-    # ============================
-
-    @app.route("/")
-    def index():
-        clientes = listar_clientes()
-        return render_template("index.html", clientes=clientes)
-
-    # (suas outras rotas HTML /novo, /editar, /excluir ficam aqui)
-
-    # ============================
-    # ROTAS API
-    # ============================
-
-    @app.get("/api/clientes")
-    def api_listar_clientes():
-        termo = request.args.get("q", "").strip()
-        if termo:
-            clientes = buscar_clientes_por_nome(termo)
-        else:
-            clientes = listar_clientes()
-        dados = [serializar_cliente(c) for c in clientes]
-        return jsonify(dados), 200
-
-    @app.post("/api/clientes")
-    def api_criar_cliente():
-        payload = request.get_json(silent=True) or {}
-        erros = []
-
-        nome = (payload.get("nome") or "").strip()
-        email = (payload.get("email") or "").strip()
-        telefone = (payload.get("telefone") or "").strip()
-        cpf = (payload.get("cpf") or "").strip()
-        data_nascimento = (payload.get("data_nascimento") or "").strip()
-
-        if not nome:
-            erros.append("O campo 'nome' é obrigatório.")
-        if not validar_email(email):
-            erros.append("O campo 'email' é inválido.")
-        if not validar_cpf(cpf):
-            erros.append("O campo 'cpf' deve possuir 11 dígitos.")
-        if not validar_data(data_nascimento):
-            erros.append("O campo 'data_nascimento' deve estar no formato dd/mm/aaaa.")
-
-        if erros:
-            return jsonify({"erros": erros}), 400
-
-        inserir_cliente(nome, email, telefone, cpf, data_nascimento)
-        cliente = listar_clientes()[-1]
-        return jsonify(serializar_cliente(cliente)), 201
-
     @app.post("/api/clientes/lote")
     def api_criar_clientes_lote():
         """
-        Endpoint PLUS engatilhado.
+        POST /api/clientes/lote
         Aceita uma lista (array JSON) com vários clientes.
+        Valida tudo e grava os válidos em transações agrupadas
+        (ver processar_lote_clientes).
+        Com ?async=1 (ou lotes grandes) vira uma tarefa: ver lote_em_segundo_plano.
         """
         payload = request.get_json(silent=True)
 
         if not isinstance(payload, list):
             return jsonify({"erro": "Envie uma lista (array JSON) como body."}), 400
+        if lote_em_segundo_plano(payload):
+            return resposta_tarefa_criada(criar_tarefa(INSERCAO, payload))
 
-        criadas = []
-        falhas = []
+        criadas, falhas = processar_lote_clientes(payload)
 
-        for indice, cliente in enumerate(payload):
-            nome = (cliente.get("nome") or "").strip()
-            email = (cliente.get("email") or "").strip()
-            telefone = (cliente.get("telefone") or "").strip()
-            cpf = (cliente.get("cpf") or "").strip()
-            data_nascimento = (cliente.get("data_nascimento") or "").strip()
+        return resposta_json(codificar_json({
+            "criadas": len(criadas),
+            "ids": [cliente["id"] for cliente in criadas],
+            "falhas": len(falhas),
+            "detalhes_falhas": falhas,
+        }), 207)
 
-            erros = []
+    @app.put("/api/clientes/lote")
+    def api_sincronizar_clientes_lote():
+        """
+        PUT /api/clientes/lote
+        Upsert por CPF: aceita uma lista (array JSON) de clientes; CPFs
+        novos são inseridos e os existentes atualizados (quem veio igual
+        não é regravado). Ver sincronizar_lote_clientes.
+        Resposta: totais por situação e "resultados", um por cliente, na
+        ordem enviada ({"indice", "situacao", "id"} ou com "erros").
+        Com ?async=1 (ou lotes grandes) vira uma tarefa: ver lote_em_segundo_plano.
+        """
+        payload = request.get_json(silent=True)
 
-            if not nome:
-                erros.append("nome obrigatório")
-            if not validar_email(email):
-                erros.append("email inválido")
-            if not validar_cpf(cpf):
-                erros.append("cpf inválido (precisa ter 11 dígitos)")
-            if not validar_data(data_nascimento):
-                erros.append("data inválida (formato dd/mm/aaaa)")
+        if not isinstance(payload, list):
+            return jsonify({"erro": "Envie uma lista (array JSON) como body."}), 400
+        if lote_em_segundo_plano(payload):
+            return resposta_tarefa_criada(criar_tarefa(UPSERT, payload))
+
+        resultados = sincronizar_lote_clientes(payload)
+        totais = {"inserido": 0, "atualizado": 0, "inalterado": 0, "falhou": 0}
+        for resultado in resultados:
+            totais[resultado["situacao"]] += 1
+        return resposta_json(codificar_json({
+            "inseridos": totais["inserido"],
+            "atualizados": totais["atualizado"],
+            "inalterados": totais["inalterado"],
+            "falhas": totais["falhou"],
+            "resultados": resultados,
+        }), 207)
+
+    def lote_em_segundo_plano(payload: list) -> bool:
+        """
+        O lote vai para uma tarefa em segundo plano com ?async=1, com o
+        cabeçalho "Prefer: respond-async" ou quando passa de
+        LOTE_ASSINCRONO_A_PARTIR_DE itens (?async=0 força o modo síncrono).
+        """
+        modo = request.args.get("async")
+        if modo is not None:
+            return modo.lower() in ("1", "true", "sim")
+        if "respond-async" in request.headers.get("Prefer", ""):
+            return True
+        return 0 < LOTE_ASSINCRONO_A_PARTIR_DE < len(payload)
+
+    def resposta_tarefa_criada(id_tarefa: str):
+        tarefa = obter_tarefa(id_tarefa, limite_falhas=0)
+        tarefa["status_url"] = url_for("api_obter_tarefa", id_tarefa=id_tarefa)
+        resposta = jsonify(tarefa)
+        resposta.status_code = 202
+        resposta.headers["Location"] = tarefa["status_url"]
+        return resposta
+
+    @app.get("/api/jobs")
+    def api_listar_tarefas():
+        """
+        GET /api/jobs?estado=executando&limit=20
+        Tarefas em segundo plano, mais recentes primeiro.
+        """
+        limite = min(max(request.args.get("limit", 20, type=int), 1), 200)
+        return jsonify(listar_tarefas(limite, request.args.get("estado"))), 200
 
-            if erros:
-                falhas.append({
-                    "indice": indice,
-                    "cliente": cliente,
-                    "erros": erros,
-                })
-                continue
+    @app.get("/api/jobs/<id_tarefa>")
+    def api_obter_tarefa(id_tarefa):
+        """
+        GET /api/jobs/<id>?falhas_apos=-1&falhas_limit=100
+        Estado, progresso (processados, percentual, linhas por segundo),
+        contadores e as falhas por item (paginadas por índice).
+        """
+        falhas_apos = request.args.get("falhas_apos", -1, type=int)
+        limite = min(max(request.args.get("falhas_limit", 100, type=int), 0), 1000)
+        try:
+            tarefa = obter_tarefa(id_tarefa, falhas_apos, limite)
+        except TarefaNaoEncontrada:
+            return jsonify({"erro": "Tarefa não encontrada"}), 404
+        return resposta_json(codificar_json(tarefa))
+
+    @app.post("/api/jobs/<id_tarefa>/cancelar")
+    def api_cancelar_tarefa(id_tarefa):
+        """
+        POST /api/jobs/<id>/cancelar
+        Pede o cancelamento; o worker para antes do próximo bloco.
+        """
+        try:
+            return jsonify(cancelar_tarefa(id_tarefa)), 202
+        except TarefaNaoEncontrada:
+            return jsonify({"erro": "Tarefa não encontrada"}), 404
+        except EstadoInvalido as e:
+            return jsonify({"erro": str(e)}), 409
+
+    @app.post("/api/jobs/<id_tarefa>/retomar")
+    def api_retomar_tarefa(id_tarefa):
+        """
+        POST /api/jobs/<id>/retomar
+        Recoloca na fila uma tarefa cancelada ou que falhou.
+        """
+        try:
+            return jsonify(retomar_tarefa(id_tarefa)), 202
+        except TarefaNaoEncontrada:
+            return jsonify({"erro": "Tarefa não encontrada"}), 404
+        except EstadoInvalido as e:
+            return jsonify({"erro": str(e)}), 409
+
+    @app.get("/api/sistema/pool")
+    def api_estatisticas_pool():
+        """
+        GET /api/sistema/pool
+        Contadores de hits/misses do pool de conexões.
+        """
+        return jsonify(estatisticas_pool()), 200
+
+    @app.get("/api/sistema/escrita")
+    def api_estatisticas_escrita():
+        """
+        GET /api/sistema/escrita
+        Fila da escrita agrupada: grupos, escritas por commit e falhas.
+        """
+        return jsonify(estatisticas_escrita()), 200
+
+    @app.get("/api/sistema/replica")
+    def api_estatisticas_replica():
+        """
+        GET /api/sistema/replica
+        Réplica de leitura: idade da cópia, versão, cópias feitas e quantas
+        leituras foram para ela ou para o banco principal.
+        """
+        return jsonify(estatisticas_replica()), 200
+
+    @app.get("/api/sistema/cache")
+    def api_estatisticas_cache():
+        """
+        GET /api/sistema/cache
+        Taxa de acerto, despejos e expirações dos caches de leitura.
+        """
+        return jsonify(estatisticas_cache()), 200
 
-            inserir_cliente(nome, email, telefone, cpf, data_nascimento)
-            criadas.append(cliente)
+    @app.get("/api/sistema/armazenamento")
+    def api_configuracao_armazenamento():
+        """
+        GET /api/sistema/armazenamento
+        Perfil de armazenamento e valores efetivos dos PRAGMAs do SQLite.
+        """
+        return jsonify(configuracao_armazenamento()), 200
 
+    @app.get("/api/sistema/sql")
+    def api_estatisticas_sql():
+        """
+        GET /api/sistema/sql?ordem=segundos&limit=20
+        Estatísticas por formato de comando SQL (execuções, tempo total,
+        média, máximo, quantas passaram do limite de lentidão e o plano
+        capturado da primeira consulta lenta).
+        Ordens: segundos, execucoes, maximo_s, lentas, passos_vm.
+        """
+        ordem = request.args.get("ordem", "segundos")
+        if ordem not in ("segundos", "execucoes", "maximo_s", "lentas", "passos_vm"):
+            return jsonify({"erro": "Ordem inválida."}), 400
+        limite = request.args.get("limit", type=int)
         return jsonify({
-            "criadas": len(criadas),
-            "falhas": len(falhas),
-            "detalhes_falhas": falhas,
-        }), 207
+            "limite_lento_ms": SQL_LENTO_MS,
+            "comandos": estatisticas_sql(ordem=ordem, limite=limite),
+        }), 200
+
+    @app.delete("/api/sistema/sql")
+    def api_limpar_estatisticas_sql():
+        """
+        DELETE /api/sistema/sql
+        Zera as estatísticas de comandos SQL.
+        """
+        limpar_estatisticas_sql()
+        return "", 204
 
     # NENHUMA rota abaixo dessa linha
     return app
@@ -415,45 +1011,6 @@ def criar_app() -> Flask:
 
 app = criar_app()
 
-# DEBUG: listar todas as rotas registradas
-print("=== ROTAS REGISTRADAS ===")
-for rule in app.url_map.iter_rules():
-    print(rule, "->", list(rule.methods))
-print("=== FIM DAS ROTAS ===")
-
 if __name__ == "__main__":
     app.run(debug=True)
 
-# ================================================================
-# ROTA FUTURA (ENGATILHADA) - IMPORTAÇÃO EM LOTE DE CLIENTES
-# ---------------------------------------------------------------
-# Esta rota será usada no futuro para permitir envio de vários
-# clientes ao mesmo tempo em um único request (API profissional).
-#
-# No momento, ela está comentada porque:
-#  - não queremos expor no README ainda,
-#  - ainda estamos validando a estrutura,
-#  - e não deve ser usada por while.
-#
-# Quando quiser ativar:
-#  1. descomente o bloco,
-#  2. garanta que processar_lote_clientes esteja implementado,
-#  3. e adicione testes no Thunder Client/Postman.
-#
-# from src.clientes.service import processar_lote_clientes
-#
-# @app.post("/api/clientes/lote")
-# def api_criar_clientes_lote():
-#     payload = request.get_json(silent=True)
-#
-#     # Chama o serviço que processa o lote de clientes
-#     criadas, falhas = processar_lote_clientes(payload)
-#
-#     # Retorno padrão para operações em lote:
-#     #  - 207 Multi-Status (HTTP oficial para respostas mistas)
-#     return jsonify({
-#         "criadas": len(criadas),
-#         "falhas": len(falhas),
-#         "detalhes_falhas": falhas,
-#     }), 207
-# ================================================================
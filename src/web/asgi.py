@@ -0,0 +1,339 @@
+"""
+Modo assíncrono (ASGI) da aplicação.
+
+O servidor ASGI recebe as conexões num único loop de eventos; cada
+requisição é executada pela mesma aplicação Flask de app.py (mesmas rotas
+e mesmos JSONs), mas numa thread de um pool limitado:
+- leituras (GET/HEAD e POST /api/clientes/cpfs) usam um pool;
+- escritas (POST/PUT/DELETE) usam outro, menor — o SQLite só aceita um
+  escritor por vez, então mais threads de escrita só disputariam o lock.
+
+Assim um lote grande ocupa só uma thread de escrita e as consultas
+rápidas continuam sendo atendidas. Cada pool tem controle de admissão:
+no máximo CLIENTES_ASGI_FILA requisições esperando vaga, por até
+CLIENTES_ASGI_ESPERA segundos; além disso a resposta é 503 com
+Retry-After, em vez de acumular uma fila sem fim.
+
+Uso (na raiz do projeto, com uvicorn instalado):
+    python -m src.web.asgi --porta 8000
+    uvicorn src.web.asgi:app
+
+GET /api/sistema/admissao mostra os contadores de cada pool.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from src.web.app import app as app_flask
+
+# Threads do pool de leitura.
+ASGI_THREADS_LEITURA = int(os.environ.get("CLIENTES_ASGI_LEITURAS", "16"))
+
+# Threads do pool de escrita.
+ASGI_THREADS_ESCRITA = int(os.environ.get("CLIENTES_ASGI_ESCRITAS", "2"))
+
+# Requisições que podem esperar vaga em cada pool; as demais recebem 503.
+ASGI_FILA_MAXIMA = int(os.environ.get("CLIENTES_ASGI_FILA", "200"))
+
+# Tempo máximo (segundos) esperando vaga antes de responder 503.
+ASGI_ESPERA_MAXIMA = float(os.environ.get("CLIENTES_ASGI_ESPERA", "5"))
+
+# Tamanho máximo do corpo de uma requisição (bytes); acima disso, 413.
+ASGI_CORPO_MAXIMO = int(os.environ.get("CLIENTES_ASGI_CORPO_MAXIMO", str(64 * 1024 * 1024)))
+
+METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+# Rotas POST que só consultam o banco.
+ROTAS_LEITURA_POST = {"/api/clientes/cpfs"}
+
+
+class ClienteDesconectado(Exception):
+    """
+    O cliente fechou a conexão antes de enviar o corpo inteiro.
+    """
+
+
+class ControleAdmissao:
+    """
+    Limita quantas requisições executam (= threads do pool) e quantas
+    podem esperar por uma vaga. Usado só dentro do loop de eventos, então
+    os contadores não precisam de lock.
+    """
+
+    def __init__(self, nome: str, threads: int, fila_maxima: int, espera_maxima: float):
+        self.nome = nome
+        self.threads = threads
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix=f"asgi-{nome}"
+        )
+        self._semaforo = None
+        self.em_execucao = 0
+        self.aguardando = 0
+        self.admitidas = 0
+        self.rejeitadas = 0
+
+    async def entrar(self) -> bool:
+        """
+        Espera uma vaga. Retorna False se a fila estiver cheia ou se a
+        espera passar de espera_maxima.
+        """
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.threads)
+        if not self._semaforo.locked():
+            # Há vaga: entra direto, sem passar pela fila.
+            await self._semaforo.acquire()
+        elif not await self._esperar_vaga():
+            self.rejeitadas += 1
+            return False
+
+        self.em_execucao += 1
+        self.admitidas += 1
+        return True
+
+    async def _esperar_vaga(self) -> bool:
+        if self.aguardando >= self.fila_maxima:
+            return False
+        self.aguardando += 1
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), self.espera_maxima)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.aguardando -= 1
+
+    def sair(self):
+        self.em_execucao -= 1
+        self._semaforo.release()
+
+    def estatisticas(self) -> dict:
+        return {
+            "threads": self.threads,
+            "em_execucao": self.em_execucao,
+            "aguardando": self.aguardando,
+            "fila_maxima": self.fila_maxima,
+            "admitidas": self.admitidas,
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+def montar_environ(scope: dict, corpo: bytes) -> dict:
+    """
+    Converte o 'scope' HTTP do ASGI no environ WSGI esperado pelo Flask.
+    """
+    servidor = scope.get("server") or ("localhost", 80)
+    cliente = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": cliente[0],
+        "CONTENT_LENGTH": str(len(corpo)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(corpo),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for nome, valor in scope.get("headers", []):
+        nome = nome.decode("latin-1").upper().replace("-", "_")
+        valor = valor.decode("latin-1")
+        if nome == "CONTENT_LENGTH":
+            continue
+        if nome == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = valor
+            continue
+        chave = "HTTP_" + nome
+        environ[chave] = f"{environ[chave]},{valor}" if chave in environ else valor
+    return environ
+
+
+class AppASGI:
+    """
+    Aplicação ASGI que despacha cada requisição para a aplicação WSGI
+    num dos pools (leitura ou escrita).
+    """
+
+    def __init__(self, app_wsgi, threads_leitura: int = ASGI_THREADS_LEITURA,
+                 threads_escrita: int = ASGI_THREADS_ESCRITA,
+                 fila_maxima: int = ASGI_FILA_MAXIMA,
+                 espera_maxima: float = ASGI_ESPERA_MAXIMA):
+        self.app_wsgi = app_wsgi
+        self.leitura = ControleAdmissao("leitura", threads_leitura, fila_maxima, espera_maxima)
+        self.escrita = ControleAdmissao("escrita", threads_escrita, fila_maxima, espera_maxima)
+
+    def estatisticas(self) -> dict:
+        return {
+            "leitura": self.leitura.estatisticas(),
+            "escrita": self.escrita.estatisticas(),
+        }
+
+    def classificar(self, metodo: str, caminho: str) -> ControleAdmissao:
+        if metodo in METODOS_LEITURA or caminho in ROTAS_LEITURA_POST:
+            return self.leitura
+        return self.escrita
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._ciclo_de_vida(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] == "/api/sistema/admissao" and scope["method"] == "GET":
+            await _responder_json(send, 200, self.estatisticas())
+            return
+
+        try:
+            corpo = await _ler_corpo(receive)
+        except ClienteDesconectado:
+            # Corpo pela metade: não roda a aplicação (um lote truncado
+            # seria gravado como se estivesse completo) e não há a quem
+            # responder.
+            return
+        if corpo is None:
+            await _responder_json(send, 413, {"erro": "Corpo da requisição grande demais."})
+            return
+
+        controle = self.classificar(scope["method"], scope["path"])
+        if not await controle.entrar():
+            await _responder_json(
+                send, 503, {"erro": "Servidor ocupado, tente novamente."},
+                [(b"retry-after", b"1")],
+            )
+            return
+
+        loop = asyncio.get_running_loop()
+
+        def enviar(mensagem):
+            # Roda na thread do pool: espera o loop enviar a mensagem
+            # (se o cliente for lento, a thread espera junto).
+            asyncio.run_coroutine_threadsafe(send(mensagem), loop).result()
+
+        try:
+            environ = montar_environ(scope, corpo)
+            futuro = loop.run_in_executor(
+                controle.executor, self._executar_wsgi, environ, enviar
+            )
+        except BaseException:
+            controle.sair()
+            raise
+        # A vaga só é liberada quando a thread do pool termina: se esta
+        # corrotina for cancelada, a aplicação WSGI continua rodando lá.
+        futuro.add_done_callback(lambda _: controle.sair())
+        await asyncio.shield(futuro)
+
+    def _executar_wsgi(self, environ: dict, enviar):
+        """
+        Executado na thread do pool: a requisição inteira (inclusive um
+        export em streaming) roda na mesma thread, então a conexão fixada
+        no pool do SQLite é devolvida pela mesma thread que a pegou.
+        """
+        inicio = {}
+
+        def start_response(status, cabecalhos, exc_info=None):
+            inicio["status"] = int(status.split(" ", 1)[0])
+            inicio["headers"] = [
+                (nome.lower().encode("latin-1"), valor.encode("latin-1"))
+                for nome, valor in cabecalhos
+            ]
+
+        resposta = self.app_wsgi(environ, start_response)
+        try:
+            pendente = None
+            for parte in resposta:
+                if not parte:
+                    continue
+                if pendente is None:
+                    enviar({"type": "http.response.start", **inicio})
+                else:
+                    enviar({"type": "http.response.body", "body": pendente, "more_body": True})
+                pendente = parte
+            if pendente is None:
+                enviar({"type": "http.response.start", **inicio})
+            enviar({"type": "http.response.body", "body": pendente or b""})
+        finally:
+            if hasattr(resposta, "close"):
+                resposta.close()
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                self.leitura.executor.shutdown(wait=True)
+                self.escrita.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _ler_corpo(receive):
+    """
+    Lê o corpo inteiro da requisição. Retorna None se passar de
+    ASGI_CORPO_MAXIMO; levanta ClienteDesconectado se o cliente sair antes
+    do fim.
+    """
+    partes = []
+    tamanho = 0
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            raise ClienteDesconectado()
+        parte = mensagem.get("body", b"")
+        tamanho += len(parte)
+        if tamanho > ASGI_CORPO_MAXIMO:
+            return None
+        partes.append(parte)
+        if not mensagem.get("more_body"):
+            break
+    return b"".join(partes)
+
+
+async def _responder_json(send, status: int, dados, cabecalhos=()):
+    corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            *cabecalhos,
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+app = AppASGI(app_flask)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve a aplicação em modo assíncrono (ASGI, via uvicorn)."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("O modo ASGI precisa do uvicorn: pip install uvicorn")
+
+    uvicorn.run(app, host=args.host, port=args.porta, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Métricas por rota no formato texto do Prometheus (GET /metrics).
+
+instrumentar(app) registra hooks before/after/teardown_request que medem,
+por método + rota (o padrão da rota, ex. /api/clientes/<int:id_cliente>,
+para não criar uma série por id):
+- latência (histograma) e respostas por status;
+- requisições em andamento;
+- tamanho do corpo da requisição e da resposta (histogramas);
+- quantidade de comandos SQL e tempo gasto neles por requisição.
+
+Cada requisição custa alguns microssegundos (um lock e algumas buscas em
+dict), então pode ficar ligado em produção. CLIENTES_METRICAS=0 desliga.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+from src.clientes.cache import estatisticas_cache
+from src.clientes.database import (
+    encerrar_medicao_sql,
+    estatisticas_pool,
+    iniciar_medicao_sql,
+)
+from src.clientes.escrita import estatisticas_escrita
+from src.clientes.replica import estatisticas_replica
+
+# Liga/desliga a instrumentação.
+METRICAS_ATIVAS = os.environ.get("CLIENTES_METRICAS", "1") != "0"
+
+# Limites (em segundos) dos buckets de latência.
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Limites (em bytes) dos buckets de tamanho de corpo.
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Limites dos buckets de comandos SQL por requisição.
+BUCKETS_COMANDOS_SQL = (0, 1, 2, 3, 5, 10, 25, 50, 100, 500)
+
+ROTA_DESCONHECIDA = "<sem_rota>"
+
+
+class Histograma:
+    """
+    Histograma cumulativo no estilo Prometheus (buckets fixos + soma).
+    Não é thread-safe por si só: RegistroMetricas protege com um lock.
+    """
+
+    __slots__ = ("limites", "contagens", "soma", "total")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome: str, rotulos: str):
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos},le="{_numero(limite)}"}} {acumulado}'
+        yield f'{nome}_bucket{{{rotulos},le="+Inf"}} {self.total}'
+        yield f"{nome}_sum{{{rotulos}}} {_numero(self.soma)}"
+        yield f"{nome}_count{{{rotulos}}} {self.total}"
+
+
+class RegistroMetricas:
+    """
+    Guarda as métricas de todas as rotas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencia = {}
+        self.respostas = {}
+        self.em_andamento = {}
+        self.bytes_requisicao = {}
+        self.bytes_resposta = {}
+        self.comandos_sql = {}
+        self.segundos_sql = {}
+
+    def _histograma(self, tabela: dict, chave, limites) -> Histograma:
+        histograma = tabela.get(chave)
+        if histograma is None:
+            histograma = tabela[chave] = Histograma(limites)
+        return histograma
+
+    def iniciar(self, chave):
+        with self._lock:
+            self.em_andamento[chave] = self.em_andamento.get(chave, 0) + 1
+
+    def finalizar(self, chave, status: int, duracao: float, bytes_requisicao,
+                  bytes_resposta, sql):
+        with self._lock:
+            self.em_andamento[chave] -= 1
+            self._histograma(self.latencia, chave, BUCKETS_LATENCIA).observar(duracao)
+            chave_status = (*chave, status)
+            self.respostas[chave_status] = self.respostas.get(chave_status, 0) + 1
+            if bytes_requisicao is not None:
+                self._histograma(self.bytes_requisicao, chave, BUCKETS_BYTES).observar(bytes_requisicao)
+            if bytes_resposta is not None:
+                self._histograma(self.bytes_resposta, chave, BUCKETS_BYTES).observar(bytes_resposta)
+            if sql is not None:
+                self._histograma(self.comandos_sql, chave, BUCKETS_COMANDOS_SQL).observar(sql[0])
+                self._histograma(self.segundos_sql, chave, BUCKETS_LATENCIA).observar(sql[1])
+
+    def exportar(self) -> str:
+        """
+        Texto no formato de exposição do Prometheus (versão 0.0.4).
+        """
+        linhas = []
+        with self._lock:
+            _histogramas(
+                linhas, "clientes_http_duracao_segundos",
+                "Latência das requisições HTTP por rota.", self.latencia,
+            )
+            linhas.append("# HELP clientes_http_respostas_total Respostas HTTP por rota e status.")
+            linhas.append("# TYPE clientes_http_respostas_total counter")
+            for (metodo, rota, status), total in sorted(self.respostas.items()):
+                linhas.append(
+                    f'clientes_http_respostas_total{{{_rotulos(metodo, rota)},status="{status}"}} {total}'
+                )
+            linhas.append("# HELP clientes_http_em_andamento Requisições HTTP em andamento.")
+            linhas.append("# TYPE clientes_http_em_andamento gauge")
+            for (metodo, rota), total in sorted(self.em_andamento.items()):
+                linhas.append(f"clientes_http_em_andamento{{{_rotulos(metodo, rota)}}} {total}")
+            _histogramas(
+                linhas, "clientes_http_requisicao_bytes",
+                "Tamanho do corpo das requisições.", self.bytes_requisicao,
+            )
+            _histogramas(
+                linhas, "clientes_http_resposta_bytes",
+                "Tamanho do corpo das respostas (sem as enviadas em streaming).",
+                self.bytes_resposta,
+            )
+            _histogramas(
+                linhas, "clientes_sql_comandos_por_requisicao",
+                "Comandos SQL executados por requisição.", self.comandos_sql,
+            )
+            _histogramas(
+                linhas, "clientes_sql_segundos_por_requisicao",
+                "Tempo gasto em comandos SQL por requisição.", self.segundos_sql,
+            )
+
+        _medidores(linhas, "clientes_pool", "Pool de conexões SQLite", estatisticas_pool())
+        _medidores(linhas, "clientes_escrita", "Escrita agrupada", estatisticas_escrita())
+        _medidores(linhas, "clientes_replica", "Réplica de leitura", estatisticas_replica())
+        for nome, contadores in estatisticas_cache().items():
+            _medidores(linhas, f"clientes_cache_{nome}", f"Cache de {nome}", contadores)
+        return "\n".join(linhas) + "\n"
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(metodo: str, rota: str) -> str:
+    return f'metodo="{metodo}",rota="{_escapar(rota)}"'
+
+
+def _histogramas(linhas: list, nome: str, ajuda: str, tabela: dict):
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} histogram")
+    for (metodo, rota), histograma in sorted(tabela.items()):
+        linhas.extend(histograma.linhas(nome, _rotulos(metodo, rota)))
+
+
+def _medidores(linhas: list, prefixo: str, ajuda: str, valores: dict):
+    # Exporta os contadores numéricos de estatisticas_pool()/estatisticas_cache().
+    for chave, valor in sorted(valores.items()):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            continue
+        nome = f"{prefixo}_{chave}"
+        linhas.append(f"# HELP {nome} {ajuda}: {chave}.")
+        linhas.append(f"# TYPE {nome} gauge")
+        linhas.append(f"{nome} {_numero(valor)}")
+
+
+registro = RegistroMetricas()
+
+
+def instrumentar(app, registro_metricas: RegistroMetricas = None):
+    """
+    Registra os hooks de medição e a rota GET /metrics na aplicação.
+    """
+    registro_metricas = registro_metricas or registro
+    if not METRICAS_ATIVAS:
+        return
+
+    @app.before_request
+    def iniciar_metricas():
+        regra = request.url_rule
+        chave = (request.method, regra.rule if regra else ROTA_DESCONHECIDA)
+        g.metricas = (chave, time.perf_counter())
+        registro_metricas.iniciar(chave)
+        iniciar_medicao_sql()
+
+    def _finalizar(chave, inicio, status, bytes_requisicao, bytes_resposta):
+        registro_metricas.finalizar(
+            chave,
+            status,
+            time.perf_counter() - inicio,
+            bytes_requisicao,
+            bytes_resposta,
+            encerrar_medicao_sql(),
+        )
+
+    @app.after_request
+    def medir_resposta(resposta):
+        if resposta.is_streamed and "metricas" in g:
+            # Em streaming a rota só termina quando o corpo acaba de ser
+            # enviado (e o SQL roda durante o envio, na mesma thread).
+            chave, inicio = g.pop("metricas")
+            status, bytes_requisicao = resposta.status_code, request.content_length
+            resposta.call_on_close(lambda: _finalizar(
+                chave, inicio, status, bytes_requisicao, None
+            ))
+        else:
+            g.metricas_resposta = (resposta.status_code, resposta.content_length)
+        return resposta
+
+    @app.teardown_request
+    def registrar_metricas(exc):
+        # Roda também quando a rota levanta exceção (after_request não).
+        metricas = g.pop("metricas", None)
+        if metricas is None:
+            return
+        status, bytes_resposta = g.pop("metricas_resposta", (500, None))
+        _finalizar(*metricas, status, request.content_length, bytes_resposta)
+
+    @app.get("/metrics")
+    def metricas_prometheus():
+        """
+        GET /metrics
+        Métricas no formato texto do Prometheus.
+        """
+        return Response(
+            registro_metricas.exportar(),
+            mimetype="text/plain; version=0.0.4; charset=utf-8",
+        )
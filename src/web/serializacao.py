@@ -0,0 +1,135 @@
+"""
+Serialização rápida de listas de clientes para JSON/NDJSON.
+
+As linhas vêm direto do cursor (sqlite3.Row ou tuplas) e são codificadas
+por posição, com um "layout" pré-calculado para cada lista de campos: os
+trechos '{"id":', ',"nome":' ... já ficam prontos e cada valor é
+codificado uma vez, sem montar um dict por cliente nem percorrer a
+estrutura de novo (como jsonify faria).
+
+Se o orjson estiver instalado ele é usado no lugar (é mais rápido mesmo
+precisando do dict); sem ele, tudo funciona só com a biblioteca padrão.
+"""
+import json
+from functools import lru_cache
+from json.encoder import encode_basestring
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+from src.clientes.repository import COLUNAS_CLIENTE
+
+
+_CODIFICADORES = {
+    str: encode_basestring,
+    int: int.__repr__,
+    float: float.__repr__,
+    bool: lambda valor: "true" if valor else "false",
+    type(None): lambda valor: "null",
+}
+
+
+def _codificar_valor(valor) -> str:
+    codificador = _CODIFICADORES.get(type(valor))
+    if codificador is None:
+        return json.dumps(valor, ensure_ascii=False)
+    return codificador(valor)
+
+
+def campos_da_projecao(texto: str) -> tuple:
+    """
+    Interpreta o parâmetro ?fields=nome,email. Retorna a tupla de campos
+    (na ordem pedida, sem repetições) ou COLUNAS_CLIENTE se vier vazio.
+    Levanta ValueError para campos desconhecidos.
+    """
+    if not texto or not texto.strip():
+        return COLUNAS_CLIENTE
+    campos = []
+    for campo in texto.split(","):
+        campo = campo.strip()
+        if not campo:
+            continue
+        if campo not in COLUNAS_CLIENTE:
+            raise ValueError(
+                f"Campo desconhecido: {campo}. Use: {', '.join(COLUNAS_CLIENTE)}."
+            )
+        if campo not in campos:
+            campos.append(campo)
+    return tuple(campos) or COLUNAS_CLIENTE
+
+
+@lru_cache(maxsize=64)
+def _layout(campos: tuple) -> tuple:
+    # ('{"id":', 0), (',"nome":', 1), ...
+    return tuple(
+        (("{" if posicao == 0 else ",") + encode_basestring(campo) + ":", posicao)
+        for posicao, campo in enumerate(campos)
+    )
+
+
+def _objetos(linhas, campos: tuple, separador: str) -> str:
+    """
+    Codifica as linhas como objetos JSON separados por 'separador'.
+    Usa as primeiras len(campos) posições de cada linha.
+    """
+    layout = _layout(campos)
+    codificadores = _CODIFICADORES
+    partes = []
+    adicionar = partes.append
+    for numero, linha in enumerate(linhas):
+        if numero:
+            adicionar(separador)
+        for prefixo, posicao in layout:
+            adicionar(prefixo)
+            valor = linha[posicao]
+            codificador = codificadores.get(type(valor))
+            adicionar(codificador(valor) if codificador else _codificar_valor(valor))
+        adicionar("}")
+    return "".join(partes)
+
+
+def serializar_linhas(linhas, campos: tuple = COLUNAS_CLIENTE) -> bytes:
+    """
+    Lista JSON de objetos {campo: valor}, a partir de linhas cujas
+    primeiras posições seguem a ordem de 'campos'.
+    """
+    if orjson is not None:
+        return orjson.dumps([dict(zip(campos, linha)) for linha in linhas])
+    return ("[" + _objetos(linhas, campos, ",") + "]").encode("utf-8")
+
+
+def serializar_ndjson(linhas, campos: tuple = COLUNAS_CLIENTE) -> bytes:
+    """
+    Um objeto JSON por linha (NDJSON), terminando em quebra de linha.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return b""
+    if orjson is not None:
+        return b"\n".join(
+            orjson.dumps(dict(zip(campos, linha))) for linha in linhas
+        ) + b"\n"
+    return (_objetos(linhas, campos, "\n") + "\n").encode("utf-8")
+
+
+def codificar_json(valor) -> bytes:
+    """
+    JSON de um valor qualquer (orjson se disponível).
+    """
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def resposta_json(corpo: bytes, status: int = 200, etag: str = None) -> Response:
+    """
+    Resposta com um corpo JSON já codificado.
+    """
+    resposta = Response(corpo, status=status, mimetype="application/json")
+    if etag:
+        resposta.set_etag(etag)
+    return resposta